@@ -99,6 +99,7 @@ FROM base;
 -- 客户首周各品类分析（宽表格式）
 -- 文件名: customer_first_week_analysis.sql
 -- 描述: 以客户为维度，统计各一级品类在首周（第几日下单≤6）的销售额和频次
+-- 超时: 600
 
 SELECT
     客户id,
@@ -161,3 +162,25 @@ GROUP BY
 ORDER BY
     客户id;
 
+
+-- 查询10: 按日期范围查询订单（绑定参数）
+-- 使用: get_orders_by_date_range
+-- 参数: start_date DATE, end_date DATE
+-- 分片: new_customer_orders.日期
+
+SELECT
+    日期,
+    下单时间,
+    客户id,
+    客户名称,
+    订单id,
+    spu名称,
+    后台一级类目,
+    销售额
+FROM
+    new_customer_orders
+WHERE
+    日期 BETWEEN CAST(DATE_FORMAT(:start_date, '%Y%m%d') AS UNSIGNED)
+           AND CAST(DATE_FORMAT(:end_date, '%Y%m%d') AS UNSIGNED)
+ORDER BY
+    日期, 订单id;
@@ -10,13 +10,28 @@ import sys
 import pandas as pd
 import pymysql
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Tuple, Iterator
 import logging
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
 
 # 添加项目根目录到Python路径
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 
 from src.shared.config import DB_CONFIG
+from src.shared.db_pool import get_connection, connect_direct, discard_connection, is_replica, read_config
+from src.exporters.query_guard import QueryGuard
+from src.exporters.preflight import run_preflight
+from src.exporters.pipeline import PrefetchedBatches, SpooledBatches
+from src.exporters.sql_params import execute_sql, read_sql_dataframe
+from src.exporters.keyset import DEFAULT_PAGE_SIZE, CheckpointStore, run_keyset_export
+from src.exporters.sharding import (
+    DEFAULT_SHARDS, MAX_SHARDS, parse_shard_key, split_ranges, build_shard_conditions, build_shard_sql,
+    ShardedBatches
+)
+from src.exporters.writers import (
+    XlsxStreamWriter, write_dataframe_sheets, create_writer, create_tee_writer, split_extension
+)
 
 # 配置日志
 logging.basicConfig(
@@ -29,32 +44,125 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# 流式导出时每次 fetchmany 的行数
+DEFAULT_FETCH_SIZE = 10000
+
+
+class _StreamBatches:
+    """
+    服务端游标的批次迭代器
+
+    读完或调用 close() 时关闭游标并执行 on_close 回调；即使一批都没读就关闭也会清理。
+    没读完就放弃时应调用 cancel()：先在服务端取消查询，否则关闭游标会把剩余结果全部读完。
+    """
+    
+    def __init__(self, cursor, batch_size: int, on_close=None, guard: Optional[QueryGuard] = None):
+        self._cursor = cursor
+        self._connection = cursor.connection
+        self._batch_size = batch_size
+        self._on_close = on_close
+        self._guard = guard
+        self._closed = False
+    
+    def __iter__(self):
+        return self
+    
+    def __next__(self) -> List[tuple]:
+        if self._closed:
+            raise StopIteration
+        try:
+            rows = self._cursor.fetchmany(self._batch_size)
+        except Exception as e:
+            if self._guard:
+                self._guard.check(e)
+            raise
+        if not rows:
+            self.close()
+            raise StopIteration
+        return rows
+    
+    def interrupt(self):
+        """只在服务端取消查询（可从其他线程调用），正在阻塞的 fetchmany 随即报错返回"""
+        if not self._closed and self._guard:
+            self._guard.kill()
+    
+    def cancel(self):
+        """取消服务端查询并关闭"""
+        if self._closed:
+            return
+        if self._guard:
+            self._guard.kill()
+        self.close(cancelled=True)
+    
+    def close(self, cancelled: bool = False):
+        if self._closed:
+            return
+        self._closed = True
+        reusable = True
+        try:
+            self._cursor.close()
+        except Exception as e:
+            if not cancelled:
+                raise
+            # 读结果途中被打断的连接状态不确定，直接关闭
+            reusable = False
+            logger.debug(f"关闭已取消的游标失败，关闭连接: {e}")
+            try:
+                self._connection.close()
+            except Exception:
+                pass
+        finally:
+            if self._guard:
+                self._guard.finish(cancelled, reusable)
+            if self._on_close:
+                self._on_close()
+
 
 class DatabaseToExcelExporter:
     """数据库到Excel导出器"""
     
-    def __init__(self, db_config: Optional[Dict[str, Any]] = None):
+    def __init__(self, db_config: Optional[Dict[str, Any]] = None, query_slots=None, result_cache=None,
+                 query_timeout: Optional[float] = None, pipelined: bool = False):
         """
         初始化导出器
         
         Args:
-            db_config: 数据库配置字典，如果为None则使用默认配置
+            db_config: 数据库配置字典，如果为None则使用只读查询配置（配置了只读副本且延迟正常时连接副本，否则连接主库）
+            query_slots: 限制同时执行查询数的信号量（多进程批量导出时共享），为None则不限制
+            result_cache: 查询结果缓存（ResultCache），命中时 execute_query 不访问数据库
+            query_timeout: 默认查询超时秒数，None 表示不限制；各导出方法的 timeout 参数优先
+            pipelined: 流式导出时由后台线程预取下一批数据，读取与写入重叠执行
         """
-        self.db_config = db_config or DB_CONFIG
+        self.db_config = db_config
+        # 当前连接所在的数据库配置（建立连接时决定，分片连接与取消查询的旁路连接使用同一个）
+        self.active_config = None
         self.connection = None
+        self.query_slots = query_slots
+        self.result_cache = result_cache
+        self.query_timeout = query_timeout
+        self.pipelined = pipelined
+        # 最近一次导出写入的行数（供预检记录实际值）
+        self.last_row_count = None
         
+    def _create_connection(self):
+        """从共享连接池借用一个连接（close() 时归还连接池）"""
+        if self.active_config is None:
+            self.active_config = self.db_config or read_config()
+        return get_connection(self.active_config)
+    
+    def _create_side_connection(self):
+        """创建不经过连接池的旁路连接（KILL QUERY 用，连接池占满时也能取消查询）"""
+        return connect_direct(self.active_config or self.db_config or DB_CONFIG)
+    
     def connect(self):
-        """建立数据库连接"""
+        """建立数据库连接（从连接池借用；原连接已断开时先作废）"""
+        if self.connection is not None:
+            discard_connection(self.connection)
+            self.connection = None
+        # 每次建立连接时重新选择只读副本或主库
+        self.active_config = None
         try:
-            self.connection = pymysql.connect(
-                host=self.db_config['host'],
-                user=self.db_config['user'],
-                password=self.db_config['password'],
-                database=self.db_config['database'],
-                port=self.db_config['port'],
-                charset=self.db_config['charset'],
-                autocommit=True
-            )
+            self.connection = self._create_connection()
             logger.info("数据库连接成功")
             return True
         except Exception as e:
@@ -62,39 +170,320 @@ class DatabaseToExcelExporter:
             return False
     
     def disconnect(self):
-        """关闭数据库连接"""
+        """归还数据库连接"""
         if self.connection:
-            self.connection.close()
+            try:
+                self.connection.close()
+            except Exception as e:
+                logger.debug(f"归还数据库连接失败: {e}")
+            self.connection = None
+            self.active_config = None
             logger.info("数据库连接已关闭")
     
-    def execute_query(self, sql: str) -> Optional[pd.DataFrame]:
+    def _guard(self, connection, timeout: Optional[float]) -> QueryGuard:
+        """为一次查询创建超时/取消守卫"""
+        return QueryGuard(connection, timeout if timeout is not None else self.query_timeout,
+                          self._create_side_connection)
+    
+    def _drop_connection(self, connection):
+        """作废被中断的连接（可能残留未读完的结果，不能再归还连接池复用）"""
+        discard_connection(connection)
+        if connection is self.connection:
+            self.connection = None
+    
+    def execute_query(self, sql: str, connection=None, timeout: Optional[float] = None) -> Optional[pd.DataFrame]:
         """
         执行SQL查询并返回DataFrame
         
         Args:
-            sql: SQL查询语句
+            sql: SQL查询语句，或绑定参数的查询（BoundQuery，走预处理语句）
+            connection: 使用指定的连接执行（并行导出时每个工作表一个连接），默认使用 self.connection
+            timeout: 超时秒数，超时或 Ctrl-C 时在服务端取消查询
             
         Returns:
             pandas DataFrame 或 None（如果查询失败）
         """
-        if not self.connection:
-            if not self.connect():
-                return None
+        # 缓存键在查询前计算，查询期间表被导入更新时结果不会记到新版本下
+        cache_key = None
+        if self.result_cache is not None:
+            cache_key, df = self.result_cache.lookup(str(sql))
+            if df is not None:
+                return df
+        
+        if connection is None:
+            if not self.connection or not self.connection.open:
+                if not self.connect():
+                    return None
+            connection = self.connection
         
         try:
-            logger.info(f"执行SQL查询: {sql[:100]}...")
-            df = pd.read_sql(sql, self.connection)
+            logger.info(f"执行SQL查询: {str(sql)[:100]}...")
+            with self.query_slots or nullcontext():
+                try:
+                    with self._guard(connection, timeout):
+                        df = read_sql_dataframe(connection, sql)
+                except KeyboardInterrupt:
+                    self._drop_connection(connection)
+                    raise
             logger.info(f"查询成功，返回 {len(df)} 行数据")
+            # 只读副本可能还没复制到表版本戳对应的写入，其结果不写入缓存
+            if self.result_cache is not None and not is_replica(self.active_config):
+                self.result_cache.put(cache_key, df)
             return df
         except Exception as e:
             logger.error(f"SQL查询执行失败: {e}")
             return None
     
+    def stream_query(self, sql: str, batch_size: int = DEFAULT_FETCH_SIZE,
+                     connection=None, timeout: Optional[float] = None,
+                     acquire_slot: bool = True) -> Tuple[List[str], Iterator[List[tuple]]]:
+        """
+        使用服务端游标（SSCursor）执行查询，按批次返回结果
+        
+        结果不会在客户端整体缓存；批次迭代器耗尽或关闭前，当前连接不能执行其他查询，
+        也一直占用 query_slots 中的一个名额。
+        
+        Args:
+            sql: SQL查询语句
+            batch_size: 每批 fetchmany 的行数
+            connection: 使用指定的连接执行，默认使用 self.connection
+            timeout: 超时秒数（从执行到结果读完），超时或取消时在服务端终止查询
+            acquire_slot: 是否占用 query_slots 名额（分片查询由调用方统一占用一个）
+            
+        Returns:
+            (列名列表, 批次迭代器)
+        """
+        if connection is None:
+            if not self.connection or not self.connection.open:
+                if not self.connect():
+                    raise ConnectionError("数据库连接失败")
+            connection = self.connection
+        
+        release = None
+        if self.query_slots is not None and acquire_slot:
+            self.query_slots.acquire()
+            release = self.query_slots.release
+        
+        guard = self._guard(connection, timeout)
+        try:
+            guard.start()
+            cursor = connection.cursor(pymysql.cursors.SSCursor)
+            try:
+                logger.info(f"流式执行SQL查询: {str(sql)[:100]}...")
+                execute_sql(cursor, sql)
+                columns = [desc[0] for desc in cursor.description]
+            except BaseException as e:
+                interrupted = not isinstance(e, Exception)
+                guard.finish(cancelled=interrupted, reusable=not interrupted)
+                if interrupted:
+                    self._drop_connection(connection)
+                else:
+                    cursor.close()
+                    guard.check(e)
+                raise
+        except BaseException:
+            if release:
+                release()
+            raise
+        
+        return columns, _StreamBatches(cursor, batch_size, on_close=release, guard=guard)
+    
+    def preflight(self, sql: str, thresholds: Optional[Dict[str, int]] = None,
+                  label: Optional[str] = None) -> Dict[str, Any]:
+        """
+        对SQL运行 EXPLAIN 预检，估算扫描行数与结果大小（见 preflight.py）
+        
+        Returns:
+            Dict: 预检结果，verdict 为 ok / confirm / refuse
+        """
+        if not self.connection or not self.connection.open:
+            if not self.connect():
+                raise ConnectionError("数据库连接失败")
+        return run_preflight(self.connection, str(sql), thresholds, label)
+    
+    def _shard_bounds(self, table: str, column: str):
+        """读取分片键的取值范围（分片键有索引时只读索引两端）"""
+        if not self.connection or not self.connection.open:
+            if not self.connect():
+                raise ConnectionError("数据库连接失败")
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"SELECT MIN(`{column}`), MAX(`{column}`) FROM `{table}`")
+            return cursor.fetchone()
+    
+    def stream_sharded_query(self, sql: str, shard_key: str, shards: int = DEFAULT_SHARDS,
+                             batch_size: int = DEFAULT_FETCH_SIZE,
+                             timeout: Optional[float] = None) -> Tuple[List[str], Iterator[List[tuple]]]:
+        """
+        按分片键把查询切成多段，在各自的连接上同时执行，按分片键顺序合并返回
+        
+        各连接依次紧接着开启一致性快照（见 _open_query_connections），时间点只相差几毫秒，
+        期间提交的写入可能只被部分分片看到，合并结果不保证与单个查询完全一致；
+        查询自身按分片键排序时合并结果整体有序，否则在每个分片内保持原查询的顺序。
+        各分片不等待写出、一直读到结束（见 pipeline.SpooledBatches），每个分片在内存中最多保留
+        DEFAULT_SPOOL_MEMORY_BATCHES 批，其余暂存到临时文件，后面的分片不会因长时间不读取而被服务器断开。
+        
+        Args:
+            sql: SQL查询语句（或 BoundQuery）
+            shard_key: 分片键 "表.列"，列名需要出现在查询结果中
+            shards: 分片数
+            batch_size: 每批 fetchmany 的行数
+            timeout: 每个分片查询的超时秒数
+            
+        Returns:
+            (列名列表, 批次迭代器)，与 stream_query 相同
+        """
+        table, column = parse_shard_key(shard_key)
+        shards = max(1, min(shards, MAX_SHARDS))
+        low, high = self._shard_bounds(table, column)
+        conditions = build_shard_conditions(column, split_ranges(low, high, shards))
+        if len(conditions) == 1:
+            logger.warning(f"分片键 {shard_key} 的取值范围无法切分（{low} ~ {high}），按单个查询执行")
+            return self.stream_query(sql, batch_size, timeout=timeout)
+        logger.info(f"分片执行: {shard_key} 范围 {low} ~ {high}，{len(conditions)} 个分片")
+        
+        # 整个分片查询只占用一个 query_slots 名额，避免各分片互相等待名额
+        release = None
+        if self.query_slots is not None:
+            self.query_slots.acquire()
+            release = self.query_slots.release
+        connections = []
+        
+        def cleanup():
+            self._close_query_connections(connections)
+            if release:
+                release()
+        
+        def start_shard(shard_sql, connection):
+            columns, batches = self.stream_query(shard_sql, batch_size, connection=connection,
+                                                 timeout=timeout, acquire_slot=False)
+            return columns, SpooledBatches(batches)
+        
+        started = []
+        try:
+            connections.extend(self._open_query_connections(len(conditions), consistent_snapshot=True))
+            with ThreadPoolExecutor(max_workers=len(conditions), thread_name_prefix="export-shard") as pool:
+                futures = [pool.submit(start_shard, build_shard_sql(sql, condition), connection)
+                           for condition, connection in zip(conditions, connections)]
+                error = None
+                for future in futures:
+                    try:
+                        started.append(future.result())
+                    except BaseException as e:
+                        error = error or e
+            if error:
+                raise error
+        except BaseException:
+            for _, batches in started:
+                batches.cancel()
+            cleanup()
+            raise
+        
+        return started[0][0], ShardedBatches([batches for _, batches in started], on_close=cleanup)
+    
+    def _write_stream(self, sql: str, writer, batch_size: int = DEFAULT_FETCH_SIZE,
+                      timeout: Optional[float] = None, shard_key: Optional[str] = None,
+                      shards: int = 1) -> int:
+        """将流式查询结果逐批写入写入器，返回写入行数；结果为空时丢弃输出文件"""
+        if shard_key and shards > 1:
+            columns, batches = self.stream_sharded_query(sql, shard_key, shards, batch_size, timeout)
+        else:
+            columns, batches = self.stream_query(sql, batch_size, timeout=timeout)
+        pipelined = self.pipelined and not isinstance(batches, ShardedBatches)
+        if pipelined:
+            batches = PrefetchedBatches(batches)
+        try:
+            writer.open(columns)
+            for rows in batches:
+                writer.write_rows(rows)
+                logger.info(f"已写入 {writer.rows_written} 行...")
+        except BaseException:
+            # 包括 Ctrl-C：先在服务端取消查询，再丢弃未写完的文件
+            batches.cancel()
+            writer.discard()
+            raise
+        
+        if pipelined:
+            # 等待数据时间长说明瓶颈在数据库，预取线程等待队列空位时间长说明瓶颈在写文件
+            logger.info(f"流水线统计: 写入端等待数据 {batches.wait_seconds:.1f} 秒，"
+                        f"读取端等待写入 {batches.blocked_seconds:.1f} 秒")
+        if writer.rows_written == 0:
+            writer.discard()
+        else:
+            self._close_writer(writer)
+        self.last_row_count = writer.rows_written
+        return writer.rows_written
+    
+    def export_to_writer(self, sql: str, writer, batch_size: int = DEFAULT_FETCH_SIZE,
+                         timeout: Optional[float] = None, shard_key: Optional[str] = None,
+                         shards: int = 1) -> int:
+        """
+        将流式查询结果写入调用方提供的写入器（writers.py 中的写入器或其包装）
+        
+        结果为空时调用 writer.discard()；出错时放弃写入并抛出异常。
+        提供 shard_key 且 shards 大于1时按分片并行执行（见 stream_sharded_query）。
+        
+        Returns:
+            int: 写入行数
+        """
+        return self._write_stream(sql, writer, batch_size, timeout, shard_key, shards)
+    
+    def _fetch_page(self, sql: str, timeout: Optional[float] = None) -> Tuple[List[str], List[tuple]]:
+        """执行一条分页查询，返回 (列名, 行列表)；每页是一条独立的短查询"""
+        if not self.connection or not self.connection.open:
+            if not self.connect():
+                raise ConnectionError("数据库连接失败")
+        connection = self.connection
+        with self.query_slots or nullcontext():
+            try:
+                with self._guard(connection, timeout):
+                    with connection.cursor() as cursor:
+                        execute_sql(cursor, sql)
+                        columns = [desc[0] for desc in cursor.description]
+                        return columns, list(cursor.fetchall())
+            except KeyboardInterrupt:
+                self._drop_connection(connection)
+                raise
+    
+    def export_keyset(self, sql: str, output_path: str, key_column: str, fmt: str = 'csv',
+                      job_name: Optional[str] = None, page_size: int = DEFAULT_PAGE_SIZE,
+                      sheet_name: str = "Sheet1", timeout: Optional[float] = None,
+                      checkpoint_store: Optional[CheckpointStore] = None) -> Tuple[int, str]:
+        """
+        按唯一键分页导出（见 keyset.py），csv / csv.gz 失败后重跑可从检查点续传
+        
+        Args:
+            sql: SQL查询语句（或 BoundQuery）
+            output_path: 输出文件路径；有未完成的检查点时沿用检查点记录的路径
+            key_column: 分页键列名，需要是查询结果中的唯一列（如主键）
+            fmt: 导出格式
+            job_name: 检查点名称，默认使用输出文件名
+            page_size: 每页行数
+            sheet_name: 工作表名称（仅xlsx）
+            timeout: 每页查询的超时秒数
+            checkpoint_store: 检查点存储，默认保存在 data/export_checkpoints/
+            
+        Returns:
+            (导出总行数, 实际输出路径)；出错时抛出异常，检查点保留
+        """
+        job_name = job_name or os.path.basename(split_extension(output_path)[0])
+        total, output_path = run_keyset_export(
+            lambda page_sql: self._fetch_page(page_sql, timeout), sql, key_column, output_path, fmt,
+            job_name, page_size, checkpoint_store, sheet_name
+        )
+        self.last_row_count = total
+        return total, output_path
+    
     def export_to_excel(self, 
                        sql: str, 
                        output_path: str, 
                        sheet_name: str = "Sheet1",
-                       include_timestamp: bool = True) -> bool:
+                       include_timestamp: bool = True,
+                       streaming: bool = False,
+                       batch_size: int = DEFAULT_FETCH_SIZE,
+                       rollover: str = 'sheet',
+                       timeout: Optional[float] = None,
+                       shard_key: Optional[str] = None,
+                       shards: int = 1) -> bool:
         """
         将SQL查询结果导出到Excel文件
         
@@ -103,16 +492,27 @@ class DatabaseToExcelExporter:
             output_path: 输出Excel文件路径
             sheet_name: Excel工作表名称
             include_timestamp: 是否在文件名中包含时间戳
+            streaming: 是否流式导出（服务端游标 + write-only 工作簿，内存占用与结果行数无关）
+            batch_size: 流式导出时每批读取的行数
+            rollover: 超过单表行数上限时续写到新工作表（sheet）还是新文件（file，仅流式导出）
+            timeout: 查询超时秒数，默认使用 query_timeout
+            shard_key: 分片键 "表.列"，与 shards 一起使用（仅流式导出）
+            shards: 分片数，大于1时把查询按分片键切分后在多个连接上并行执行
             
         Returns:
             bool: 导出是否成功
         """
+        if streaming:
+            return self._export_to_excel_streaming(sql, output_path, sheet_name, include_timestamp,
+                                                   batch_size, rollover, timeout, shard_key, shards)
+        
         try:
             # 执行查询
-            df = self.execute_query(sql)
+            df = self.execute_query(sql, timeout=timeout)
             if df is None or df.empty:
                 logger.warning("查询结果为空，无法导出")
                 return False
+            self.last_row_count = len(df)
             
             # 处理输出路径
             if include_timestamp:
@@ -126,7 +526,7 @@ class DatabaseToExcelExporter:
             
             # 导出到Excel
             with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
-                df.to_excel(writer, sheet_name=sheet_name, index=False)
+                write_dataframe_sheets(writer, df, sheet_name)
             
             logger.info(f"数据已成功导出到: {output_path}")
             logger.info(f"导出数据统计: {len(df)} 行, {len(df.columns)} 列")
@@ -137,26 +537,169 @@ class DatabaseToExcelExporter:
             logger.error(f"导出到Excel失败: {e}")
             return False
     
+    def _export_to_excel_streaming(self, sql: str, output_path: str, sheet_name: str,
+                                   include_timestamp: bool, batch_size: int,
+                                   rollover: str = 'sheet', timeout: Optional[float] = None,
+                                   shard_key: Optional[str] = None, shards: int = 1) -> bool:
+        """流式导出到Excel"""
+        try:
+            if include_timestamp:
+                output_path = self._add_timestamp_to_path(output_path)
+            
+            writer = XlsxStreamWriter(output_path, sheet_name, rollover=rollover)
+            total = self._write_stream(sql, writer, batch_size, timeout, shard_key, shards)
+            if total == 0:
+                logger.warning("查询结果为空，无法导出")
+                return False
+            
+            logger.info(f"数据已成功导出到: {', '.join(writer.output_paths)}")
+            if len(writer.sheet_names) > 1:
+                logger.info(f"结果超过单表行数上限，共写入 {len(writer.sheet_names)} 个工作表")
+            logger.info(f"导出数据统计: {total} 行, {len(writer.columns)} 列")
+            return True
+            
+        except Exception as e:
+            logger.error(f"流式导出到Excel失败: {e}")
+            return False
+    
+    def export_to_file(self,
+                       sql: str,
+                       output_path: str,
+                       fmt: str = 'csv',
+                       include_timestamp: bool = True,
+                       batch_size: int = DEFAULT_FETCH_SIZE,
+                       sheet_name: str = "Sheet1",
+                       rollover: str = 'sheet',
+                       timeout: Optional[float] = None,
+                       shard_key: Optional[str] = None,
+                       shards: int = 1) -> bool:
+        """
+        流式导出SQL查询结果到指定格式的文件
+        
+        Args:
+            sql: SQL查询语句
+            output_path: 输出文件路径
+            fmt: 导出格式 xlsx / csv / csv.gz / parquet
+            include_timestamp: 是否在文件名中包含时间戳
+            batch_size: 每批读取的行数
+            sheet_name: 工作表名称（仅xlsx）
+            rollover: 超过单表行数上限时的续写方式（仅xlsx）
+            timeout: 查询超时秒数，默认使用 query_timeout
+            shard_key: 分片键 "表.列"，与 shards 一起使用
+            shards: 分片数，大于1时把查询按分片键切分后在多个连接上并行执行
+            
+        Returns:
+            bool: 导出是否成功
+        """
+        try:
+            if include_timestamp:
+                output_path = self._add_timestamp_to_path(output_path)
+            
+            writer = create_writer(fmt, output_path, sheet_name, rollover)
+            total = self._write_stream(sql, writer, batch_size, timeout, shard_key, shards)
+            if total == 0:
+                logger.warning("查询结果为空，无法导出")
+                return False
+            
+            logger.info(f"数据已成功导出到: {output_path}")
+            logger.info(f"导出数据统计: {total} 行, {len(writer.columns)} 列")
+            return True
+            
+        except Exception as e:
+            logger.error(f"导出到 {fmt} 失败: {e}")
+            return False
+    
+    def export_to_files(self,
+                        sql: str,
+                        output_path: str,
+                        formats: List[str],
+                        include_timestamp: bool = True,
+                        batch_size: int = DEFAULT_FETCH_SIZE,
+                        sheet_name: str = "Sheet1",
+                        rollover: str = 'sheet',
+                        timeout: Optional[float] = None,
+                        shard_key: Optional[str] = None,
+                        shards: int = 1) -> bool:
+        """
+        查询只执行一次，流式结果同时写入多种格式的文件（文件名相同、扩展名不同）
+        
+        Args:
+            sql: SQL查询语句
+            output_path: 输出文件路径（扩展名按各格式替换）
+            formats: 导出格式列表，如 ['xlsx', 'csv.gz', 'parquet']
+            其余参数同 export_to_file
+            
+        Returns:
+            bool: 导出是否成功（任一格式失败时全部放弃）
+        """
+        try:
+            if include_timestamp:
+                output_path = self._add_timestamp_to_path(output_path)
+            
+            writer = create_tee_writer(formats, output_path, sheet_name, rollover)
+            total = self._write_stream(sql, writer, batch_size, timeout, shard_key, shards)
+            if total == 0:
+                logger.warning("查询结果为空，无法导出")
+                return False
+            
+            for path in writer.output_paths:
+                logger.info(f"数据已成功导出到: {path}")
+            logger.info(f"导出数据统计: {total} 行, {len(writer.columns)} 列")
+            return True
+            
+        except Exception as e:
+            logger.error(f"导出到 {', '.join(formats)} 失败: {e}")
+            return False
+    
     def export_multiple_queries(self, 
                                queries: Dict[str, str], 
                                output_path: str,
-                               include_timestamp: bool = True) -> bool:
+                               include_timestamp: bool = True,
+                               streaming: bool = False,
+                               batch_size: int = DEFAULT_FETCH_SIZE,
+                               parallel: bool = False,
+                               consistent_snapshot: bool = False,
+                               timeout: Optional[float] = None) -> bool:
         """
         将多个SQL查询结果导出到同一个Excel文件的不同工作表
         
+        单个查询超过工作表行数上限时自动拆分到 工作表_2、工作表_3 ...
+        
+        并行模式下每个工作表的查询在各自的连接上同时执行，由当前线程按顺序写入工作簿，
+        总耗时约等于最慢的一个查询。
+        
         Args:
             queries: 字典，格式为 {'sheet_name': 'sql_query'}
             output_path: 输出Excel文件路径
             include_timestamp: 是否在文件名中包含时间戳
+            streaming: 是否流式导出
+            batch_size: 流式导出时每批读取的行数
+            parallel: 是否并行执行各工作表的查询
+            consistent_snapshot: 并行时各连接先开启一致性快照事务，使所有工作表看到同一时刻的数据
+            timeout: 每个工作表查询的超时秒数，默认使用 query_timeout
             
         Returns:
             bool: 导出是否成功
         """
+        connections = []
         try:
             # 处理输出路径
             if include_timestamp:
                 output_path = self._add_timestamp_to_path(output_path)
             
+            if parallel and streaming and self.query_slots is not None:
+                # 流式结果读完才释放名额，按工作表顺序读取时乱序拿到名额会互相等待
+                logger.warning("已设置查询并发上限，流式多表导出改为依次执行")
+                parallel = False
+            
+            if parallel and len(queries) > 1:
+                connections = self._open_query_connections(len(queries), consistent_snapshot)
+                logger.info(f"并行执行 {len(queries)} 个查询"
+                            + ("（一致性快照）" if consistent_snapshot else ""))
+            
+            if streaming:
+                return self._export_multiple_streaming(queries, output_path, batch_size, connections, timeout)
+            
             # 确保输出目录存在
             output_dir = os.path.dirname(output_path)
             if output_dir and not os.path.exists(output_dir):
@@ -165,11 +708,13 @@ class DatabaseToExcelExporter:
             
             # 导出到Excel
             with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
-                for sheet_name, sql in queries.items():
+                def run_query(sql, connection=None):
+                    return self.execute_query(sql, connection=connection, timeout=timeout)
+                
+                for sheet_name, df in self._iter_query_results(queries, run_query, connections):
                     logger.info(f"处理工作表: {sheet_name}")
-                    df = self.execute_query(sql)
                     if df is not None and not df.empty:
-                        df.to_excel(writer, sheet_name=sheet_name, index=False)
+                        write_dataframe_sheets(writer, df, sheet_name)
                         logger.info(f"工作表 '{sheet_name}' 导出完成: {len(df)} 行")
                     else:
                         logger.warning(f"工作表 '{sheet_name}' 查询结果为空")
@@ -180,6 +725,146 @@ class DatabaseToExcelExporter:
         except Exception as e:
             logger.error(f"多表导出失败: {e}")
             return False
+        finally:
+            self._close_query_connections(connections)
+    
+    def _close_writer(self, writer):
+        """关闭写入器；关闭失败（如磁盘写满）时删除已生成的文件，不留下不完整或只有部分格式的输出"""
+        try:
+            writer.close()
+        except BaseException:
+            writer.discard()
+            raise
+    
+    def _open_query_connections(self, count: int, consistent_snapshot: bool = False) -> list:
+        """
+        为并行查询创建独立连接
+        
+        需要一致性快照时，先建好全部连接，再依次紧接着开启快照事务，
+        各快照的时间点只相差几毫秒；期间提交的写入可能只被部分工作表看到。
+        """
+        connections = []
+        try:
+            for _ in range(count):
+                connections.append(self._create_connection())
+            if consistent_snapshot:
+                for connection in connections:
+                    with connection.cursor() as cursor:
+                        cursor.execute("SET SESSION TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+                for connection in connections:
+                    with connection.cursor() as cursor:
+                        cursor.execute("START TRANSACTION WITH CONSISTENT SNAPSHOT")
+        except Exception:
+            self._close_query_connections(connections)
+            raise
+        return connections
+    
+    def _close_query_connections(self, connections: list):
+        """结束快照事务并关闭并行查询连接"""
+        for connection in connections:
+            try:
+                connection.rollback()
+                connection.close()
+            except Exception as e:
+                logger.debug(f"关闭查询连接失败: {e}")
+    
+    def _iter_query_results(self, queries: Dict[str, str], run_query, connections: list = None):
+        """
+        按工作表顺序返回 (工作表名, run_query 的结果)
+        
+        提供 connections 时所有查询在线程池中同时执行，每个查询占用一个连接；
+        否则在 self.connection 上依次执行。
+        """
+        if not connections:
+            for sheet_name, sql in queries.items():
+                yield sheet_name, run_query(sql, connection=None)
+            return
+        
+        with ThreadPoolExecutor(max_workers=len(connections), thread_name_prefix="export-query") as pool:
+            futures = [
+                (sheet_name, pool.submit(run_query, sql, connection=connection))
+                for (sheet_name, sql), connection in zip(queries.items(), connections)
+            ]
+            for sheet_name, future in futures:
+                yield sheet_name, future.result()
+    
+    def _start_parallel_streams(self, queries: Dict[str, str], batch_size: int, connections: list,
+                                timeout: Optional[float] = None) -> list:
+        """
+        在各自的连接上同时开始流式查询，返回 [(工作表名, 列名, SpooledBatches)]
+        
+        任一查询开始失败时取消已开始的查询并抛出异常。
+        """
+        def start(sql, connection):
+            columns, batches = self.stream_query(sql, batch_size, connection=connection, timeout=timeout)
+            return columns, SpooledBatches(batches)
+        
+        started = []
+        error = None
+        with ThreadPoolExecutor(max_workers=len(connections), thread_name_prefix="export-query") as pool:
+            futures = [
+                (sheet_name, pool.submit(start, sql, connection))
+                for (sheet_name, sql), connection in zip(queries.items(), connections)
+            ]
+            for sheet_name, future in futures:
+                try:
+                    started.append((sheet_name,) + future.result())
+                except BaseException as e:
+                    error = error or e
+        if error:
+            for _, _, batches in started:
+                batches.cancel()
+            raise error
+        return started
+    
+    def _export_multiple_streaming(self, queries: Dict[str, str], output_path: str, batch_size: int,
+                                   connections: list = None, timeout: Optional[float] = None) -> bool:
+        """
+        流式导出多个查询到同一个Excel文件，每个查询一个（或多个续写）工作表
+        
+        并行时各查询同时开始，并且不等待写出、一直读到结束（见 pipeline.SpooledBatches）：
+        工作表按顺序写入，排在后面的查询若停下等待，会被服务器按 net_write_timeout 断开。
+        """
+        if connections:
+            started = self._start_parallel_streams(queries, batch_size, connections, timeout)
+            results = iter(started)
+        else:
+            started = []
+            results = ((sheet_name,) + self.stream_query(sql, batch_size, timeout=timeout)
+                       for sheet_name, sql in queries.items())
+        
+        writer = XlsxStreamWriter(output_path)
+        try:
+            for sheet_name, columns, batches in results:
+                logger.info(f"处理工作表: {sheet_name}")
+                before = writer.rows_written
+                if self.pipelined and not connections:
+                    batches = PrefetchedBatches(batches)
+                try:
+                    writer.open(columns, sheet_name)
+                    for rows in batches:
+                        writer.write_rows(rows)
+                except BaseException:
+                    batches.cancel()
+                    raise
+                if writer.rows_written > before:
+                    logger.info(f"工作表 '{sheet_name}' 导出完成: {writer.rows_written - before} 行")
+                else:
+                    logger.warning(f"工作表 '{sheet_name}' 查询结果为空")
+        except BaseException:
+            # 取消其余已开始、还没写出的并行查询（已读完的查询 close() 不做任何事）
+            for _, _, batches in started:
+                batches.close()
+            writer.discard()
+            raise
+        
+        if writer.rows_written == 0:
+            writer.discard()
+            logger.warning("所有查询结果均为空，无法导出")
+            return False
+        self._close_writer(writer)
+        logger.info(f"多表数据已成功导出到: {output_path}")
+        return True
     
     def _add_timestamp_to_path(self, file_path: str) -> str:
         """
@@ -191,7 +876,7 @@ class DatabaseToExcelExporter:
         Returns:
             str: 添加时间戳后的文件路径
         """
-        name, ext = os.path.splitext(file_path)
+        name, ext = split_extension(file_path)
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         return f"{name}_{timestamp}{ext}"
     
@@ -287,7 +972,9 @@ def main():
         logger.info("=== 开始多查询导出 ===")
         success = exporter.export_multiple_queries(
             queries=sample_queries,
-            output_path=multi_output_path
+            output_path=multi_output_path,
+            parallel=True,
+            consistent_snapshot=True
         )
         
         if success:
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地导出服务的 HTTP 层与客户端调用
+服务进程常驻，保持数据库连接、已解析的SQL查询和结果缓存；命令行客户端只需发一个请求，
+不必每次重新启动解释器、导入 pandas、解析 .sql 文件和建立数据库连接。
+
+本模块只依赖标准库：客户端脚本导入它不会加载 pandas / pymysql。
+请求与响应都是 JSON；服务只监听本机地址。
+每次启动生成随机令牌，写入只有当前用户可读的令牌文件，客户端读取后放在 X-Export-Token 请求头中；
+没有令牌或不是 application/json 的请求一律拒绝，网页无法借浏览器向本机服务发请求执行查询。
+"""
+
+import os
+import hmac
+import json
+import logging
+import secrets
+import threading
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# 默认监听地址与端口（只监听本机）
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+# 请求体大小上限
+MAX_REQUEST_BYTES = 1024 * 1024
+# 本机地址，监听其他地址时给出警告
+LOOPBACK_HOSTS = ('127.0.0.1', 'localhost', '::1')
+# 令牌请求头与令牌文件目录（用户主目录下，只有当前用户可访问）
+TOKEN_HEADER = 'X-Export-Token'
+TOKEN_DIR = os.path.join(os.path.expanduser('~'), '.excel_to_sql')
+
+
+class ServiceError(Exception):
+    """导出服务返回的错误（带 HTTP 状态码）"""
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+
+def token_file_path(port: int) -> str:
+    """导出服务令牌文件路径（每个端口一个）"""
+    return os.path.join(TOKEN_DIR, f"export_server_{port}.token")
+
+
+def write_token_file(port: int, token: str) -> str:
+    """把令牌写入只有当前用户可读写的文件，返回文件路径"""
+    os.makedirs(TOKEN_DIR, mode=0o700, exist_ok=True)
+    path = token_file_path(port)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.write(token)
+    # 文件已存在时 os.open 不修改权限
+    os.chmod(path, 0o600)
+    return path
+
+
+def read_token_file(port: int) -> Optional[str]:
+    """读取导出服务令牌，文件不存在（服务未启动）时返回None"""
+    try:
+        with open(token_file_path(port), 'r', encoding='utf-8') as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def remove_token_file(port: int):
+    """服务停止时删除令牌文件"""
+    try:
+        os.remove(token_file_path(port))
+    except FileNotFoundError:
+        pass
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    """校验令牌后把请求交给 server.service.handle(method, path, payload)，返回值按 JSON 输出"""
+
+    server_version = "ExportServer/1.0"
+
+    def _check_request(self, method: str):
+        """拒绝没有正确令牌的请求和不是 JSON 的 POST（浏览器跨站的 no-cors 请求只能是 text/plain 等类型）"""
+        token = self.headers.get(TOKEN_HEADER) or ''
+        if not hmac.compare_digest(token.encode('utf-8'), self.server.token.encode('utf-8')):
+            raise ServiceError("缺少或错误的访问令牌", 403)
+        content_type = (self.headers.get('Content-Type') or '').split(';', 1)[0].strip().lower()
+        if method == 'POST' and content_type != 'application/json':
+            raise ServiceError("请求内容类型应为 application/json", 415)
+
+    def _read_payload(self) -> Dict[str, Any]:
+        length = int(self.headers.get('Content-Length') or 0)
+        if length > MAX_REQUEST_BYTES:
+            raise ServiceError("请求内容过大", 413)
+        if not length:
+            return {}
+        try:
+            payload = json.loads(self.rfile.read(length).decode('utf-8'))
+        except ValueError as e:
+            raise ServiceError(f"请求不是有效的JSON: {e}")
+        if not isinstance(payload, dict):
+            raise ServiceError("请求内容应为JSON对象")
+        return payload
+
+    def _send_json(self, status: int, body: Dict[str, Any]):
+        data = json.dumps(body, ensure_ascii=False, default=str).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _dispatch(self, method: str):
+        try:
+            self._check_request(method)
+            payload = self._read_payload() if method == 'POST' else {}
+            result = self.server.service.handle(method, self.path.split('?', 1)[0], payload)
+            self._send_json(200, result)
+        except ServiceError as e:
+            self._send_json(e.status, {'ok': False, 'error': str(e)})
+        except Exception as e:
+            logger.exception(f"处理请求失败 {method} {self.path}")
+            self._send_json(500, {'ok': False, 'error': str(e)})
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def log_message(self, format, *args):
+        logger.info("%s - %s", self.address_string(), format % args)
+
+
+def create_server(service, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                  token: Optional[str] = None) -> ThreadingHTTPServer:
+    """
+    创建导出服务（每个请求一个线程）
+
+    Args:
+        service: 提供 handle(method, path, payload) -> dict 的对象，出错时抛出 ServiceError
+        host: 监听地址，默认只监听本机
+        port: 端口，0 表示由系统分配
+        token: 访问令牌，为None时随机生成（见 server.token，由调用方写入令牌文件）
+    """
+    if host not in LOOPBACK_HOSTS:
+        logger.warning(f"导出服务监听非本机地址 {host}，令牌以明文传输，请确认网络环境可信")
+    server = ThreadingHTTPServer((host, port), _RequestHandler)
+    server.daemon_threads = True
+    server.service = service
+    server.token = token or secrets.token_urlsafe(32)
+    return server
+
+
+def start_server_thread(server: ThreadingHTTPServer) -> threading.Thread:
+    """在后台线程中运行服务（用于测试或嵌入其他程序）"""
+    thread = threading.Thread(target=server.serve_forever, name="export-server", daemon=True)
+    thread.start()
+    return thread
+
+
+def call_server(path: str, payload: Optional[Dict[str, Any]] = None, host: str = DEFAULT_HOST,
+                port: int = DEFAULT_PORT, timeout: Optional[float] = None,
+                token: Optional[str] = None) -> Dict[str, Any]:
+    """
+    调用导出服务：有 payload 时 POST，否则 GET
+
+    Args:
+        token: 访问令牌，为None时读取本机该端口的令牌文件
+
+    Raises:
+        ConnectionError: 服务未启动或无法连接
+        ServiceError: 服务返回错误
+    """
+    url = f"http://{host}:{port}{path}"
+    data = None
+    headers = {TOKEN_HEADER: token or read_token_file(port) or ''}
+    if payload is not None:
+        data = json.dumps(payload, ensure_ascii=False, default=str).encode('utf-8')
+        headers['Content-Type'] = 'application/json; charset=utf-8'
+    request = urllib.request.Request(url, data=data, headers=headers, method='POST' if data is not None else 'GET')
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return json.loads(response.read().decode('utf-8'))
+    except urllib.error.HTTPError as e:
+        try:
+            message = json.loads(e.read().decode('utf-8')).get('error') or e.reason
+        except ValueError:
+            message = e.reason
+        raise ServiceError(message, e.code)
+    except urllib.error.URLError as e:
+        raise ConnectionError(f"无法连接导出服务 {host}:{port}: {e.reason}")
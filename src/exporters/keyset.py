@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+键集分页导出与断点续传
+按唯一键分页读取：WHERE 键 > 上一页最后的键 ORDER BY 键 LIMIT n（不使用 OFFSET，越往后翻页不会越慢），
+每页是一条独立的短查询，不会长时间占用快照和读锁。
+csv / csv.gz 每写完一页记录一次检查点（最后的键、已写行数、文件大小），失败后重跑从检查点继续。
+"""
+
+import os
+import json
+import hashlib
+import logging
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from pymysql.converters import escape_item
+
+from src.exporters.sql_params import BoundQuery, to_json_value, trim_sql
+from src.exporters.writers import APPENDABLE_FORMATS, create_writer
+
+logger = logging.getLogger(__name__)
+
+# 每页行数
+DEFAULT_PAGE_SIZE = 50000
+# 检查点保存目录，每个任务一个文件
+CHECKPOINT_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    'data', 'export_checkpoints'
+)
+
+
+def build_page_sql(sql, column: str, last_key=None, page_size: int = DEFAULT_PAGE_SIZE):
+    """
+    生成取下一页的查询（BoundQuery 包装后保留参数）
+
+    键列需要是查询结果中的唯一列（如主键）；有重复值时，跨页的同值行会被跳过。
+    """
+    if isinstance(sql, BoundQuery):
+        return sql.wrap(lambda inner_sql: build_page_sql(inner_sql, column, last_key, page_size))
+    inner = trim_sql(sql)
+    where = f"\nWHERE page_src.`{column}` > {escape_item(last_key, 'utf8mb4')}" if last_key is not None else ""
+    return (f"SELECT * FROM (\n{inner}\n) AS page_src{where}\n"
+            f"ORDER BY page_src.`{column}`\nLIMIT {int(page_size)}")
+
+
+def sql_fingerprint(sql) -> str:
+    """查询指纹：查询或参数变化后旧检查点失效"""
+    return hashlib.sha256(' '.join(str(sql).split()).encode('utf-8')).hexdigest()[:16]
+
+
+class CheckpointStore:
+    """键集分页导出的检查点存储"""
+
+    def __init__(self, checkpoint_dir: str = CHECKPOINT_DIR):
+        self.checkpoint_dir = checkpoint_dir
+
+    def _path(self, job_name: str) -> str:
+        safe_name = "".join(ch if ch.isalnum() or ch in '-_.' else '_' for ch in job_name)
+        return os.path.join(self.checkpoint_dir, f"{safe_name}.json")
+
+    def load(self, job_name: str) -> Optional[Dict[str, Any]]:
+        """读取检查点；没有未完成的导出时返回None"""
+        try:
+            with open(self._path(job_name), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def save(self, job_name: str, state: Dict[str, Any]):
+        """保存检查点（先写临时文件再替换）"""
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+        path = self._path(job_name)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        data = dict(state, last_key=to_json_value(state.get('last_key')),
+                    updated_at=datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+
+    def clear(self, job_name: str):
+        """导出完成后删除检查点"""
+        path = self._path(job_name)
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def _resume_state(store: CheckpointStore, job_name: str, fingerprint: str, column: str,
+                  fmt: str) -> Optional[Dict[str, Any]]:
+    """检查点与本次导出一致、输出文件完好时返回检查点，否则返回None"""
+    state = store.load(job_name)
+    if not state:
+        return None
+    if (state.get('sql') != fingerprint or state.get('column') != column or state.get('format') != fmt):
+        logger.warning(f"任务 {job_name} 的查询或格式已变化，忽略旧检查点，重新导出")
+        return None
+    path = state.get('output_path')
+    if not path or not os.path.exists(path) or os.path.getsize(path) < state.get('file_size', 0):
+        logger.warning(f"任务 {job_name} 的输出文件缺失或不完整，忽略旧检查点，重新导出")
+        return None
+    return state
+
+
+def run_keyset_export(fetch_page: Callable[[Any], Tuple[List[str], List[Sequence]]], sql, column: str,
+                      output_path: str, fmt: str, job_name: str, page_size: int = DEFAULT_PAGE_SIZE,
+                      store: CheckpointStore = None, sheet_name: str = "Sheet1") -> Tuple[int, str]:
+    """
+    按键集分页导出；csv / csv.gz 支持断点续传
+
+    Args:
+        fetch_page: 执行一页查询的函数，返回 (列名, 行列表)
+        sql: 原查询（或 BoundQuery）
+        column: 分页键列名（唯一）
+        output_path: 输出文件路径；从检查点续传时使用检查点记录的路径
+        fmt: 导出格式
+        job_name: 任务名（检查点文件名）
+        page_size: 每页行数
+        store: 检查点存储
+        sheet_name: 工作表名称（仅xlsx）
+
+    Returns:
+        (导出总行数, 实际输出路径)
+    """
+    store = store or CheckpointStore()
+    resumable = fmt in APPENDABLE_FORMATS
+    fingerprint = sql_fingerprint(sql)
+    state = _resume_state(store, job_name, fingerprint, column, fmt) if resumable else None
+
+    if state:
+        output_path = state['output_path']
+        last_key, total = state['last_key'], state['rows']
+        # 截掉上次中断时检查点之后写了一半的内容
+        with open(output_path, 'r+b') as f:
+            f.truncate(state['file_size'])
+        logger.info(f"从检查点续传: {column} > {last_key}，已导出 {total} 行 -> {output_path}")
+    else:
+        if not resumable:
+            logger.warning(f"{fmt} 格式不支持断点续传，只分页读取")
+        last_key, total = None, 0
+
+    writer = None
+    key_index = None
+    try:
+        while True:
+            columns, rows = fetch_page(build_page_sql(sql, column, last_key, page_size))
+            if key_index is None:
+                if column not in columns:
+                    raise ValueError(f"查询结果中没有分页键列: {column}")
+                key_index = list(columns).index(column)
+            if not rows:
+                break
+
+            if resumable:
+                # 每页单独打开、关闭文件，检查点处的文件是完整的（gzip 每页一个压缩段）
+                writer = create_writer(fmt, output_path, append=total > 0)
+                writer.open(columns)
+                writer.write_rows(rows)
+                writer.close()
+                writer = None
+            else:
+                if writer is None:
+                    writer = create_writer(fmt, output_path, sheet_name)
+                    writer.open(columns)
+                writer.write_rows(rows)
+
+            total += len(rows)
+            last_key = rows[-1][key_index]
+            if resumable:
+                store.save(job_name, {
+                    'sql': fingerprint,
+                    'column': column,
+                    'format': fmt,
+                    'output_path': output_path,
+                    'last_key': last_key,
+                    'rows': total,
+                    'file_size': os.path.getsize(output_path),
+                })
+            logger.info(f"已导出 {total} 行（{column} 到 {last_key}）")
+            if len(rows) < page_size:
+                break
+    except BaseException:
+        if writer is not None:
+            writer.discard()
+        raise
+
+    if writer is not None:
+        if total:
+            writer.close()
+        else:
+            writer.discard()
+    store.clear(job_name)
+    return total, output_path
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+读取/写入流水线
+后台线程从服务端游标预取下一批数据，主线程同时写入上一批，两者通过有界队列衔接；
+导出耗时接近 max(读取, 写入) 而不是两者之和。
+
+同时打开、但要排队依次写出的多个查询（分片、并行工作表）使用 SpooledBatches：
+读取线程不等待写入，读到的批次超过内存上限后暂存到临时文件，
+排在后面的查询不会因长时间不读取而被服务器按 net_write_timeout 断开。
+"""
+
+import time
+import queue
+import pickle
+import logging
+import tempfile
+import threading
+from collections import deque
+from typing import List
+
+logger = logging.getLogger(__name__)
+
+# 队列中最多缓存的批次数（加上正在写入的一批，内存中最多 DEFAULT_PREFETCH_DEPTH + 2 批）
+DEFAULT_PREFETCH_DEPTH = 2
+# 取消时等待读取线程退出的秒数
+STOP_TIMEOUT_SECONDS = 30
+# SpooledBatches 在内存中保留的批次数，更多的批次写入临时文件
+DEFAULT_SPOOL_MEMORY_BATCHES = 8
+
+_END = object()
+
+
+class _FetchError:
+    """读取线程中的异常，交给主线程重新抛出"""
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+class _Spilled:
+    """写入临时文件的一批数据的位置"""
+
+    def __init__(self, offset: int, size: int):
+        self.offset = offset
+        self.size = size
+
+
+class PrefetchedBatches:
+    """
+    包装一个批次迭代器（如 _StreamBatches），在后台线程中预取
+
+    对外接口与被包装的迭代器一致：迭代、cancel()、close()。
+    读取线程中的异常（包括查询超时）在主线程的下一次迭代中抛出。
+    """
+
+    def __init__(self, batches, depth: int = DEFAULT_PREFETCH_DEPTH):
+        """
+        Args:
+            batches: 批次迭代器，需要提供 cancel()；提供 interrupt() 时取消会先中断正在进行的读取
+            depth: 预取队列长度
+        """
+        self._batches = batches
+        self._queue = queue.Queue(maxsize=max(depth, 1))
+        self._stop = threading.Event()
+        self._finished = False
+        # 统计：主线程等待数据的时间、读取线程等待队列空位的时间
+        self.wait_seconds = 0.0
+        self.blocked_seconds = 0.0
+        self._thread = threading.Thread(target=self._fetch, name="export-prefetch", daemon=True)
+        self._thread.start()
+
+    def _put(self, item) -> bool:
+        """放入队列；队列满时等待，被取消则放弃"""
+        start = time.perf_counter()
+        try:
+            while not self._stop.is_set():
+                try:
+                    self._queue.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+        finally:
+            self.blocked_seconds += time.perf_counter() - start
+
+    def _fetch(self):
+        try:
+            for rows in self._batches:
+                if not self._put(rows):
+                    return
+            self._put(_END)
+        except BaseException as e:
+            if not self._stop.is_set():
+                self._put(_FetchError(e))
+
+    def _get(self):
+        return self._queue.get()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> List[tuple]:
+        if self._finished:
+            raise StopIteration
+        start = time.perf_counter()
+        item = self._get()
+        self.wait_seconds += time.perf_counter() - start
+        if item is _END:
+            self._finished = True
+            raise StopIteration
+        if isinstance(item, _FetchError):
+            self._finished = True
+            raise item.error
+        return item
+
+    def _stop_fetching(self):
+        """通知读取线程退出并等待"""
+        self._stop.set()
+        # 清空队列，让阻塞在 put 上的读取线程尽快看到停止标志
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+        self._thread.join(STOP_TIMEOUT_SECONDS)
+        if self._thread.is_alive():
+            logger.warning("预取线程未能及时退出")
+
+    def cancel(self):
+        """取消查询：中断正在进行的读取，等读取线程退出后再关闭游标（游标不能被两个线程同时使用）"""
+        self._finished = True
+        interrupt = getattr(self._batches, 'interrupt', None)
+        if interrupt and self._thread.is_alive():
+            interrupt()
+        self._stop_fetching()
+        self._batches.cancel()
+
+    def close(self):
+        """读完后关闭；未读完时等同于 cancel()"""
+        if not self._finished:
+            self.cancel()
+
+
+class SpooledBatches(PrefetchedBatches):
+    """
+    不限长度的预取：读取线程一直读到查询结束，不等待消费
+
+    内存中最多保留 memory_batches 批，之后的批次序列化后追加到临时文件，按原顺序取出；
+    读完或取消时删除临时文件。对外接口与 PrefetchedBatches 一致。
+    """
+
+    def __init__(self, batches, memory_batches: int = DEFAULT_SPOOL_MEMORY_BATCHES):
+        """
+        Args:
+            batches: 批次迭代器，需要提供 cancel()；提供 interrupt() 时取消会先中断正在进行的读取
+            memory_batches: 内存中保留的批次数
+        """
+        self._items = deque()
+        self._ready = threading.Condition()
+        self._memory_batches = max(memory_batches, 1)
+        self._in_memory = 0
+        self._spool = None
+        # 统计：写入临时文件的批次数
+        self.spilled_batches = 0
+        super().__init__(batches)
+
+    def _put(self, item) -> bool:
+        """放入队列，从不等待；内存中的批次达到上限时写入临时文件"""
+        if self._stop.is_set():
+            return False
+        spill = isinstance(item, list) and self._in_memory >= self._memory_batches
+        data = pickle.dumps(item, protocol=pickle.HIGHEST_PROTOCOL) if spill else None
+        with self._ready:
+            if self._stop.is_set():
+                return False
+            if spill:
+                if self._spool is None:
+                    self._spool = tempfile.TemporaryFile(prefix="export_spool_")
+                self._spool.seek(0, 2)
+                item = _Spilled(self._spool.tell(), len(data))
+                self._spool.write(data)
+                self.spilled_batches += 1
+            elif isinstance(item, list):
+                self._in_memory += 1
+            self._items.append(item)
+            self._ready.notify()
+        return True
+
+    def _get(self):
+        with self._ready:
+            while not self._items:
+                self._ready.wait()
+            item = self._items.popleft()
+            if isinstance(item, _Spilled):
+                self._spool.seek(item.offset)
+                data = self._spool.read(item.size)
+            elif isinstance(item, list):
+                self._in_memory -= 1
+        if isinstance(item, _Spilled):
+            return pickle.loads(data)
+        if item is _END or isinstance(item, _FetchError):
+            self._close_spool()
+        return item
+
+    def _close_spool(self):
+        with self._ready:
+            if self._spool is not None:
+                self._spool.close()
+                self._spool = None
+
+    def _stop_fetching(self):
+        """通知读取线程退出并等待，删除临时文件"""
+        self._stop.set()
+        self._thread.join(STOP_TIMEOUT_SECONDS)
+        if self._thread.is_alive():
+            logger.warning("预取线程未能及时退出")
+        with self._ready:
+            self._items.clear()
+            self._in_memory = 0
+        self._close_spool()
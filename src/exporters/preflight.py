@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+导出前预检
+对即将执行的SQL运行 EXPLAIN FORMAT=JSON，估算扫描行数、结果行数与读取数据量，
+标记大表全表扫描；超过阈值时要求确认或拒绝执行，并记录估算值与实际值供日后校准阈值。
+"""
+
+import os
+import json
+import hashlib
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 默认阈值（可在 config.py 的 PREFLIGHT_THRESHOLDS 中覆盖）
+DEFAULT_THRESHOLDS = {
+    'confirm_rows_examined': 5_000_000,     # 估算扫描行数超过该值时需要确认
+    'refuse_rows_examined': 200_000_000,    # 估算扫描行数超过该值时拒绝执行
+    'confirm_result_rows': 1_000_000,       # 估算结果行数超过该值时需要确认
+    'full_scan_rows': 1_000_000,            # 全表扫描行数超过该值的表视为"大表全表扫描"
+}
+# 估算与实际执行结果的记录文件
+HISTORY_FILE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    'data', 'preflight_history.jsonl'
+)
+# 全表扫描 / 全索引扫描
+FULL_SCAN_ACCESS_TYPES = ('ALL', 'index')
+# 包裹实际执行计划的节点（排序、分组、去重、窗口函数）
+WRAPPER_KEYS = ('ordering_operation', 'grouping_operation', 'duplicates_removal', 'windowing')
+SIZE_UNITS = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3, 'T': 1024 ** 4}
+
+
+def parse_size(text) -> int:
+    """解析 EXPLAIN 中的数据量，如 "24K"、"1G"、"512" """
+    if text is None:
+        return 0
+    text = str(text).strip()
+    unit = SIZE_UNITS.get(text[-1:].upper())
+    try:
+        return int(float(text[:-1]) * unit) if unit else int(float(text))
+    except ValueError:
+        return 0
+
+
+def _to_number(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class _PlanEstimate:
+    """遍历执行计划时累积的估算值"""
+
+    def __init__(self):
+        self.rows_examined = 0.0
+        self.bytes_read = 0
+        self.tables = []
+        self.full_scans = []
+
+    def add_table(self, table: Dict[str, Any], loops: float):
+        name = table.get('table_name', '?')
+        access_type = table.get('access_type', '')
+        per_scan = _to_number(table.get('rows_examined_per_scan'))
+        cost_info = table.get('cost_info', {})
+        self.rows_examined += per_scan * max(loops, 1)
+        self.bytes_read += parse_size(cost_info.get('data_read_per_join'))
+        self.tables.append({'table': name, 'access_type': access_type, 'rows_per_scan': int(per_scan)})
+        if access_type in FULL_SCAN_ACCESS_TYPES:
+            self.full_scans.append({'table': name, 'access_type': access_type, 'rows': int(per_scan),
+                                    'loops': int(max(loops, 1))})
+
+
+def _walk_block(block: Dict[str, Any], estimate: _PlanEstimate, loops: float = 1) -> float:
+    """
+    遍历一个查询块，返回该块估算输出的行数
+
+    嵌套循环连接中，后面的表按前面已连接的行数重复扫描。
+    """
+    for key in WRAPPER_KEYS:
+        if key in block:
+            return _walk_block(block[key], estimate, loops)
+
+    if 'union_result' in block:
+        produced = 0.0
+        for spec in block['union_result'].get('query_specifications', []):
+            produced += _walk_block(spec.get('query_block', {}), estimate, loops)
+        return produced
+
+    if 'nested_loop' in block:
+        entries = [item['table'] for item in block['nested_loop'] if 'table' in item]
+    elif 'table' in block:
+        entries = [block['table']]
+    else:
+        entries = []
+
+    produced = 1.0
+    join_rows = 1.0
+    for table in entries:
+        if 'materialized_from_subquery' in table:
+            _walk_block(table['materialized_from_subquery'].get('query_block', {}), estimate, loops)
+        estimate.add_table(table, join_rows * loops)
+        join_rows = _to_number(table.get('rows_produced_per_join')) or join_rows
+        produced = join_rows
+
+    # 相关子查询对外层每一行执行一次
+    for key in ('attached_subqueries', 'optimized_away_subqueries'):
+        for subquery in block.get(key, []):
+            sub_loops = produced if subquery.get('dependent') else 1
+            _walk_block(subquery.get('query_block', {}), estimate, sub_loops * loops)
+    for entry in entries:
+        for subquery in entry.get('attached_subqueries', []):
+            sub_loops = produced if subquery.get('dependent') else 1
+            _walk_block(subquery.get('query_block', {}), estimate, sub_loops * loops)
+    return produced
+
+
+def estimate_plan(plan: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    根据 EXPLAIN FORMAT=JSON 的结果估算执行开销
+
+    Returns:
+        Dict: rows_examined、result_rows、bytes_read、query_cost、tables、full_scans
+    """
+    block = plan.get('query_block', {})
+    estimate = _PlanEstimate()
+    result_rows = _walk_block(block, estimate)
+    return {
+        'rows_examined': int(estimate.rows_examined),
+        'result_rows': int(result_rows),
+        'bytes_read': estimate.bytes_read,
+        'query_cost': _to_number(block.get('cost_info', {}).get('query_cost')),
+        'tables': estimate.tables,
+        'full_scans': estimate.full_scans,
+    }
+
+
+def evaluate_estimate(estimate: Dict[str, Any], thresholds: Optional[Dict[str, int]] = None):
+    """
+    按阈值判断是否可以直接执行
+
+    Returns:
+        Tuple[str, List[str]]: (ok / confirm / refuse, 原因列表)
+    """
+    limits = dict(DEFAULT_THRESHOLDS, **(thresholds or {}))
+    reasons = []
+    verdict = 'ok'
+
+    if estimate['rows_examined'] > limits['refuse_rows_examined']:
+        return 'refuse', [f"估算扫描 {estimate['rows_examined']:,} 行，超过拒绝阈值 {limits['refuse_rows_examined']:,}"]
+
+    if estimate['rows_examined'] > limits['confirm_rows_examined']:
+        verdict = 'confirm'
+        reasons.append(f"估算扫描 {estimate['rows_examined']:,} 行，超过确认阈值 {limits['confirm_rows_examined']:,}")
+    if estimate['result_rows'] > limits['confirm_result_rows']:
+        verdict = 'confirm'
+        reasons.append(f"估算结果 {estimate['result_rows']:,} 行，超过确认阈值 {limits['confirm_result_rows']:,}")
+    for scan in estimate['full_scans']:
+        if scan['rows'] * scan['loops'] >= limits['full_scan_rows']:
+            verdict = 'confirm'
+            kind = '全表扫描' if scan['access_type'] == 'ALL' else '全索引扫描'
+            loops = f" × {scan['loops']:,} 次" if scan['loops'] > 1 else ''
+            reasons.append(f"表 {scan['table']} {kind}（约 {scan['rows']:,} 行{loops}）")
+    return verdict, reasons
+
+
+def run_preflight(connection, sql: str, thresholds: Optional[Dict[str, int]] = None,
+                  label: Optional[str] = None) -> Dict[str, Any]:
+    """
+    对SQL运行 EXPLAIN FORMAT=JSON 并评估
+
+    Args:
+        connection: pymysql 连接
+        sql: 即将执行的SQL
+        thresholds: 阈值，未提供的项使用 DEFAULT_THRESHOLDS
+        label: 记录用的名称（通常为查询名）
+
+    Returns:
+        Dict: estimate_plan 的结果，另含 verdict、reasons、label、sql_hash
+    """
+    with connection.cursor() as cursor:
+        cursor.execute("EXPLAIN FORMAT=JSON " + sql.strip().rstrip(';'))
+        plan = json.loads(cursor.fetchone()[0])
+    result = estimate_plan(plan)
+    result['verdict'], result['reasons'] = evaluate_estimate(result, thresholds)
+    result['label'] = label
+    result['sql_hash'] = hashlib.sha256(' '.join(sql.split()).encode('utf-8')).hexdigest()[:16]
+    return result
+
+
+def format_bytes(size: int) -> str:
+    """字节数格式化为 KB/MB/GB"""
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if size < 1024:
+            return f"{size:.0f}{unit}" if unit == 'B' else f"{size:.1f}{unit}"
+        size /= 1024
+    return f"{size:.1f}TB"
+
+
+def print_preflight(result: Dict[str, Any]):
+    """打印预检结果"""
+    print("🔎 预检（EXPLAIN）:")
+    print(f"   估算扫描行数: {result['rows_examined']:,}")
+    print(f"   估算结果行数: {result['result_rows']:,}")
+    print(f"   估算读取数据量: {format_bytes(result['bytes_read'])}")
+    print(f"   优化器成本: {result['query_cost']:,.0f}")
+    for reason in result['reasons']:
+        print(f"   ⚠️ {reason}")
+
+
+def confirm_preflight(result: Dict[str, Any], assume_yes: bool = False) -> bool:
+    """
+    根据预检结果决定是否继续
+
+    Args:
+        result: run_preflight 的结果
+        assume_yes: 需要确认时自动确认（非交互运行）
+
+    Returns:
+        bool: 是否继续执行
+    """
+    print_preflight(result)
+    if result['verdict'] == 'refuse':
+        print("❌ 预检未通过，拒绝执行（可在 config.py 的 PREFLIGHT_THRESHOLDS 中调整阈值，或缩小查询范围）")
+        return False
+    if result['verdict'] == 'confirm':
+        if assume_yes:
+            print("⚠️ 超过确认阈值，已按 --yes 继续执行")
+            return True
+        try:
+            answer = input("查询开销较大，确认继续执行？[y/N]: ").strip().lower()
+        except EOFError:
+            answer = ''
+        return answer in ('y', 'yes')
+    return True
+
+
+def record_preflight(result: Dict[str, Any], actual_rows: Optional[int] = None,
+                     elapsed_seconds: Optional[float] = None, executed: bool = True,
+                     history_file: str = HISTORY_FILE):
+    """
+    追加一条"估算 vs 实际"记录（一行一个JSON），记录失败不影响导出
+
+    Args:
+        result: run_preflight 的结果
+        actual_rows: 实际导出行数
+        elapsed_seconds: 实际执行耗时（秒）
+        executed: 是否实际执行（被拒绝或取消时为False）
+    """
+    record = {
+        'time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'label': result.get('label'),
+        'sql_hash': result.get('sql_hash'),
+        'verdict': result.get('verdict'),
+        'executed': executed,
+        'estimated_rows_examined': result.get('rows_examined'),
+        'estimated_result_rows': result.get('result_rows'),
+        'estimated_bytes_read': result.get('bytes_read'),
+        'query_cost': result.get('query_cost'),
+        'full_scans': [scan['table'] for scan in result.get('full_scans', [])],
+        'actual_rows': actual_rows,
+        'elapsed_seconds': round(elapsed_seconds, 3) if elapsed_seconds is not None else None,
+    }
+    try:
+        os.makedirs(os.path.dirname(history_file), exist_ok=True)
+        with open(history_file, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+    except Exception as e:
+        logger.warning(f"预检记录写入失败: {e}")
+
+
+def load_preflight_history(history_file: str = HISTORY_FILE) -> List[Dict[str, Any]]:
+    """读取预检记录，用于对比估算与实际值"""
+    if not os.path.exists(history_file):
+        return []
+    records = []
+    with open(history_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    continue
+    return records
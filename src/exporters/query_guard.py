@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+查询超时与服务端取消
+为一次查询设置 MAX_EXECUTION_TIME 服务端超时，并用看门狗线程兜底：
+超时或按下 Ctrl-C 时，通过另一个连接执行 KILL QUERY，避免查询在服务端继续运行占用连接和 InnoDB 资源。
+"""
+
+import logging
+import threading
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# 看门狗在服务端超时之后再等待的秒数（MAX_EXECUTION_TIME 只对只读 SELECT 生效，其余语句靠看门狗取消）
+WATCHDOG_GRACE_SECONDS = 5
+# MySQL 超时/被 KILL 时的错误码
+ER_QUERY_TIMEOUT = 3024
+ER_QUERY_INTERRUPTED = 1317
+
+
+class QueryTimeoutError(Exception):
+    """查询超过时间限制，已在服务端取消"""
+
+
+def is_timeout_error(error: Exception) -> bool:
+    """判断异常是否由查询超时或被取消引起"""
+    args = getattr(error, 'args', ())
+    return bool(args) and args[0] in (ER_QUERY_TIMEOUT, ER_QUERY_INTERRUPTED)
+
+
+class QueryGuard:
+    """
+    查询守卫
+
+    用法:
+        with QueryGuard(connection, timeout, create_side_connection):
+            cursor.execute(sql)
+
+    流式查询需要在读完结果后才结束守卫，可以直接调用 start() / finish()。
+    """
+
+    def __init__(self, connection, timeout: Optional[float], connection_factory: Callable,
+                 grace: float = WATCHDOG_GRACE_SECONDS):
+        """
+        Args:
+            connection: 执行查询的 pymysql 连接
+            timeout: 超时秒数，None 或 0 表示不限制（仍支持 Ctrl-C 取消）
+            connection_factory: 创建旁路连接的函数，用于发送 KILL QUERY
+            grace: 看门狗在超时之后额外等待的秒数
+        """
+        self.connection = connection
+        self.timeout = timeout
+        self.connection_factory = connection_factory
+        self.grace = grace
+        self.timed_out = False
+        self._thread_id = None
+        self._timer = None
+        self._killed = False
+        self._lock = threading.Lock()
+
+    def start(self):
+        """设置服务端超时并启动看门狗"""
+        self._thread_id = self.connection.thread_id()
+        if not self.timeout:
+            return
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"SET SESSION max_execution_time = {int(self.timeout * 1000)}")
+        self._timer = threading.Timer(self.timeout + self.grace, self._on_timeout)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _on_timeout(self):
+        self.timed_out = True
+        logger.warning(f"查询超过 {self.timeout} 秒，取消服务端查询 (连接 {self._thread_id})")
+        self.kill()
+
+    def kill(self):
+        """通过旁路连接取消正在执行的查询（只取消查询，不断开原连接）"""
+        with self._lock:
+            if self._killed or self._thread_id is None:
+                return
+            self._killed = True
+        try:
+            side = self.connection_factory()
+            try:
+                with side.cursor() as cursor:
+                    cursor.execute(f"KILL QUERY {int(self._thread_id)}")
+            finally:
+                side.close()
+            logger.info(f"已取消服务端查询 (连接 {self._thread_id})")
+        except Exception as e:
+            logger.error(f"取消服务端查询失败 (连接 {self._thread_id}): {e}")
+
+    def finish(self, cancelled: bool = False, reusable: bool = True):
+        """
+        结束守卫：停止看门狗并恢复会话超时设置
+
+        Args:
+            cancelled: 查询被中断（Ctrl-C 或写入失败）时为True，先取消服务端查询
+            reusable: 连接是否还能继续使用；读结果途中被 Ctrl-C 打断的连接可能残留半个数据包，
+                      不再恢复会话设置，由调用方关闭
+        """
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if cancelled:
+            self.kill()
+        if self.timeout and reusable:
+            try:
+                with self.connection.cursor() as cursor:
+                    cursor.execute("SET SESSION max_execution_time = 0")
+            except Exception as e:
+                logger.debug(f"恢复 max_execution_time 失败: {e}")
+
+    def check(self, error: Exception):
+        """查询出错时调用：若由超时导致，转换为 QueryTimeoutError"""
+        if self.timeout and (self.timed_out or is_timeout_error(error)):
+            raise QueryTimeoutError(f"查询超过 {self.timeout} 秒的时间限制，已在服务端取消") from error
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        interrupted = exc_type is not None and not issubclass(exc_type, Exception)
+        self.finish(cancelled=interrupted, reusable=not interrupted)
+        if exc_val is not None and isinstance(exc_val, Exception):
+            self.check(exc_val)
+        return False
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+查询结果缓存
+以 SQL 文本 + 所读各表的数据版本戳为键，将查询结果保存为本地 Parquet 文件。
+导入程序写表时会更新版本戳，缓存自动失效；命中时不访问数据库。
+"""
+
+import os
+import re
+import json
+import hashlib
+import logging
+from typing import Optional, Set, Tuple
+
+import pandas as pd
+
+from src.shared.table_versions import get_table_versions
+
+logger = logging.getLogger(__name__)
+
+# 缓存目录
+CACHE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    'data', 'query_cache'
+)
+# 缓存总大小上限，超过后按最近使用时间淘汰
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+
+# 结果随时间或每次执行变化的函数，包含这些函数的查询不缓存
+NONDETERMINISTIC_PATTERN = re.compile(
+    r'\b(NOW|CURDATE|CURTIME|CURRENT_DATE|CURRENT_TIME|CURRENT_TIMESTAMP|SYSDATE|'
+    r'UTC_DATE|UTC_TIME|UTC_TIMESTAMP|UNIX_TIMESTAMP|RAND|UUID|UUID_SHORT|CONNECTION_ID|LAST_INSERT_ID)\b',
+    re.IGNORECASE
+)
+TABLE_KEYWORD_PATTERN = re.compile(r'\b(?:FROM|JOIN)\s+', re.IGNORECASE)
+TABLE_NAME_PATTERN = re.compile(r'(`[^`]+`|[\w$]+)(?:\s*\.\s*(`[^`]+`|[\w$]+))?')
+ALIAS_PATTERN = re.compile(r'\s+(?:AS\s+)?(`[^`]+`|[\w$]+)', re.IGNORECASE)
+# WITH 定义的公用表表达式：名称 AS (
+CTE_PATTERN = re.compile(r'(`[^`]+`|[\w$]+)\s+AS\s*\(', re.IGNORECASE)
+# 表名后面可能紧跟的关键字（不是别名）
+CLAUSE_KEYWORDS = {
+    'WHERE', 'JOIN', 'LEFT', 'RIGHT', 'INNER', 'OUTER', 'CROSS', 'NATURAL', 'STRAIGHT_JOIN',
+    'ON', 'USING', 'GROUP', 'ORDER', 'LIMIT', 'HAVING', 'UNION', 'WINDOW', 'FOR', 'LOCK',
+    'USE', 'FORCE', 'IGNORE', 'PARTITION', 'INTO', 'LATERAL',
+}
+
+
+def strip_sql_comments(sql: str) -> str:
+    """去掉 -- 行注释与 /* */ 块注释"""
+    sql = re.sub(r'/\*.*?\*/', ' ', sql, flags=re.DOTALL)
+    return re.sub(r'--[^\n]*', ' ', sql)
+
+
+def extract_tables(sql: str) -> Set[str]:
+    """
+    提取查询读取的表名（小写，不含库名）
+
+    识别 FROM / JOIN 后的表名以及 FROM a, b 形式的逗号列表；子查询由其内部的 FROM 识别。
+    WITH 定义的公用表表达式不是表，不计入。
+    """
+    sql = strip_sql_comments(sql)
+    ctes = set()
+    if re.search(r'\bWITH\b', sql, re.IGNORECASE):
+        ctes = {name.strip('`').lower() for name in CTE_PATTERN.findall(sql)}
+    tables = set()
+    for match in TABLE_KEYWORD_PATTERN.finditer(sql):
+        rest = sql[match.end():]
+        while True:
+            table = TABLE_NAME_PATTERN.match(rest)
+            if not table:
+                break
+            name = (table.group(2) or table.group(1)).strip('`')
+            if name.upper() in CLAUSE_KEYWORDS or name.upper() in ('SELECT', 'DUAL'):
+                break
+            tables.add(name.lower())
+            rest = rest[table.end():]
+            alias = ALIAS_PATTERN.match(rest)
+            if alias and alias.group(1).upper() not in CLAUSE_KEYWORDS:
+                rest = rest[alias.end():]
+            comma = re.match(r'\s*,\s*', rest)
+            if not comma:
+                break
+            rest = rest[comma.end():]
+    return tables - ctes
+
+
+def normalize_sql(sql: str) -> str:
+    """压缩空白，使仅格式不同的同一查询得到相同的缓存键"""
+    return ' '.join(strip_sql_comments(sql).split()).rstrip(';')
+
+
+def is_cacheable(sql: str) -> bool:
+    """只缓存结果确定的只读查询"""
+    text = strip_sql_comments(sql).lstrip().upper()
+    if not (text.startswith('SELECT') or text.startswith('WITH')):
+        return False
+    if NONDETERMINISTIC_PATTERN.search(text):
+        return False
+    return bool(extract_tables(sql))
+
+
+class ResultCache:
+    """
+    基于本地 Parquet 文件的查询结果缓存
+
+    用法:
+        cache = ResultCache()
+        key, df = cache.lookup(sql)
+        if df is None:
+            df = pd.read_sql(sql, connection)
+            cache.put(key, df)
+
+    缓存键在查询之前计算：查询执行期间导入程序更新了版本戳时，结果记在旧版本下，不会被当作新数据命中。
+    """
+
+    def __init__(self, cache_dir: str = CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def make_key(self, sql: str) -> Optional[str]:
+        """计算缓存键；不可缓存的查询返回None"""
+        if not is_cacheable(sql):
+            return None
+        payload = json.dumps({
+            'sql': normalize_sql(sql),
+            'versions': get_table_versions(extract_tables(sql)),
+        }, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.parquet")
+
+    def contains(self, sql: str) -> bool:
+        """是否有可用的缓存结果（不读取文件）"""
+        key = self.make_key(sql)
+        return key is not None and os.path.exists(self._path(key))
+
+    def lookup(self, sql: str) -> Tuple[Optional[str], Optional[pd.DataFrame]]:
+        """
+        计算缓存键并读取缓存结果
+
+        Returns:
+            (缓存键, 缓存结果)：不可缓存时键为None；未命中或读取失败时结果为None，
+            查询后用同一个键调用 put()
+        """
+        key = self.make_key(sql)
+        if key is None:
+            return None, None
+        path = self._path(key)
+        if not os.path.exists(path):
+            return key, None
+        try:
+            df = pd.read_parquet(path)
+            os.utime(path)  # 更新最近使用时间，供LRU淘汰
+            logger.info(f"查询结果缓存命中: {key[:12]}，{len(df)} 行")
+            return key, df
+        except Exception as e:
+            logger.warning(f"读取查询缓存失败，将重新查询: {e}")
+            return key, None
+
+    def get(self, sql: str) -> Optional[pd.DataFrame]:
+        """读取缓存结果；未命中或读取失败时返回None"""
+        return self.lookup(sql)[1]
+
+    def put(self, key: Optional[str], df: pd.DataFrame) -> bool:
+        """
+        按查询前 lookup() 得到的缓存键写入结果（失败时只记录日志，不影响导出）
+
+        Returns:
+            bool: 是否已缓存
+        """
+        if key is None or df is None:
+            return False
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            df.to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"查询结果缓存写入失败: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return False
+        logger.info(f"查询结果已缓存: {key[:12]}，{len(df)} 行")
+        self.evict()
+        return True
+
+    def evict(self):
+        """总大小超过上限时，按最近使用时间从旧到新删除缓存文件"""
+        if not os.path.isdir(self.cache_dir):
+            return
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.parquet'):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+                logger.info(f"淘汰查询缓存: {os.path.basename(path)}")
+            except OSError as e:
+                logger.debug(f"删除缓存文件失败: {e}")
+
+    def clear(self):
+        """清空全部缓存"""
+        if not os.path.isdir(self.cache_dir):
+            return
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.parquet'):
+                os.remove(os.path.join(self.cache_dir, name))
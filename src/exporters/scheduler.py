@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+定时导出调度
+按 cron 表达式定时执行导出任务（任务定义见 config/export_jobs.json）：
+同时执行的任务数有上限，每张表同时被查询的任务数也有上限（如早上导入刚结束时，
+十几个任务不会同时扫同一张订单表）；同一时刻到期的任务按最久未执行的优先，
+受表并发限制等待的任务不阻塞其他任务。每次执行的结果追加到 data/export_job_runs.jsonl。
+
+本模块只负责调度，任务由调用方提供的 submit(任务名称, 导出配置) -> Future 执行（见 src/scripts/export_scheduler.py）。
+"""
+
+import os
+import re
+import json
+import time
+import logging
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+from src.exporters.result_cache import extract_tables
+
+logger = logging.getLogger(__name__)
+
+# 执行记录文件
+HISTORY_FILE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    'data', 'export_job_runs.jsonl'
+)
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# cron 字段（分 时 日 月 周）的取值范围；周日为 0，也可写 7
+CRON_FIELDS = (('分', 0, 59), ('时', 0, 23), ('日', 1, 31), ('月', 1, 12), ('周', 0, 7))
+CRON_ALIASES = {
+    '@hourly': '0 * * * *',
+    '@daily': '0 0 * * *',
+    '@weekly': '0 0 * * 0',
+    '@monthly': '0 0 1 * *',
+}
+# 查找下一次执行时间时最多向后找的天数（如 2 月 30 日这样永远不会到来的表达式）
+MAX_LOOKAHEAD_DAYS = 366 * 4
+
+# 参数中的日期占位符：{today}、{yesterday}、{month_start}，可加减天数，如 {today-7}
+DATE_TOKEN = re.compile(r'\{(today|yesterday|month_start)(?:([+-])(\d+))?\}')
+
+
+def _parse_cron_field(text: str, name: str, low: int, high: int) -> Set[int]:
+    values = set()
+    for part in text.split(','):
+        step = 1
+        if '/' in part:
+            part, step_text = part.split('/', 1)
+            if not step_text.isdigit() or int(step_text) == 0:
+                raise ValueError(f"cron 字段「{name}」的步长无效: {step_text}")
+            step = int(step_text)
+        if part == '*':
+            start, end = low, high
+        elif '-' in part:
+            start_text, end_text = part.split('-', 1)
+            if not (start_text.isdigit() and end_text.isdigit()):
+                raise ValueError(f"cron 字段「{name}」无效: {part}")
+            start, end = int(start_text), int(end_text)
+        elif part.isdigit():
+            start = int(part)
+            # "5/15" 表示从 5 开始每 15 个
+            end = high if step > 1 else start
+        else:
+            raise ValueError(f"cron 字段「{name}」无效: {part}")
+        if start < low or end > high or start > end:
+            raise ValueError(f"cron 字段「{name}」超出范围 {low}-{high}: {part}")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class CronSchedule:
+    """
+    cron 表达式：分 时 日 月 周（支持 *、列表 1,15、范围 1-5、步长 */10），以及 @hourly / @daily 等别名
+
+    与 cron 相同，日和周都不是 * 时，两者满足其一即可。
+    """
+
+    def __init__(self, expression: str):
+        self.expression = expression.strip()
+        fields = CRON_ALIASES.get(self.expression.lower(), self.expression).split()
+        if len(fields) != 5:
+            raise ValueError(f"cron 表达式应为 5 个字段（分 时 日 月 周）: {expression}")
+        (self.minutes, self.hours, self.days, self.months, weekdays) = [
+            _parse_cron_field(text, name, low, high) for text, (name, low, high) in zip(fields, CRON_FIELDS)
+        ]
+        self.weekdays = {day % 7 for day in weekdays}
+        self.any_day = fields[2] == '*'
+        self.any_weekday = fields[4] == '*'
+
+    def _day_matches(self, day: date) -> bool:
+        if day.month not in self.months:
+            return False
+        day_ok = day.day in self.days
+        # Python 的 weekday() 周一为 0，cron 周日为 0
+        weekday_ok = (day.weekday() + 1) % 7 in self.weekdays
+        if self.any_day or self.any_weekday:
+            return day_ok and weekday_ok
+        return day_ok or weekday_ok
+
+    def matches(self, moment: datetime) -> bool:
+        """该分钟是否应执行"""
+        return moment.minute in self.minutes and moment.hour in self.hours and self._day_matches(moment.date())
+
+    def next_after(self, moment: datetime) -> datetime:
+        """moment 之后（不含当前分钟）下一次执行的时间"""
+        candidate = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        deadline = candidate + timedelta(days=MAX_LOOKAHEAD_DAYS)
+        while candidate < deadline:
+            if not self._day_matches(candidate.date()):
+                candidate = datetime.combine(candidate.date() + timedelta(days=1), datetime.min.time())
+            elif candidate.hour not in self.hours:
+                candidate = candidate.replace(minute=0) + timedelta(hours=1)
+            elif candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+            else:
+                return candidate
+        raise ValueError(f"cron 表达式永远不会执行: {self.expression}")
+
+    def __repr__(self) -> str:
+        return f"CronSchedule({self.expression!r})"
+
+
+def render_params(params: Dict[str, Any], moment: datetime) -> Dict[str, Any]:
+    """
+    替换参数中的日期占位符（按计划执行时间计算，格式 YYYY-MM-DD）
+
+    例如 {'start_date': '{today-7}', 'end_date': '{yesterday}'}
+    """
+    def replace(match):
+        base = {
+            'today': moment.date(),
+            'yesterday': moment.date() - timedelta(days=1),
+            'month_start': moment.date().replace(day=1),
+        }[match.group(1)]
+        if match.group(2):
+            offset = int(match.group(3))
+            base += timedelta(days=offset if match.group(2) == '+' else -offset)
+        return base.strftime('%Y-%m-%d')
+
+    return {key: DATE_TOKEN.sub(replace, value) if isinstance(value, str) else value
+            for key, value in params.items()}
+
+
+class ScheduledJob:
+    """一个定时导出任务：名称、执行计划、导出配置（与 batch_export 的任务配置相同）和查询涉及的表"""
+
+    def __init__(self, name: str, schedule: CronSchedule, config: Dict[str, Any], tables: Iterable[str] = ()):
+        self.name = name
+        self.schedule = schedule
+        self.config = config
+        self.tables = set(tables)
+        self.next_run: Optional[datetime] = None
+        self.last_started: Optional[datetime] = None
+
+    def config_for(self, moment: datetime) -> Dict[str, Any]:
+        """本次执行的导出配置（参数中的日期占位符按计划执行时间替换）"""
+        return dict(self.config, params=render_params(self.config.get('params') or {}, moment))
+
+    def __repr__(self) -> str:
+        return f"ScheduledJob({self.name!r}, {self.schedule.expression!r})"
+
+
+def load_jobs(definitions: Dict[str, Any],
+              query_text: Optional[Callable[[str], Optional[str]]] = None) -> List[ScheduledJob]:
+    """
+    从任务定义文件的内容创建任务
+
+    Args:
+        definitions: {'jobs': [{'name', 'schedule', 'query_name', 'params', 'format', 'tables', ...}, ...]}
+        query_text: 按查询名取SQL文本的函数，任务没有配置 'tables' 时据此推断涉及的表
+
+    Raises:
+        ValueError: 任务定义不完整、名称重复或 cron 表达式无效
+    """
+    jobs = []
+    names = set()
+    for index, definition in enumerate(definitions.get('jobs') or [], 1):
+        if not definition.get('query_name'):
+            raise ValueError(f"第 {index} 个任务缺少 query_name")
+        if not definition.get('schedule'):
+            raise ValueError(f"第 {index} 个任务缺少 schedule")
+        if definition.get('enabled') is False:
+            continue
+        name = definition.get('name') or definition['query_name']
+        if name in names:
+            raise ValueError(f"任务名称重复: {name}（同一查询配置了多个任务时请用 name 区分）")
+        names.add(name)
+        schedule = CronSchedule(definition['schedule'])
+        config = {key: value for key, value in definition.items()
+                  if key not in ('name', 'schedule', 'tables', 'enabled')}
+        tables = definition.get('tables')
+        if tables is None and query_text is not None:
+            tables = extract_tables(str(query_text(definition['query_name']) or ''))
+        jobs.append(ScheduledJob(name, schedule, config, tables or ()))
+    return jobs
+
+
+class RunHistory:
+    """任务执行记录（一行一个JSON）"""
+
+    def __init__(self, history_file: str = HISTORY_FILE):
+        self.history_file = history_file
+
+    def record(self, entry: Dict[str, Any]):
+        """追加一条记录，写入失败不影响调度"""
+        try:
+            os.makedirs(os.path.dirname(self.history_file), exist_ok=True)
+            with open(self.history_file, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, ensure_ascii=False, default=str) + '\n')
+        except Exception as e:
+            logger.warning(f"任务执行记录写入失败: {e}")
+
+    def load(self) -> List[Dict[str, Any]]:
+        if not os.path.exists(self.history_file):
+            return []
+        records = []
+        with open(self.history_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        continue
+        return records
+
+    def last_runs(self) -> Dict[str, Dict[str, Any]]:
+        """每个任务最近一次的记录"""
+        return {record['job']: record for record in self.load() if record.get('job')}
+
+
+class ExportScheduler:
+    """
+    定时导出调度器
+
+    到期的任务进入等待队列；有空闲名额且所涉及的表都未达到并发上限时开始执行。
+    任务上一次还在等待或执行时又到期，本次跳过（记为 skipped），不会堆积。
+    """
+
+    def __init__(self, jobs: List[ScheduledJob], submit: Callable[[str, Dict[str, Any]], Future],
+                 max_workers: int = 4, table_limits: Optional[Dict[str, int]] = None,
+                 default_table_limit: Optional[int] = None, history: Optional[RunHistory] = None,
+                 clock: Callable[[], datetime] = datetime.now):
+        """
+        Args:
+            jobs: 任务列表
+            submit: 开始执行一个任务，参数为任务名称和本次的导出配置，返回 Future（结果为是否成功）
+            max_workers: 同时执行的任务数上限
+            table_limits: 每张表同时执行的任务数上限，如 {'new_customer_orders': 1}
+            default_table_limit: 未单独配置的表的上限，None 表示不限制
+            history: 执行记录，None 表示不记录
+            clock: 当前时间（测试时替换）
+        """
+        self.jobs = {job.name: job for job in jobs}
+        self.submit = submit
+        self.max_workers = max(int(max_workers), 1)
+        self.table_limits = {table.lower(): int(limit) for table, limit in (table_limits or {}).items()}
+        self.default_table_limit = default_table_limit
+        self.history = history
+        self.clock = clock
+        self.queue: List[Dict[str, Any]] = []
+        self.running: Dict[Future, Dict[str, Any]] = {}
+        self._table_counts = Counter()
+        now = clock()
+        for job in self.jobs.values():
+            job.next_run = job.schedule.next_after(now)
+
+    def _table_limit(self, table: str) -> Optional[int]:
+        return self.table_limits.get(table.lower(), self.default_table_limit)
+
+    def _tables_available(self, job: ScheduledJob) -> bool:
+        for table in job.tables:
+            limit = self._table_limit(table)
+            if limit is not None and self._table_counts[table.lower()] >= limit:
+                return False
+        return True
+
+    def _is_active(self, job: ScheduledJob) -> bool:
+        return (any(run['job'] is job for run in self.queue)
+                or any(run['job'] is job for run in self.running.values()))
+
+    def enqueue(self, job: ScheduledJob, scheduled: datetime) -> bool:
+        """把一次执行加入等待队列（任务已在等待或执行时跳过）"""
+        if self._is_active(job):
+            logger.warning(f"任务 {job.name} 上一次尚未完成，跳过 {scheduled.strftime(TIME_FORMAT)} 的执行")
+            self._record(job, scheduled, 'skipped')
+            return False
+        self.queue.append({'job': job, 'scheduled': scheduled})
+        return True
+
+    def run_now(self, names: Optional[Iterable[str]] = None):
+        """立即执行指定任务（默认全部）"""
+        now = self.clock()
+        for name in names or list(self.jobs):
+            if name not in self.jobs:
+                raise ValueError(f"任务不存在: {name}")
+            self.enqueue(self.jobs[name], now)
+
+    def tick(self):
+        """把到期的任务加入队列并开始执行能执行的任务（错过的多次执行只补一次）"""
+        now = self.clock()
+        for job in self.jobs.values():
+            if job.next_run is not None and job.next_run <= now:
+                self.enqueue(job, job.next_run)
+                job.next_run = job.schedule.next_after(now)
+        self.dispatch()
+
+    def dispatch(self):
+        """
+        按公平顺序开始执行等待中的任务
+
+        先到期的优先；同时到期的，最久未执行的任务优先。
+        涉及的表已达到并发上限的任务继续等待，不阻塞后面的任务。
+        """
+        self.queue.sort(key=lambda run: (run['scheduled'], run['job'].last_started or datetime.min,
+                                         run['job'].name))
+        for run in list(self.queue):
+            if len(self.running) >= self.max_workers:
+                break
+            job = run['job']
+            if not self._tables_available(job):
+                continue
+            self.queue.remove(run)
+            run['started'] = self.clock()
+            job.last_started = run['started']
+            for table in job.tables:
+                self._table_counts[table.lower()] += 1
+            try:
+                future = self.submit(job.name, job.config_for(run['scheduled']))
+            except Exception as e:
+                self._finish(run, 'error', str(e))
+                continue
+            self.running[future] = run
+
+    def collect(self, timeout: Optional[float] = None) -> int:
+        """等待任务完成（最多 timeout 秒），记录结果并开始执行等待中的任务，返回完成的任务数"""
+        if not self.running:
+            return 0
+        done, _ = wait(list(self.running), timeout=timeout, return_when=FIRST_COMPLETED)
+        for future in done:
+            run = self.running.pop(future)
+            try:
+                success = future.result()
+                self._finish(run, 'success' if success else 'failed')
+            except Exception as e:
+                self._finish(run, 'error', str(e))
+        self.dispatch()
+        return len(done)
+
+    def _finish(self, run: Dict[str, Any], status: str, error: Optional[str] = None):
+        job = run['job']
+        for table in job.tables:
+            self._table_counts[table.lower()] -= 1
+        finished = self.clock()
+        elapsed = (finished - run['started']).total_seconds()
+        if status == 'success':
+            logger.info(f"任务 {job.name} 完成，耗时 {elapsed:.1f} 秒")
+        else:
+            logger.warning(f"任务 {job.name} {status}" + (f": {error}" if error else ""))
+        self._record(job, run['scheduled'], status, run['started'], finished, error)
+
+    def _record(self, job: ScheduledJob, scheduled: datetime, status: str, started: Optional[datetime] = None,
+                finished: Optional[datetime] = None, error: Optional[str] = None):
+        if self.history is None:
+            return
+        self.history.record({
+            'job': job.name,
+            'query_name': job.config.get('query_name'),
+            'scheduled': scheduled.strftime(TIME_FORMAT),
+            'started': started.strftime(TIME_FORMAT) if started else None,
+            'finished': finished.strftime(TIME_FORMAT) if finished else None,
+            'waited_seconds': round((started - scheduled).total_seconds(), 1) if started else None,
+            'elapsed_seconds': round((finished - started).total_seconds(), 1) if started and finished else None,
+            'status': status,
+            'error': error,
+        })
+
+    def idle(self) -> bool:
+        return not self.queue and not self.running
+
+    def run_until_idle(self, poll_interval: float = 1.0):
+        """执行已在队列中的任务直到全部完成（不再按计划加入新任务）"""
+        self.dispatch()
+        while not self.idle():
+            if not self.collect(timeout=poll_interval) and not self.running:
+                # 队列中的任务都在等待表并发名额，但没有任务在执行（上限配置为 0）
+                raise RuntimeError("等待中的任务无法开始执行，请检查表并发上限配置")
+
+    def run_forever(self, poll_interval: float = 5.0, should_stop: Callable[[], bool] = lambda: False):
+        """按计划持续调度，直到 should_stop() 返回 True"""
+        while not should_stop():
+            self.tick()
+            if self.running:
+                self.collect(timeout=poll_interval)
+            else:
+                time.sleep(poll_interval)
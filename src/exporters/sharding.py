@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+单个大查询的分片并行执行
+按查询头部 "-- 分片: 表.列" 声明的分片键，把取值范围切成 N 段，
+每段包装为 SELECT * FROM (原查询) WHERE 列 在范围内，在各自的连接上同时执行，再按范围顺序合并输出。
+"""
+
+import logging
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Callable, List, Optional, Tuple
+
+from pymysql.converters import escape_item
+
+from src.exporters.sql_params import BoundQuery, trim_sql
+
+logger = logging.getLogger(__name__)
+
+# 默认分片数
+DEFAULT_SHARDS = 4
+# 分片数上限（每个分片占用一个连接）
+MAX_SHARDS = 16
+
+
+def parse_shard_key(shard_key: str) -> Tuple[str, str]:
+    """
+    解析分片键 "表.列"
+
+    表用于查询取值范围（MIN/MAX 走索引），列名需要同时是查询结果中的列名。
+    """
+    if not shard_key or '.' not in shard_key:
+        raise ValueError(f"分片键应为 表.列 格式: {shard_key}")
+    table, column = (part.strip().strip('`') for part in shard_key.rsplit('.', 1))
+    if not table or not column:
+        raise ValueError(f"分片键应为 表.列 格式: {shard_key}")
+    return table, column
+
+
+def split_ranges(low, high, shards: int) -> List[Any]:
+    """
+    把 [low, high] 均分为 shards 段，返回段与段之间的分界值（升序、去重）
+
+    支持整数、小数、日期与时间；其他类型（如字符串）无法均分，返回空列表（不分片）。
+    """
+    if low is None or high is None or shards <= 1 or not low < high:
+        return []
+
+    if isinstance(low, datetime) and isinstance(high, datetime):
+        step = (high - low) / shards
+        points = [low + step * i for i in range(1, shards)]
+    elif isinstance(low, date) and isinstance(high, date) and not isinstance(low, datetime):
+        start, end = low.toordinal(), high.toordinal() + 1
+        points = [date.fromordinal(start + (end - start) * i // shards) for i in range(1, shards)]
+    elif isinstance(low, int) and isinstance(high, int) and not isinstance(low, bool):
+        end = high + 1
+        points = [low + (end - low) * i // shards for i in range(1, shards)]
+    elif isinstance(low, (int, float, Decimal)) and isinstance(high, (int, float, Decimal)):
+        step = (high - low) / shards
+        points = [low + step * i for i in range(1, shards)]
+    else:
+        return []
+
+    boundaries = []
+    for point in points:
+        if point > low and (not boundaries or point > boundaries[-1]):
+            boundaries.append(point)
+    return boundaries
+
+
+def build_shard_conditions(column: str, boundaries: List[Any]) -> List[Optional[str]]:
+    """
+    按分界值生成各分片的过滤条件
+
+    第一段不设下限并包含 NULL，最后一段不设上限，因此分界值只影响各段大小，不会漏掉行。
+    """
+    if not boundaries:
+        return [None]
+    ref = f"shard_src.`{column}`"
+    literals = [escape_item(value, 'utf8mb4') for value in boundaries]
+    conditions = [f"({ref} < {literals[0]} OR {ref} IS NULL)"]
+    for lower, upper in zip(literals, literals[1:]):
+        conditions.append(f"{ref} >= {lower} AND {ref} < {upper}")
+    conditions.append(f"{ref} >= {literals[-1]}")
+    return conditions
+
+
+def build_shard_sql(sql, condition: Optional[str]):
+    """
+    把查询包装为只取一个分片的查询（BoundQuery 包装后保留参数）
+
+    外层查询只有这一个派生表、没有排序和分组，MySQL 会沿用原查询的 ORDER BY，
+    并把条件下推到派生表内部。
+    """
+    if isinstance(sql, BoundQuery):
+        return sql.wrap(lambda inner_sql: build_shard_sql(inner_sql, condition))
+    inner = trim_sql(sql)
+    if condition is None:
+        return inner
+    return f"SELECT * FROM (\n{inner}\n) AS shard_src\nWHERE {condition}"
+
+
+class ShardedBatches:
+    """
+    按分片顺序依次输出各分片的批次
+
+    各分片由自己的读取线程同时读完（见 pipeline.SpooledBatches，超出内存上限的批次暂存到临时文件），
+    这里只负责按顺序合并；排在后面的分片不会因等待前面的分片写出而被服务器按 net_write_timeout 断开。
+    对外接口与 _StreamBatches 一致：迭代、cancel()、close()。
+    """
+
+    def __init__(self, shards: List, on_close: Callable = None):
+        self._shards = list(shards)
+        self._index = 0
+        self._on_close = on_close
+        self._closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        while self._index < len(self._shards):
+            try:
+                return next(self._shards[self._index])
+            except StopIteration:
+                self._index += 1
+        self.close()
+        raise StopIteration
+
+    def cancel(self):
+        """取消所有未读完的分片查询"""
+        if self._closed:
+            return
+        for shard in self._shards[self._index:]:
+            try:
+                shard.cancel()
+            except Exception as e:
+                logger.debug(f"取消分片查询失败: {e}")
+        self.close()
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        if self._index < len(self._shards):
+            for shard in self._shards[self._index:]:
+                try:
+                    shard.close()
+                except Exception as e:
+                    logger.debug(f"关闭分片查询失败: {e}")
+        if self._on_close:
+            self._on_close()
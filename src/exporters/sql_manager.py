@@ -7,11 +7,16 @@ SQL查询管理器
 
 import os
 import re
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Union
 import logging
 
+from src.exporters.sql_params import BoundQuery, parse_param_declarations, convert_params, find_placeholders, trim_sql
+
 logger = logging.getLogger(__name__)
 
+# 查询头部的元数据注释，例如 "-- 超时: 300"、"-- 参数: start_date DATE"（写在 "-- 使用: 查询名" 之后、SQL正文之前）
+METADATA_PATTERN = re.compile(r'^--\s*([^:：\s]+)\s*[:：]\s*(.*?)\s*$')
+
 
 class SQLQueryManager:
     """SQL查询管理器"""
@@ -25,6 +30,7 @@ class SQLQueryManager:
         """
         self.sql_dir = sql_dir
         self.queries = {}
+        self.metadata = {}
         self.load_all_queries()
     
     def load_all_queries(self):
@@ -50,6 +56,7 @@ class SQLQueryManager:
             # 添加到查询字典中
             for query_name, query_sql in queries.items():
                 self.queries[query_name] = query_sql
+                self.metadata[query_name] = self._parse_metadata(query_sql)
                 logger.info(f"加载查询: {query_name} (来自 {os.path.basename(file_path)})")
                 
         except Exception as e:
@@ -80,6 +87,83 @@ class SQLQueryManager:
         
         return queries
     
+    def _parse_metadata(self, sql: str) -> Dict[str, str]:
+        """
+        解析SQL正文之前的 "-- 键: 值" 注释行
+        
+        Args:
+            sql: 查询内容
+            
+        Returns:
+            Dict[str, str]: 键到值的映射
+        """
+        metadata = {}
+        for line in sql.split('\n'):
+            line = line.strip()
+            if not line:
+                continue
+            if not line.startswith('--'):
+                break
+            match = METADATA_PATTERN.match(line)
+            if match:
+                metadata[match.group(1)] = match.group(2)
+        return metadata
+    
+    def get_query_metadata(self, query_name: str) -> Dict[str, str]:
+        """
+        获取查询头部的元数据注释
+        
+        Args:
+            query_name: 查询名称
+            
+        Returns:
+            Dict[str, str]: 元数据，查询不存在时为空字典
+        """
+        return self.metadata.get(query_name, {})
+    
+    def get_query_timeout(self, query_name: str) -> Optional[float]:
+        """
+        获取查询配置的超时秒数（"-- 超时: 300"）
+        
+        Args:
+            query_name: 查询名称
+            
+        Returns:
+            float: 超时秒数，未配置或格式错误时返回None
+        """
+        value = self.get_query_metadata(query_name).get('超时')
+        if not value:
+            return None
+        try:
+            return float(value.rstrip('秒sS').strip())
+        except ValueError:
+            logger.warning(f"查询 {query_name} 的超时配置无效: {value}")
+            return None
+    
+    def get_query_shard_key(self, query_name: str) -> Optional[str]:
+        """
+        获取查询声明的分片键（"-- 分片: new_customer_orders.日期"）
+        
+        Args:
+            query_name: 查询名称
+            
+        Returns:
+            str: "表.列"，未声明时返回None
+        """
+        return self.get_query_metadata(query_name).get('分片') or None
+    
+    def get_query_params(self, query_name: str) -> Dict[str, str]:
+        """
+        获取查询声明的绑定参数（"-- 参数: start_date DATE, end_date DATE"）
+        
+        Args:
+            query_name: 查询名称
+            
+        Returns:
+            Dict[str, str]: 参数名到类型的有序映射，未声明时为空
+        """
+        return parse_param_declarations(self.get_query_metadata(query_name).get('参数', ''))
+    
     def get_query(self, query_name: str) -> Optional[str]:
         """
         获取指定的查询
@@ -128,6 +212,48 @@ class SQLQueryManager:
             logger.error(f"格式化查询失败 {query_name}: {e}")
             return None
     
+    def bind_query(self, query_name: str, **kwargs) -> Optional[BoundQuery]:
+        """
+        绑定参数（:name 占位符，按 "-- 参数:" 声明的类型转换）
+        
+        Args:
+            query_name: 查询名称
+            **kwargs: 参数值
+            
+        Returns:
+            BoundQuery: 绑定参数后的查询，出错时返回None
+        """
+        query = self.get_query(query_name)
+        if query is None:
+            logger.error(f"查询不存在: {query_name}")
+            return None
+        
+        try:
+            declarations = self.get_query_params(query_name)
+            used_names = [name for _, _, name in find_placeholders(query)]
+            return BoundQuery(query, convert_params(declarations, kwargs, used_names), query_name)
+        except ValueError as e:
+            logger.error(f"绑定查询参数失败 {query_name}: {e}")
+            return None
+    
+    def build_query(self, query_name: str, **kwargs) -> Optional[Union[str, BoundQuery]]:
+        """
+        按查询的写法准备执行：声明了 "-- 参数:" 的用绑定参数，否则按原方式 str.format 替换
+        
+        Returns:
+            str 或 BoundQuery，出错时返回None
+        """
+        try:
+            declared = bool(self.get_query_params(query_name))
+        except ValueError as e:
+            logger.error(f"查询 {query_name} 的参数声明无效: {e}")
+            return None
+        if declared:
+            return self.bind_query(query_name, **kwargs)
+        if kwargs:
+            return self.format_query(query_name, **kwargs)
+        return self.get_query(query_name)
+    
     def list_queries(self) -> Dict[str, str]:
         """
         列出所有查询及其描述
@@ -148,10 +274,39 @@ class SQLQueryManager:
     def reload_queries(self):
         """重新加载所有查询"""
         self.queries.clear()
+        self.metadata.clear()
         self.load_all_queries()
         logger.info("重新加载所有SQL查询")
 
 
+# 预览允许的语句：SELECT / WITH 包装为派生表执行，SHOW / DESC / EXPLAIN 原样执行
+PREVIEW_WRAPPED_STATEMENTS = ('select', 'with', '(')
+PREVIEW_PLAIN_STATEMENTS = ('show', 'desc', 'describe', 'explain')
+
+
+def build_preview_sql(sql: Union[str, BoundQuery], limit: int) -> Union[str, BoundQuery]:
+    """
+    预览查询：SELECT / WITH 查询包装为派生表加 LIMIT，只取前 limit 行（BoundQuery 包装后保留参数）
+
+    SHOW、DESC、EXPLAIN 原样执行；其他语句（DROP、DELETE、UPDATE 等）以及会实际执行语句的
+    EXPLAIN ANALYZE、包含多条语句的 SHOW / DESC / EXPLAIN 一律拒绝。
+
+    Raises:
+        ValueError: 语句不是只读查询
+    """
+    if isinstance(sql, BoundQuery):
+        return sql.wrap(lambda inner_sql: build_preview_sql(inner_sql, limit))
+    inner = trim_sql(sql)
+    lines = [line for line in inner.splitlines() if line.strip() and not line.strip().startswith('--')]
+    words = ' '.join(lines).replace('(', ' ( ').lower().split()
+    first_word = words[0] if words else ''
+    if first_word in PREVIEW_WRAPPED_STATEMENTS:
+        # 包装为派生表后，子查询中的其他语句（如 WITH ... DELETE）只会导致语法错误
+        return f"SELECT * FROM (\n{inner}\n) AS preview_src\nLIMIT {int(limit)}"
+    if first_word in PREVIEW_PLAIN_STATEMENTS and ';' not in inner and 'analyze' not in words[1:2]:
+        return inner
+    raise ValueError(f"预览只允许 SELECT / WITH / SHOW / DESC / EXPLAIN 查询，拒绝执行: {first_word.upper() or '空语句'}")
+
 # 全局SQL管理器实例
 _sql_manager = None
 
@@ -170,6 +325,22 @@ def format_query(query_name: str, **kwargs) -> Optional[str]:
     """格式化查询"""
     return get_sql_manager().format_query(query_name, **kwargs)
 
+def get_query_shard_key(query_name: str) -> Optional[str]:
+    """获取查询声明的分片键"""
+    return get_sql_manager().get_query_shard_key(query_name)
+
+def bind_query(query_name: str, **kwargs) -> Optional[BoundQuery]:
+    """绑定查询参数"""
+    return get_sql_manager().bind_query(query_name, **kwargs)
+
+def build_query(query_name: str, **kwargs) -> Optional[Union[str, BoundQuery]]:
+    """准备查询（绑定参数或格式化）"""
+    return get_sql_manager().build_query(query_name, **kwargs)
+
 def list_queries() -> Dict[str, str]:
     """列出所有查询"""
-    return get_sql_manager().list_queries() 
\ No newline at end of file
+    return get_sql_manager().list_queries() 
+
+def get_query_timeout(query_name: str) -> Optional[float]:
+    """获取查询配置的超时秒数"""
+    return get_sql_manager().get_query_timeout(query_name)
@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+命名查询的绑定参数
+SQL中用 :start_date 形式的占位符，在查询头部用 "-- 参数: start_date DATE, end_date DATE" 声明类型。
+执行时通过服务端预处理语句（PREPARE / EXECUTE ... USING）传参：参数值不拼进SQL文本，不会被注入；
+同一连接上相同的查询只 PREPARE 一次，换参数反复执行时省去解析开销。
+"""
+
+import re
+import logging
+import itertools
+import weakref
+from collections import OrderedDict
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from typing import Any, Callable, Dict, List, Tuple
+
+import pandas as pd
+from pymysql.converters import escape_item
+
+logger = logging.getLogger(__name__)
+
+# 每个连接最多保留的预处理语句数（受服务端 max_prepared_stmt_count 限制），超过后释放最久未用的
+DEFAULT_MAX_STATEMENTS = 32
+# 服务端找不到预处理语句（连接重连后语句丢失）
+ER_UNKNOWN_STMT_HANDLER = 1243
+
+PLACEHOLDER_PATTERN = re.compile(r':([^\W\d]\w*)')
+DECLARATION_PATTERN = re.compile(r'^([^\W\d]\w*)\s+(\w+)(?:\s*\(.*\))?$')
+# 查询末尾的空白、分号、整行 -- 注释、分号后的 -- 注释与 /* */ 块注释
+TRAILING_SQL_PATTERN = re.compile(
+    r'(?:\s+|;|^[ \t]*--[^\n]*|(?<=;)[ \t]*--[^\n]*|/\*[^*]*\*+(?:[^/*][^*]*\*+)*/)\Z',
+    re.MULTILINE
+)
+
+
+def trim_sql(sql: str) -> str:
+    """
+    去掉查询末尾的空白、分号与注释，便于包装为派生表
+
+    SQL文件中每个查询的分号后面会带上下一个查询的标题注释（-- 查询8: ...），
+    只 rstrip(';') 时分号和注释会留在括号里导致语法错误。
+    """
+    sql = sql.strip()
+    while True:
+        match = TRAILING_SQL_PATTERN.search(sql)
+        if not match or match.start() == len(sql):
+            return sql
+        sql = sql[:match.start()]
+
+
+def _to_date(value) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    text = str(value).strip()
+    if re.fullmatch(r'\d{8}', text):
+        return datetime.strptime(text, '%Y%m%d').date()
+    return date.fromisoformat(text)
+
+
+def _to_datetime(value) -> datetime:
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    return datetime.fromisoformat(str(value).strip())
+
+
+def _to_decimal(value) -> Decimal:
+    try:
+        return Decimal(str(value).strip())
+    except InvalidOperation:
+        raise ValueError(f"无效的数值: {value}")
+
+
+def to_json_value(value):
+    """查询结果中的值转换为可写入JSON的形式（日期保存为 MySQL 可比较的字符串）"""
+    if isinstance(value, (int, float, str)) or value is None:
+        return value
+    if isinstance(value, datetime):
+        return value.isoformat(sep=' ')
+    # date、Decimal 等转为字符串，MySQL 比较时会按列类型隐式转换
+    return str(value)
+
+
+# 声明类型到转换函数的映射
+PARAM_TYPES: Dict[str, Callable[[Any], Any]] = {
+    'DATE': _to_date,
+    'DATETIME': _to_datetime,
+    'TIMESTAMP': _to_datetime,
+    'INT': int,
+    'BIGINT': int,
+    'DECIMAL': _to_decimal,
+    'FLOAT': float,
+    'DOUBLE': float,
+    'VARCHAR': str,
+    'TEXT': str,
+    'STRING': str,
+}
+
+
+def parse_param_declarations(text: str) -> Dict[str, str]:
+    """
+    解析参数声明，如 "start_date DATE, end_date DATE, min_amount DECIMAL(12,2)"
+
+    Returns:
+        Dict[str, str]: 参数名到类型（大写）的有序映射
+    """
+    declarations = OrderedDict()
+    if not text:
+        return declarations
+    # 按逗号拆分，忽略类型括号中的逗号
+    for item in re.split(r',(?![^()]*\))', text):
+        item = item.strip()
+        if not item:
+            continue
+        match = DECLARATION_PATTERN.match(item)
+        if not match:
+            raise ValueError(f"无效的参数声明: {item}")
+        name, param_type = match.group(1), match.group(2).upper()
+        if param_type not in PARAM_TYPES:
+            raise ValueError(f"参数 {name} 的类型不支持: {param_type}（可用: {', '.join(PARAM_TYPES)}）")
+        declarations[name] = param_type
+    return declarations
+
+
+def find_placeholders(sql: str) -> List[Tuple[int, int, str]]:
+    """
+    找出SQL中的 :name 占位符，跳过字符串、反引号标识符与注释
+
+    Returns:
+        List[Tuple[int, int, str]]: (起始位置, 结束位置, 参数名)
+    """
+    placeholders = []
+    i, length = 0, len(sql)
+    while i < length:
+        ch = sql[i]
+        if ch in ("'", '"', '`'):
+            i += 1
+            while i < length:
+                if sql[i] == '\\' and ch != '`':
+                    i += 2
+                    continue
+                if sql[i] == ch:
+                    if i + 1 < length and sql[i + 1] == ch:
+                        i += 2
+                        continue
+                    break
+                i += 1
+            i += 1
+        elif sql.startswith('--', i) or ch == '#':
+            end = sql.find('\n', i)
+            i = length if end < 0 else end + 1
+        elif sql.startswith('/*', i):
+            end = sql.find('*/', i + 2)
+            i = length if end < 0 else end + 2
+        elif ch == ':' and (i == 0 or sql[i - 1] != ':' and not sql[i - 1].isalnum()):
+            match = PLACEHOLDER_PATTERN.match(sql, i)
+            if match:
+                placeholders.append((i, match.end(), match.group(1)))
+                i = match.end()
+            else:
+                i += 1
+        else:
+            i += 1
+    return placeholders
+
+
+def convert_params(declarations: Dict[str, str], values: Dict[str, Any],
+                   used_names: List[str] = None) -> Dict[str, Any]:
+    """
+    按声明的类型转换参数值
+
+    Args:
+        declarations: parse_param_declarations 的结果
+        values: 参数值（命令行传入的字符串或配置中的值）
+        used_names: SQL中用到的参数名，未声明时报错
+
+    Returns:
+        Dict[str, Any]: 转换后的参数值
+    """
+    for name in used_names or []:
+        if name not in declarations:
+            raise ValueError(f"参数 :{name} 未在 \"-- 参数:\" 中声明")
+    unknown = set(values) - set(declarations)
+    if unknown:
+        raise ValueError(f"未声明的参数: {', '.join(sorted(unknown))}")
+    missing = [name for name in declarations if name not in values]
+    if missing:
+        raise ValueError(f"缺少参数: {', '.join(missing)}")
+
+    converted = {}
+    for name, param_type in declarations.items():
+        value = values[name]
+        if value is None:
+            converted[name] = None
+            continue
+        try:
+            converted[name] = PARAM_TYPES[param_type](value)
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"参数 {name} 不是有效的 {param_type}: {value!r}") from e
+    return converted
+
+
+class BoundQuery:
+    """
+    带绑定参数的查询
+
+    sql 中保留 :name 占位符，执行时走预处理语句；str(query) 得到参数已转义内联的SQL，
+    用于 EXPLAIN 预检、结果缓存键和日志。
+    """
+
+    def __init__(self, sql: str, params: Dict[str, Any], name: str = None):
+        self.sql = trim_sql(sql)
+        self.params = dict(params)
+        self.name = name
+        self._placeholders = find_placeholders(self.sql)
+
+    @property
+    def param_names(self) -> List[str]:
+        """按出现顺序排列的占位符参数名（可重复）"""
+        return [name for _, _, name in self._placeholders]
+
+    def positional(self) -> Tuple[str, List[Any]]:
+        """转换为 ? 占位符的SQL与对应顺序的参数值"""
+        parts, args, last = [], [], 0
+        for start, end, name in self._placeholders:
+            parts.append(self.sql[last:start])
+            parts.append('?')
+            args.append(self.params[name])
+            last = end
+        parts.append(self.sql[last:])
+        return ''.join(parts), args
+
+    def render(self) -> str:
+        """参数值转义后内联到SQL中"""
+        parts, last = [], 0
+        for start, end, name in self._placeholders:
+            parts.append(self.sql[last:start])
+            parts.append(escape_item(self.params[name], 'utf8mb4'))
+            last = end
+        parts.append(self.sql[last:])
+        return ''.join(parts)
+
+    def wrap(self, build: Callable[[str], str]) -> 'BoundQuery':
+        """用 build 包装SQL文本（如增量导出的外层过滤），保留参数"""
+        return BoundQuery(build(self.sql), self.params, self.name)
+
+    def __str__(self) -> str:
+        return self.render()
+
+    def __repr__(self) -> str:
+        return f"BoundQuery({self.name or self.sql[:40]!r}, {self.params!r})"
+
+
+class PreparedStatementCache:
+    """
+    一个连接上的预处理语句缓存
+
+    相同SQL只 PREPARE 一次；参数通过会话变量传给 EXECUTE ... USING。
+    """
+
+    _ids = itertools.count(1)
+
+    def __init__(self, connection, max_statements: int = DEFAULT_MAX_STATEMENTS):
+        self.connection = connection
+        self.max_statements = max_statements
+        self._statements = OrderedDict()   # ? 占位符SQL -> 语句名
+        self.prepare_count = 0
+        self.execute_count = 0
+
+    def _prepare(self, sql: str) -> str:
+        name = self._statements.get(sql)
+        if name is not None:
+            self._statements.move_to_end(sql)
+            return name
+
+        name = f"export_stmt_{next(self._ids)}"
+        with self.connection.cursor() as cursor:
+            cursor.execute("SET @export_stmt_sql = %s", (sql,))
+            cursor.execute(f"PREPARE {name} FROM @export_stmt_sql")
+        self.prepare_count += 1
+        self._statements[sql] = name
+
+        while len(self._statements) > self.max_statements:
+            _, old_name = self._statements.popitem(last=False)
+            try:
+                with self.connection.cursor() as cursor:
+                    cursor.execute(f"DEALLOCATE PREPARE {old_name}")
+            except Exception as e:
+                logger.debug(f"释放预处理语句失败: {e}")
+        return name
+
+    def execute(self, cursor, query: BoundQuery):
+        """
+        在 cursor 上执行绑定参数查询（cursor 可以是 SSCursor，结果照常流式读取）
+        """
+        sql, args = query.positional()
+        for attempt in range(2):
+            name = self._prepare(sql)
+            variables = [f"@export_p{i}" for i in range(1, len(args) + 1)]
+            try:
+                if args:
+                    with self.connection.cursor() as set_cursor:
+                        set_cursor.execute("SET " + ", ".join(f"{var} = %s" for var in variables), args)
+                    cursor.execute(f"EXECUTE {name} USING {', '.join(variables)}")
+                else:
+                    cursor.execute(f"EXECUTE {name}")
+                self.execute_count += 1
+                return
+            except Exception as e:
+                # 连接重连后服务端的预处理语句已丢失，重新 PREPARE 一次
+                if attempt == 0 and getattr(e, 'args', (None,))[0] == ER_UNKNOWN_STMT_HANDLER:
+                    self._statements.clear()
+                    continue
+                raise
+
+    def clear(self):
+        """忘记已准备的语句（连接关闭后服务端会自动释放）"""
+        self._statements.clear()
+
+
+_statement_caches = weakref.WeakKeyDictionary()
+
+
+def get_statement_cache(connection) -> PreparedStatementCache:
+    """获取连接对应的预处理语句缓存（随连接对象释放）"""
+    cache = _statement_caches.get(connection)
+    if cache is None:
+        cache = PreparedStatementCache(connection)
+        _statement_caches[connection] = cache
+    return cache
+
+
+def execute_sql(cursor, sql):
+    """执行SQL：普通文本直接执行，BoundQuery 走当前连接的预处理语句"""
+    if isinstance(sql, BoundQuery):
+        get_statement_cache(cursor.connection).execute(cursor, sql)
+    else:
+        cursor.execute(sql)
+
+
+def read_sql_dataframe(connection, sql) -> pd.DataFrame:
+    """读取查询结果为 DataFrame；BoundQuery 走预处理语句，普通SQL使用 pd.read_sql"""
+    if not isinstance(sql, BoundQuery):
+        return pd.read_sql(sql, connection)
+    with connection.cursor() as cursor:
+        execute_sql(cursor, sql)
+        columns = [desc[0] for desc in cursor.description]
+        return pd.DataFrame.from_records(list(cursor.fetchall()), columns=columns, coerce_float=True)
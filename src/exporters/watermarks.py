@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+增量导出水位线
+记录每个增量导出任务已导出到的水位（如 日期、订单id 的最大值），下次只导出大于水位的新数据
+"""
+
+import os
+import json
+import logging
+from datetime import datetime
+from typing import Any, Dict, Optional, Sequence, List
+
+from pymysql.converters import escape_item
+
+from src.exporters.sql_params import BoundQuery, to_json_value, trim_sql
+
+logger = logging.getLogger(__name__)
+
+# 水位线保存目录，每个任务一个文件，多进程批量导出时互不覆盖
+WATERMARK_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    'data', 'export_watermarks'
+)
+
+
+class WatermarkStore:
+    """增量导出任务的水位线存储"""
+
+    def __init__(self, watermark_dir: str = WATERMARK_DIR):
+        self.watermark_dir = watermark_dir
+
+    def _path(self, job_name: str) -> str:
+        safe_name = "".join(ch if ch.isalnum() or ch in '-_.' else '_' for ch in job_name)
+        return os.path.join(self.watermark_dir, f"{safe_name}.json")
+
+    def load(self, job_name: str) -> Optional[Dict[str, Any]]:
+        """读取任务水位线，返回 {'column', 'value', 'rows', 'updated_at'}；首次运行返回None"""
+        try:
+            with open(self._path(job_name), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def save(self, job_name: str, column: str, value, rows: int = 0):
+        """保存任务水位线（先写临时文件再替换，避免中断时留下半个文件）"""
+        os.makedirs(self.watermark_dir, exist_ok=True)
+        path = self._path(job_name)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        data = {
+            'column': column,
+            'value': to_json_value(value),
+            'rows': rows,
+            'updated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        }
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+
+    def reset(self, job_name: str):
+        """删除任务水位线，下次运行重新全量导出"""
+        path = self._path(job_name)
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def build_incremental_sql(sql, column: str, watermark=None):
+    """
+    将查询包装为只取水位之后新数据的查询
+
+    水位为None（首次运行且未配置初始水位）时不加过滤条件。绑定参数的查询（BoundQuery）包装后保留参数。
+    """
+    if isinstance(sql, BoundQuery):
+        return sql.wrap(lambda inner_sql: build_incremental_sql(inner_sql, column, watermark))
+    inner = trim_sql(sql)
+    if watermark is None:
+        return inner
+    literal = escape_item(watermark, 'utf8mb4')
+    return (f"SELECT * FROM (\n{inner}\n) AS incremental_src\n"
+            f"WHERE incremental_src.`{column}` > {literal}")
+
+
+class WatermarkTracker:
+    """
+    包装一个流式写入器，在写入的同时记录水位列的最大值
+
+    对外接口与被包装的写入器一致（open / write_rows / close / discard）。
+    """
+
+    def __init__(self, writer, column: str):
+        self.writer = writer
+        self.column = column
+        self.max_value = None
+        self._index = None
+
+    @property
+    def rows_written(self):
+        return self.writer.rows_written
+
+    @property
+    def columns(self):
+        return self.writer.columns
+
+    def open(self, columns: Sequence[str]):
+        if self.column not in columns:
+            raise ValueError(f"查询结果中没有水位列: {self.column}")
+        self._index = list(columns).index(self.column)
+        self.writer.open(columns)
+
+    def write_rows(self, rows: List[Sequence]):
+        values = [row[self._index] for row in rows if row[self._index] is not None]
+        if values:
+            batch_max = max(values)
+            if self.max_value is None or batch_max > self.max_value:
+                self.max_value = batch_max
+        self.writer.write_rows(rows)
+
+    def close(self):
+        self.writer.close()
+
+    def discard(self):
+        self.writer.discard()
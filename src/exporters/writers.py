@@ -0,0 +1,671 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+流式文件写入器
+按批次接收查询结果行并写入文件，内存占用与结果集大小无关
+"""
+
+import os
+import re
+import csv
+import gzip
+import logging
+from collections import OrderedDict
+from decimal import Decimal
+from typing import List, Optional, Sequence
+
+from openpyxl import Workbook
+
+logger = logging.getLogger(__name__)
+
+
+def ensure_output_dir(output_path: str):
+    """确保输出文件所在目录存在"""
+    output_dir = os.path.dirname(output_path)
+    if output_dir and not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+        logger.info(f"创建输出目录: {output_dir}")
+
+
+def _discard_workbook(workbook):
+    """
+    放弃未保存的 write-only 工作簿
+
+    已写入的行在 openpyxl 的临时文件中（每个工作表一个，保存时才会删除）：
+    只结束各工作表的写入并直接删除临时文件，不打包整个工作簿，取消导出时不用等待。
+    """
+    for worksheet in workbook.worksheets:
+        try:
+            if not worksheet.closed:
+                worksheet.close()
+            writer = getattr(worksheet, '_writer', None)
+            if writer is not None and os.path.exists(writer.out):
+                writer.cleanup()
+        except Exception as e:
+            logger.debug(f"清理临时文件失败 {worksheet.title}: {e}")
+
+
+# Excel 单个工作表最多 1,048,576 行（含表头）
+EXCEL_MAX_ROWS = 1048576
+# 工作表名称最长 31 个字符
+EXCEL_MAX_SHEET_NAME = 31
+# 超过单表行数上限时的续写方式：sheet=同一文件新建工作表，file=新建文件
+ROLLOVER_MODES = ('sheet', 'file')
+# 支持的导出格式及扩展名
+EXPORT_FORMATS = {
+    'xlsx': '.xlsx',
+    'csv': '.csv',
+    'csv.gz': '.csv.gz',
+    'parquet': '.parquet',
+}
+# 可追加写入已有文件的格式
+APPENDABLE_FORMATS = ('csv', 'csv.gz')
+# CSV 编码：带BOM的UTF-8，Excel 可直接打开，导入工具也按此编码读取
+CSV_ENCODING = 'utf-8-sig'
+
+
+def split_extension(file_path: str):
+    """拆分文件路径与扩展名，识别 .csv.gz 这类双扩展名"""
+    for ext in sorted(EXPORT_FORMATS.values(), key=len, reverse=True):
+        if file_path.lower().endswith(ext):
+            return file_path[:-len(ext)], file_path[-len(ext):]
+    return os.path.splitext(file_path)
+
+
+def with_format_extension(file_path: str, fmt: str) -> str:
+    """将输出路径的扩展名替换为导出格式对应的扩展名"""
+    name, _ = split_extension(file_path)
+    return name + EXPORT_FORMATS[fmt]
+
+
+def rollover_sheet_name(sheet_name: str, part: int) -> str:
+    """第 part 个分表的名称：Sheet1, Sheet1_2, Sheet1_3 ...（截断到31个字符以内）"""
+    if part <= 1:
+        return sheet_name[:EXCEL_MAX_SHEET_NAME]
+    suffix = f"_{part}"
+    return sheet_name[:EXCEL_MAX_SHEET_NAME - len(suffix)] + suffix
+
+
+def rollover_file_path(output_path: str, part: int) -> str:
+    """第 part 个分文件的路径：data.xlsx, data_2.xlsx, data_3.xlsx ..."""
+    if part <= 1:
+        return output_path
+    name, ext = split_extension(output_path)
+    return f"{name}_{part}{ext}"
+
+
+def write_dataframe_sheets(excel_writer, df, sheet_name: str,
+                           max_rows_per_sheet: int = EXCEL_MAX_ROWS - 1) -> List[str]:
+    """
+    将DataFrame写入 pd.ExcelWriter，超过单表行数上限时自动拆分到 Sheet_2、Sheet_3 ...
+
+    Returns:
+        List[str]: 实际写入的工作表名称
+    """
+    sheet_names = []
+    for part, start in enumerate(range(0, max(len(df), 1), max_rows_per_sheet), 1):
+        name = rollover_sheet_name(sheet_name, part)
+        df.iloc[start:start + max_rows_per_sheet].to_excel(excel_writer, sheet_name=name, index=False)
+        sheet_names.append(name)
+    if len(sheet_names) > 1:
+        logger.info(f"工作表 '{sheet_name}' 超过 {max_rows_per_sheet} 行，已拆分为: {', '.join(sheet_names)}")
+    return sheet_names
+
+
+class XlsxStreamWriter:
+    """
+    基于 openpyxl write-only 模式的Excel写入器
+
+    行数据直接序列化到临时文件，不在内存中保留单元格对象。
+    单个工作表写满后自动续写到 Sheet_2、Sheet_3 ...（rollover='sheet'），
+    或续写到 data_2.xlsx、data_3.xlsx ...（rollover='file'），每个工作表都带表头。
+    同一个写入器可多次调用 open()，每次开始一个新的工作表（多查询导出到同一文件）。
+
+    用法:
+        writer = XlsxStreamWriter(path, sheet_name)
+        writer.open(columns)
+        writer.write_rows(rows)
+        writer.close()
+    """
+
+    def __init__(self, output_path: str, sheet_name: str = "Sheet1",
+                 max_rows_per_sheet: int = EXCEL_MAX_ROWS - 1, rollover: str = 'sheet'):
+        if rollover not in ROLLOVER_MODES:
+            raise ValueError(f"不支持的续写方式: {rollover}，可选: {', '.join(ROLLOVER_MODES)}")
+        if max_rows_per_sheet < 1:
+            raise ValueError("max_rows_per_sheet 必须大于0")
+        self.output_path = output_path
+        self.sheet_name = sheet_name
+        self.max_rows_per_sheet = max_rows_per_sheet
+        self.rollover = rollover
+        self.rows_written = 0
+        self.columns = []
+        self.output_paths = []      # 已创建的文件
+        self.sheet_names = []       # 已创建的工作表
+        self._workbook = None
+        self._sheet = None
+        self._sheet_rows = 0
+        self._part = 0
+        self._base_sheet_name = sheet_name
+
+    def open(self, columns: Sequence[str], sheet_name: Optional[str] = None):
+        """
+        开始写入一个工作表
+
+        工作表在写入第一行数据时才创建，结果为空的查询不会留下只有表头的工作表。
+        """
+        self.columns = list(columns)
+        self._base_sheet_name = sheet_name or self.sheet_name
+        self._sheet = None
+        self._sheet_rows = 0
+        self._part = 0
+
+    def _new_workbook(self):
+        path = rollover_file_path(self.output_path, len(self.output_paths) + 1)
+        ensure_output_dir(path)
+        self._workbook = Workbook(write_only=True)
+        self.output_paths.append(path)
+
+    def _save_workbook(self):
+        self._workbook.save(self.output_paths[-1])
+        self._workbook.close()
+        self._workbook = None
+
+    def _next_sheet(self):
+        """创建下一个工作表（必要时换新文件）并写入表头"""
+        self._part += 1
+        if self._workbook is not None and self._part > 1 and self.rollover == 'file':
+            self._save_workbook()
+            logger.info(f"文件行数达到上限，续写到: {rollover_file_path(self.output_path, len(self.output_paths) + 1)}")
+        if self._workbook is None:
+            self._new_workbook()
+
+        if self.rollover == 'file':
+            title = self._base_sheet_name[:EXCEL_MAX_SHEET_NAME]
+        else:
+            title = rollover_sheet_name(self._base_sheet_name, self._part)
+            if self._part > 1:
+                logger.info(f"工作表行数达到上限 {self.max_rows_per_sheet}，续写到工作表: {title}")
+        self._sheet = self._workbook.create_sheet(title=title)
+        self._sheet.append(self.columns)
+        self._sheet_rows = 0
+        self.sheet_names.append(title)
+
+    def write_rows(self, rows: List[Sequence]):
+        """追加一批数据行，当前工作表写满时自动续写"""
+        offset = 0
+        while offset < len(rows):
+            if self._sheet is None or self._sheet_rows >= self.max_rows_per_sheet:
+                self._next_sheet()
+            count = min(len(rows) - offset, self.max_rows_per_sheet - self._sheet_rows)
+            for row in rows[offset:offset + count]:
+                self._sheet.append(row)
+            self._sheet_rows += count
+            offset += count
+        self.rows_written += len(rows)
+
+    def close(self):
+        """保存并关闭工作簿"""
+        if self._workbook is not None:
+            self._save_workbook()
+        self._sheet = None
+
+    def discard(self):
+        """放弃写入（例如查询结果为空或导出失败），删除已生成的文件"""
+        if self._workbook is not None:
+            _discard_workbook(self._workbook)
+        self._workbook = None
+        self._sheet = None
+        for path in self.output_paths:
+            if os.path.exists(path):
+                os.remove(path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+
+class CsvStreamWriter:
+    """
+    CSV / gzip压缩CSV 写入器
+
+    逐批写入文本流，写入速度接近磁盘带宽，没有行数上限。
+    append=True 时追加到已有文件末尾（不重复写表头，gzip 追加为新的压缩段），
+    放弃写入时把文件截断回追加前的大小，原有内容不受影响。
+    """
+
+    def __init__(self, output_path: str, compress: bool = False, encoding: str = CSV_ENCODING,
+                 append: bool = False):
+        self.output_path = output_path
+        self.compress = compress
+        self.encoding = encoding
+        self.append = append
+        self.rows_written = 0
+        self.columns = []
+        self._file = None
+        self._writer = None
+        self._initial_size = 0
+
+    def open(self, columns: Sequence[str]):
+        """创建文件并写入表头；追加到已有文件时跳过表头"""
+        ensure_output_dir(self.output_path)
+        self.columns = list(columns)
+        self._initial_size = 0
+        if self.append and os.path.exists(self.output_path):
+            self._initial_size = os.path.getsize(self.output_path)
+        mode = 'at' if self._initial_size else 'wt'
+        # 追加时不能再写BOM（gzip 新压缩段的写入位置从0开始，utf-8-sig 会在文件中间插入BOM）
+        encoding = 'utf-8' if self._initial_size and self.encoding == 'utf-8-sig' else self.encoding
+        if self.compress:
+            self._file = gzip.open(self.output_path, mode, encoding=encoding, newline='')
+        else:
+            self._file = open(self.output_path, mode, encoding=encoding, newline='')
+        self._writer = csv.writer(self._file)
+        if not self._initial_size:
+            self._writer.writerow(self.columns)
+
+    def write_rows(self, rows: List[Sequence]):
+        """追加一批数据行"""
+        self._writer.writerows(rows)
+        self.rows_written += len(rows)
+
+    def close(self):
+        """刷新并关闭文件"""
+        if self._file is not None:
+            file, self._file, self._writer = self._file, None, None
+            file.close()
+
+    def discard(self):
+        """放弃写入：新建的文件直接删除，追加的文件截断回追加前的大小"""
+        self.close()
+        if not os.path.exists(self.output_path):
+            return
+        if self._initial_size:
+            with open(self.output_path, 'r+b') as f:
+                f.truncate(self._initial_size)
+        else:
+            os.remove(self.output_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+
+def _import_pyarrow():
+    """按需导入 pyarrow（仅 Parquet 导出需要）"""
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("导出 Parquet 需要安装 pyarrow: pip install pyarrow")
+    return pyarrow
+
+
+class ParquetStreamWriter:
+    """
+    Parquet 写入器
+
+    每批数据写成一个 row group。列类型由第一批数据推断：
+    第一批全为空的列按字符串保存，DECIMAL 统一放宽到38位精度，避免后续批次精度更大时写入失败。
+    """
+
+    def __init__(self, output_path: str, compression: str = 'snappy'):
+        self._pa = _import_pyarrow()
+        self.output_path = output_path
+        self.compression = compression
+        self.rows_written = 0
+        self.columns = []
+        self._schema = None
+        self._writer = None
+
+    def open(self, columns: Sequence[str]):
+        """记录列名；schema 在写入第一批数据时确定"""
+        ensure_output_dir(self.output_path)
+        self.columns = list(columns)
+
+    def _infer_schema(self, column_values):
+        pa = self._pa
+        fields = []
+        for name, values in zip(self.columns, column_values):
+            arrow_type = pa.array(values).type
+            if pa.types.is_null(arrow_type):
+                arrow_type = pa.string()
+            elif pa.types.is_decimal(arrow_type):
+                arrow_type = pa.decimal128(38, arrow_type.scale)
+            fields.append(pa.field(name, arrow_type))
+        return pa.schema(fields)
+
+    def write_rows(self, rows: List[Sequence]):
+        """将一批数据写为一个 row group"""
+        if not rows:
+            return
+        pa = self._pa
+        column_values = [list(values) for values in zip(*rows)]
+        if self._schema is None:
+            self._schema = self._infer_schema(column_values)
+            self._writer = pa.parquet.ParquetWriter(self.output_path, self._schema,
+                                                    compression=self.compression)
+        arrays = []
+        for field, values in zip(self._schema, column_values):
+            if pa.types.is_string(field.type):
+                values = [None if v is None else v if isinstance(v, str) else str(v) for v in values]
+            elif pa.types.is_decimal(field.type):
+                values = [v if v is None or isinstance(v, Decimal) else Decimal(str(v)) for v in values]
+            arrays.append(pa.array(values, type=field.type))
+        self._writer.write_table(pa.Table.from_arrays(arrays, schema=self._schema))
+        self.rows_written += len(rows)
+
+    def close(self):
+        """写入文件尾并关闭"""
+        if self._writer is not None:
+            writer, self._writer = self._writer, None
+            writer.close()
+
+    def discard(self):
+        """放弃写入，删除已生成的文件"""
+        self.close()
+        if os.path.exists(self.output_path):
+            os.remove(self.output_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+
+# 按列值拆分导出时同时打开的写入器上限（超过后关闭最久未写入的，csv/csv.gz 之后可追加续写）
+DEFAULT_MAX_OPEN_WRITERS = 64
+# 按列值拆分的输出方式：file=每个值一个文件，sheet=每个值一个工作表（仅xlsx）
+SPLIT_TARGETS = ('file', 'sheet')
+# 文件名与工作表名中不能出现的字符
+_INVALID_NAME_CHARS = re.compile(r'[\\/:*?"<>|\[\]\s]+')
+
+
+def split_value_name(value, max_length: int = 100) -> str:
+    """列值转换为可用于文件名/工作表名的文本"""
+    if value is None or value == '':
+        return '空值'
+    return _INVALID_NAME_CHARS.sub('_', str(value)).strip('_.')[:max_length] or '空值'
+
+
+class SplitWriter:
+    """
+    按某列的值拆分写入：每个值一个文件（target='file'）或一个工作表（target='sheet'，仅xlsx）
+
+    查询结果只读一遍，每行写入对应值的输出。对外接口与其他流式写入器一致。
+    target='file' 时最多同时打开 max_open 个写入器，超过后关闭最久未写入的：
+    csv/csv.gz 再遇到该值时追加续写；xlsx/parquet 关闭后无法续写，只能保持打开并给出警告。
+    """
+
+    def __init__(self, output_path: str, fmt: str, column: str, target: str = 'file',
+                 sheet_name: str = "Sheet1", rollover: str = 'sheet', max_open: int = DEFAULT_MAX_OPEN_WRITERS,
+                 max_rows_per_sheet: int = EXCEL_MAX_ROWS - 1):
+        if target not in SPLIT_TARGETS:
+            raise ValueError(f"不支持的拆分方式: {target}，可选: {', '.join(SPLIT_TARGETS)}")
+        if target == 'sheet' and fmt != 'xlsx':
+            raise ValueError("按工作表拆分只支持 xlsx 格式")
+        self.output_path = output_path
+        self.fmt = fmt
+        self.column = column
+        self.target = target
+        self.sheet_name = sheet_name
+        self.rollover = rollover
+        self.max_open = max(max_open, 1)
+        self.max_rows_per_sheet = max_rows_per_sheet
+        self.rows_written = 0
+        self.columns = []
+        self.value_rows = {}        # 列值 -> 行数
+        self._index = None
+        self._names = {}            # 列值 -> 文件名/工作表名后缀
+        self._used_names = set()
+        self._writers = OrderedDict()   # 打开中的写入器（按最近写入排序）
+        self._paths = {}            # 列值 -> 输出文件
+        self._warned_open = False
+        self._workbook = None
+        self._sheets = {}           # 列值 -> [工作表, 已写行数, 分表序号]
+
+    @property
+    def output_paths(self) -> List[str]:
+        if self.target == 'sheet':
+            return [self.output_path] if self._workbook is not None or self.rows_written else []
+        return list(self._paths.values())
+
+    def open(self, columns: Sequence[str]):
+        if self.column not in columns:
+            raise ValueError(f"查询结果中没有拆分列: {self.column}")
+        self.columns = list(columns)
+        self._index = self.columns.index(self.column)
+
+    def _name_for(self, value, max_length: int) -> str:
+        name = self._names.get(value)
+        if name is None:
+            base = split_value_name(value, max_length)
+            name, n = base, 1
+            while name.lower() in self._used_names:
+                n += 1
+                suffix = f"_{n}"
+                name = base[:max_length - len(suffix)] + suffix
+            self._used_names.add(name.lower())
+            self._names[value] = name
+        return name
+
+    def _file_writer(self, value):
+        writer = self._writers.get(value)
+        if writer is not None:
+            self._writers.move_to_end(value)
+            return writer
+
+        reopen = value in self._paths
+        if not reopen:
+            name, ext = split_extension(self.output_path)
+            self._paths[value] = f"{name}_{self._name_for(value, 100)}{ext}"
+        if len(self._writers) >= self.max_open:
+            if self.fmt in APPENDABLE_FORMATS:
+                _, oldest = self._writers.popitem(last=False)
+                oldest.close()
+            elif not self._warned_open:
+                self._warned_open = True
+                logger.warning(f"{self.fmt} 文件关闭后无法续写，同时打开的文件数超过 {self.max_open} 个，"
+                               f"值较多时建议改用 csv/csv.gz 或按工作表拆分")
+        writer = create_writer(self.fmt, self._paths[value], self.sheet_name, self.rollover, append=reopen)
+        writer.open(self.columns)
+        self._writers[value] = writer
+        return writer
+
+    def _write_sheet(self, value, rows: List[Sequence]):
+        if self._workbook is None:
+            ensure_output_dir(self.output_path)
+            self._workbook = Workbook(write_only=True)
+        state = self._sheets.get(value)
+        offset = 0
+        while offset < len(rows):
+            if state is None or state[1] >= self.max_rows_per_sheet:
+                name = self._name_for(value, EXCEL_MAX_SHEET_NAME - 4)
+                part = state[2] + 1 if state else 1
+                # 续写的工作表名不能与其他值的工作表重名
+                while part > 1 and rollover_sheet_name(name, part).lower() in self._used_names:
+                    part += 1
+                title = rollover_sheet_name(name, part)
+                self._used_names.add(title.lower())
+                sheet = self._workbook.create_sheet(title=title)
+                sheet.append(self.columns)
+                state = self._sheets[value] = [sheet, 0, part]
+            count = min(len(rows) - offset, self.max_rows_per_sheet - state[1])
+            for row in rows[offset:offset + count]:
+                state[0].append(row)
+            state[1] += count
+            offset += count
+
+    def write_rows(self, rows: List[Sequence]):
+        """按拆分列的值分组后写入各自的输出"""
+        groups = OrderedDict()
+        for row in rows:
+            groups.setdefault(row[self._index], []).append(row)
+        for value, group in groups.items():
+            if self.target == 'sheet':
+                self._write_sheet(value, group)
+            else:
+                self._file_writer(value).write_rows(group)
+            self.value_rows[value] = self.value_rows.get(value, 0) + len(group)
+        self.rows_written += len(rows)
+
+    def close(self):
+        """关闭所有输出"""
+        if self._workbook is not None:
+            self._workbook.save(self.output_path)
+            self._workbook.close()
+            self._workbook = None
+        while self._writers:
+            _, writer = self._writers.popitem(last=False)
+            writer.close()
+
+    def discard(self):
+        """放弃写入，删除所有已生成的文件"""
+        if self._workbook is not None:
+            _discard_workbook(self._workbook)
+            self._workbook = None
+        while self._writers:
+            _, writer = self._writers.popitem(last=False)
+            writer.discard()
+        for path in self._paths.values():
+            if os.path.exists(path):
+                os.remove(path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+
+def parse_formats(value) -> List[str]:
+    """
+    解析导出格式列表："xlsx,csv.gz" 或 ['xlsx', 'csv.gz']，去重并保持顺序
+    """
+    items = value.split(',') if isinstance(value, str) else list(value)
+    formats = []
+    for item in items:
+        fmt = item.strip().lower()
+        if not fmt:
+            continue
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"不支持的导出格式: {fmt}，可选: {', '.join(EXPORT_FORMATS)}")
+        if fmt not in formats:
+            formats.append(fmt)
+    if not formats:
+        raise ValueError("至少需要指定一种导出格式")
+    return formats
+
+
+class TeeWriter:
+    """
+    把同一份流式结果同时写入多个写入器（如同一查询同时输出 xlsx、csv.gz、parquet）
+
+    查询只执行一次，每批数据依次交给各写入器；写入出错时由调用方 discard()，关闭出错时自行 discard()，
+    任一格式失败时全部放弃，不会只留下部分格式的文件。
+    对外接口与其他流式写入器一致。
+    """
+
+    def __init__(self, writers: Sequence):
+        if not writers:
+            raise ValueError("至少需要一个写入器")
+        self.writers = list(writers)
+        self.output_path = self.writers[0].output_path
+        self.rows_written = 0
+        self.columns = []
+
+    @property
+    def output_paths(self) -> List[str]:
+        paths = []
+        for writer in self.writers:
+            paths.extend(getattr(writer, 'output_paths', None) or [writer.output_path])
+        return paths
+
+    def open(self, columns: Sequence[str]):
+        self.columns = list(columns)
+        for writer in self.writers:
+            writer.open(columns)
+
+    def write_rows(self, rows: List[Sequence]):
+        for writer in self.writers:
+            writer.write_rows(rows)
+        self.rows_written += len(rows)
+
+    def close(self):
+        """关闭所有写入器；某个关闭失败时仍关闭其余的，然后删除所有格式的文件，抛出第一个错误"""
+        error = None
+        for writer in self.writers:
+            try:
+                writer.close()
+            except Exception as e:
+                logger.error(f"关闭写入器失败 {writer.output_path}: {e}")
+                error = error or e
+        if error is not None:
+            self.discard()
+            raise error
+
+    def discard(self):
+        """放弃写入，删除所有写入器已生成的文件"""
+        for writer in self.writers:
+            try:
+                writer.discard()
+            except Exception as e:
+                logger.debug(f"放弃写入失败 {writer.output_path}: {e}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+
+def create_tee_writer(formats: Sequence[str], output_path: str, sheet_name: str = "Sheet1",
+                      rollover: str = 'sheet') -> TeeWriter:
+    """按格式列表创建同时写入的写入器，各格式的文件名相同、扩展名不同"""
+    return TeeWriter([create_writer(fmt, with_format_extension(output_path, fmt), sheet_name, rollover)
+                      for fmt in parse_formats(formats)])
+
+
+def create_writer(fmt: str, output_path: str, sheet_name: str = "Sheet1", rollover: str = 'sheet',
+                  append: bool = False):
+    """
+    按导出格式创建流式写入器
+
+    Args:
+        fmt: xlsx / csv / csv.gz / parquet
+        output_path: 输出文件路径
+        sheet_name: 工作表名称（仅xlsx）
+        rollover: 超过单表行数上限时的续写方式（仅xlsx）
+        append: 追加到已有文件（仅 csv / csv.gz）
+    """
+    if append and fmt not in APPENDABLE_FORMATS:
+        raise ValueError(f"{fmt} 格式不支持追加写入，可追加的格式: {', '.join(APPENDABLE_FORMATS)}")
+    if fmt == 'xlsx':
+        return XlsxStreamWriter(output_path, sheet_name, rollover=rollover)
+    if fmt == 'csv':
+        return CsvStreamWriter(output_path, append=append)
+    if fmt == 'csv.gz':
+        return CsvStreamWriter(output_path, compress=True, append=append)
+    if fmt == 'parquet':
+        return ParquetStreamWriter(output_path)
+    raise ValueError(f"不支持的导出格式: {fmt}，可选: {', '.join(EXPORT_FORMATS)}")
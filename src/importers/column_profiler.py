@@ -0,0 +1,324 @@
+# column_profiler.py
+# 导入时统计各字段的数据特征（最大长度、基数、空值率、数值范围），用于推荐更紧凑的字段类型
+import os
+import json
+import threading
+import pandas as pd
+
+# 字段画像保存目录
+PROFILE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    'data', 'column_profiles'
+)
+# 不同值集合的上限，超过后只记录"大于上限"
+DISTINCT_CAP = 1000
+# 视为空值的字符串
+NULL_STRINGS = ('', 'NULL', 'nan', 'NaN', 'None', 'NaT', '-')
+# 每次更新最多解析为日期的文本值个数（随机抽样；日期解析很慢，长度、基数、数值范围仍按全部值统计）
+DATE_SAMPLE_SIZE = 1000
+
+_profile_locks = {}
+_profile_locks_guard = threading.Lock()
+
+
+def _get_table_lock(table_name):
+    with _profile_locks_guard:
+        return _profile_locks.setdefault(table_name, threading.Lock())
+
+
+class ColumnProfile:
+    """单个字段的数据画像，可跨多次导入累积"""
+
+    def __init__(self):
+        self.count = 0              # 总行数
+        self.nulls = 0              # 空值行数
+        self.max_length = 0         # 非空值最大字符数
+        self.distinct = set()       # 不同值（超过上限后置为None）
+        self.numeric_count = 0      # 可解析为数字的值
+        self.integer_count = 0      # 可解析为整数的值
+        self.numeric_min = None
+        self.numeric_max = None
+        self.max_decimals = 0       # 小数位数最大值
+        self.date_checked = 0       # 做过日期检测的值（文本值只检测抽样）
+        self.date_count = 0         # 其中可解析为日期的值（含 YYYYMMDD 整数）
+        self.datetime_count = 0     # 带非零时间部分的日期值
+
+    @property
+    def may_be_date(self):
+        """目前检测过的值是否全部为日期；出现非日期值后不再做日期检测"""
+        return self.date_count == self.date_checked
+
+    def update(self, series: pd.Series):
+        """用一列数据更新画像"""
+        self.count += len(series)
+        values = series.dropna().astype(str).str.strip()
+        values = values[~values.isin(NULL_STRINGS)]
+        self.nulls += len(series) - len(values)
+        if values.empty:
+            return
+
+        self.max_length = max(self.max_length, int(values.str.len().max()))
+
+        if self.distinct is not None:
+            self.distinct.update(values.unique().tolist())
+            if len(self.distinct) > DISTINCT_CAP:
+                self.distinct = None
+
+        numeric = pd.to_numeric(values, errors='coerce')
+        numeric_values = numeric.dropna()
+        self.numeric_count += len(numeric_values)
+        if not numeric_values.empty:
+            low, high = float(numeric_values.min()), float(numeric_values.max())
+            self.numeric_min = low if self.numeric_min is None else min(self.numeric_min, low)
+            self.numeric_max = high if self.numeric_max is None else max(self.numeric_max, high)
+            integers = numeric_values[numeric_values % 1 == 0]
+            self.integer_count += len(integers)
+            decimal_parts = values[numeric.notna()].str.partition('.')[2].str.rstrip('0')
+            self.max_decimals = max(self.max_decimals, int(decimal_parts.str.len().max() or 0))
+
+        if not self.may_be_date:
+            return
+        # 形如 20250601 的整数日期（向量化解析，检测全部数值）
+        if not numeric_values.empty:
+            self.date_checked += len(numeric_values)
+            candidates = integers[(integers >= 19000101) & (integers <= 21001231)]
+            if not candidates.empty:
+                parsed = pd.to_datetime(candidates.astype('int64').astype(str), format='%Y%m%d', errors='coerce')
+                self.date_count += int(parsed.notna().sum())
+            if not self.may_be_date:
+                return
+
+        # 日期字符串：格式不固定只能逐个解析，只检测抽样
+        text_values = values[numeric.isna()]
+        if not text_values.empty:
+            sample = text_values
+            if len(text_values) > DATE_SAMPLE_SIZE:
+                # 固定种子的随机抽样：结果可复现，也不会像等间隔抽样那样与数据的周期重合
+                sample = text_values.sample(DATE_SAMPLE_SIZE, random_state=0)
+            parsed = pd.to_datetime(sample, errors='coerce', format='mixed').dropna()
+            self.date_checked += len(sample)
+            self.date_count += len(parsed)
+            has_time = (parsed.dt.hour != 0) | (parsed.dt.minute != 0) | (parsed.dt.second != 0)
+            self.datetime_count += int(has_time.sum())
+
+    @property
+    def non_null(self):
+        return self.count - self.nulls
+
+    @property
+    def null_rate(self):
+        return self.nulls / self.count if self.count else 0.0
+
+    @property
+    def cardinality(self):
+        """不同值个数；超过上限时返回None"""
+        return None if self.distinct is None else len(self.distinct)
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'nulls': self.nulls,
+            'max_length': self.max_length,
+            'distinct': None if self.distinct is None else sorted(self.distinct),
+            'numeric_count': self.numeric_count,
+            'integer_count': self.integer_count,
+            'numeric_min': self.numeric_min,
+            'numeric_max': self.numeric_max,
+            'max_decimals': self.max_decimals,
+            'date_checked': self.date_checked,
+            'date_count': self.date_count,
+            'datetime_count': self.datetime_count
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        profile = cls()
+        for key, value in data.items():
+            setattr(profile, key, value)
+        profile.distinct = None if data.get('distinct') is None else set(data['distinct'])
+        if 'date_checked' not in data:
+            # 旧版画像对全部非空值做过日期检测
+            profile.date_checked = profile.non_null
+        return profile
+
+    def merge(self, other):
+        """合并另一份画像（例如同一次导入中各数据块的画像）"""
+        self.count += other.count
+        self.nulls += other.nulls
+        self.max_length = max(self.max_length, other.max_length)
+        if self.distinct is not None and other.distinct is not None:
+            self.distinct |= other.distinct
+            if len(self.distinct) > DISTINCT_CAP:
+                self.distinct = None
+        else:
+            self.distinct = None
+        self.numeric_count += other.numeric_count
+        self.integer_count += other.integer_count
+        lows = [value for value in (self.numeric_min, other.numeric_min) if value is not None]
+        highs = [value for value in (self.numeric_max, other.numeric_max) if value is not None]
+        self.numeric_min = min(lows) if lows else None
+        self.numeric_max = max(highs) if highs else None
+        self.max_decimals = max(self.max_decimals, other.max_decimals)
+        self.date_checked += other.date_checked
+        self.date_count += other.date_count
+        self.datetime_count += other.datetime_count
+        return self
+
+
+def get_profile_path(table_name):
+    """获取表的字段画像文件路径"""
+    return os.path.join(PROFILE_DIR, f"{table_name}.json")
+
+
+def load_table_profile(table_name):
+    """读取表的字段画像，返回 {字段名: ColumnProfile}"""
+    try:
+        with open(get_profile_path(table_name), 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+    return {column: ColumnProfile.from_dict(item) for column, item in data.items()}
+
+
+def save_table_profile(table_name, profiles):
+    """保存表的字段画像"""
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    path = get_profile_path(table_name)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({column: profile.to_dict() for column, profile in profiles.items()}, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def profile_dataframe(profiles, df):
+    """用DataFrame的每一列更新画像字典"""
+    for column in df.columns:
+        profiles.setdefault(column, ColumnProfile()).update(df[column])
+    return profiles
+
+
+def merge_table_profile(table_name, profiles):
+    """
+    将一次导入的画像合并到表的字段画像中并保存（每次导入只读写一次画像文件）
+
+    画像失败不影响导入，只打印提示。
+    """
+    try:
+        with _get_table_lock(table_name):
+            saved = load_table_profile(table_name)
+            for column, profile in profiles.items():
+                if column in saved:
+                    saved[column].merge(profile)
+                else:
+                    saved[column] = profile
+            save_table_profile(table_name, saved)
+    except Exception as e:
+        print(f"字段画像更新失败（不影响导入）: {e}")
+
+
+def record_dataframe_profile(table_name, df):
+    """
+    将一次导入的数据累积到表的字段画像中
+
+    画像失败不影响导入，只打印提示。分块导入时先用 profile_dataframe 累积各块，
+    导入结束后调用一次 merge_table_profile。
+    """
+    try:
+        profiles = profile_dataframe({}, df)
+    except Exception as e:
+        print(f"字段画像更新失败（不影响导入）: {e}")
+        return
+    merge_table_profile(table_name, profiles)
+
+
+def reset_table_profile(table_name):
+    """清空表的字段画像（例如表被清空重传时）"""
+    path = get_profile_path(table_name)
+    if os.path.exists(path):
+        os.remove(path)
+
+
+# ---------- 类型推荐 ----------
+
+# 整数类型取值范围（有符号）
+INTEGER_RANGES = [
+    ('TINYINT', -128, 127),
+    ('SMALLINT', -32768, 32767),
+    ('MEDIUMINT', -8388608, 8388607),
+    ('INT', -2147483648, 2147483647),
+    ('BIGINT', -9223372036854775808, 9223372036854775807),
+]
+VARCHAR_STEPS = (16, 32, 50, 64, 100, 128, 255, 512, 1024)
+ENUM_MAX_VALUES = 10        # 不同值不超过该数量时推荐ENUM
+MIN_PROFILE_ROWS = 1000     # 样本行数过少时不做推荐
+TYPE_RANK = {
+    'TINYINT': 1, 'SMALLINT': 2, 'MEDIUMINT': 3, 'INT': 4, 'INTEGER': 4, 'BIGINT': 5,
+}
+
+
+def _integer_type(low, high):
+    for type_name, type_min, type_max in INTEGER_RANGES:
+        if low >= type_min and high <= type_max:
+            return type_name
+        # 非负值可使用无符号类型，范围翻倍
+        if low >= 0 and high <= type_max * 2 + 1:
+            return f"{type_name} UNSIGNED"
+    return 'BIGINT'
+
+
+def propose_column_type(current_type, profile):
+    """
+    根据字段画像推荐更紧凑的字段类型
+
+    Args:
+        current_type: TABLE_SCHEMAS 中的当前类型定义
+        profile: ColumnProfile
+
+    Returns:
+        Tuple[str, str]: (推荐类型, 原因)；无需变更时推荐类型为None
+    """
+    base_type = current_type.upper().split()[0].split('(')[0]
+    suffix = ' NOT NULL' if 'NOT NULL' in current_type.upper() else ''
+    extra = ' AUTO_INCREMENT' if 'AUTO_INCREMENT' in current_type.upper() else ''
+    non_null = profile.non_null
+
+    if profile.count < MIN_PROFILE_ROWS or non_null == 0:
+        return None, f"样本不足（{profile.count} 行，非空 {non_null}）"
+
+    all_numeric = profile.numeric_count == non_null
+    all_dates = profile.date_checked > 0 and profile.may_be_date
+
+    # 日期：整数 YYYYMMDD 或日期字符串
+    if all_dates and base_type not in ('DATE', 'DATETIME', 'TIMESTAMP'):
+        target = 'DATETIME' if profile.datetime_count else 'DATE'
+        return target + suffix, f"全部 {non_null} 个非空值均为日期"
+
+    # 整数：按取值范围选择最小整数类型（字符串列可能有前导零的编号，不转为整数）
+    if base_type in TYPE_RANK and all_numeric and profile.integer_count == non_null:
+        target = _integer_type(profile.numeric_min, profile.numeric_max)
+        if TYPE_RANK[target.split()[0]] < TYPE_RANK[base_type]:
+            return target + extra + suffix, f"整数范围 [{profile.numeric_min:.0f}, {profile.numeric_max:.0f}]"
+        return None, "整数类型已足够紧凑"
+
+    # 浮点金额：小数位数有限时使用DECIMAL，避免浮点误差
+    if all_numeric and base_type in ('DOUBLE', 'FLOAT') and profile.max_decimals <= 4:
+        scale = max(profile.max_decimals, 2)
+        integer_digits = len(str(int(max(abs(profile.numeric_min), abs(profile.numeric_max)))))
+        precision = min(max(integer_digits + 4, 10) + scale, 65)
+        return f"DECIMAL({precision}, {scale})" + suffix, f"最多 {profile.max_decimals} 位小数，最大绝对值 {integer_digits} 位整数"
+
+    # 字符串：低基数用ENUM，否则按最大长度收紧为VARCHAR
+    if base_type.endswith('TEXT') or base_type in ('VARCHAR', 'CHAR'):
+        cardinality = profile.cardinality
+        if cardinality is not None and cardinality <= ENUM_MAX_VALUES and non_null >= MIN_PROFILE_ROWS:
+            values = ', '.join("'" + value.replace("'", "''") + "'" for value in sorted(profile.distinct))
+            return f"ENUM({values})" + suffix, f"仅 {cardinality} 个不同值"
+        if base_type.endswith('TEXT'):
+            # 预留25%余量
+            needed = int(profile.max_length * 1.25) + 1
+            for step in VARCHAR_STEPS:
+                if needed <= step:
+                    return f"VARCHAR({step})" + suffix, f"最大长度 {profile.max_length}"
+            return None, f"最大长度 {profile.max_length}，保留TEXT"
+
+    return None, "无需变更"
@@ -2,16 +2,25 @@
 # 批量导入多表CSV文件到MySQL数据库
 import os
 import pandas as pd
-from sqlalchemy import create_engine, text, inspect
-from src.shared.config import DB_CONFIG, DATA_SOURCES, get_csv_dir_for_table, get_all_table_names, get_update_strategy, TABLE_PRIMARY_KEYS
+from sqlalchemy import text, inspect
+from src.shared.config import DATA_SOURCES, get_csv_dir_for_table, get_all_table_names, get_update_strategy, TABLE_PRIMARY_KEYS
 from src.shared.config import TABLE_COLUMNS
 from src.shared.table_schemas import TABLE_SCHEMAS
+from src.importers.column_profiler import merge_table_profile, profile_dataframe, record_dataframe_profile, reset_table_profile
+from src.shared.table_versions import bump_table_version
+from src.shared.db_pool import get_engine
 from sqlalchemy.exc import ProgrammingError, SQLAlchemyError
 import time # 导入time模块
 
-# 数据库连接字符串
-conn_str = f"mysql+pymysql://{DB_CONFIG['user']}:{DB_CONFIG['password']}@{DB_CONFIG['host']}:{DB_CONFIG['port']}/{DB_CONFIG['database']}?charset={DB_CONFIG['charset']}"
-engine = create_engine(conn_str, echo=False, pool_recycle=120, pool_pre_ping=True)
+# 导入连接池在首次导入时才创建（get_engine('import')），
+# 以便 main_importer 先按实际消费者线程数调用 configure_pool('import', ...)
+
+
+def __getattr__(name):
+    """兼容 db_importer.engine 的写法：访问时返回共享的导入连接池"""
+    if name == 'engine':
+        return get_engine('import')
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 def get_csv_files(directory):
     """
@@ -27,6 +36,7 @@ def import_csv_to_mysql(csv_path, table_name, chunk_size=20000):
     分块导入单个CSV文件到指定表
     """
     print(f"\n开始导入: {os.path.basename(csv_path)} 到表 '{table_name}' ...")
+    engine = get_engine('import')
     try:
         # 检查列名是否有重复
         chunk_iter = pd.read_csv(csv_path, encoding='utf-8-sig', chunksize=chunk_size)
@@ -59,11 +69,21 @@ def import_csv_to_mysql(csv_path, table_name, chunk_size=20000):
         
         # 进行实际导入
         total = 0
-        for i, chunk in enumerate(chunk_iter, 1):
-            # 直接导入，不做任何日期格式处理
-            chunk.to_sql(table_name, engine, if_exists='append', index=False, method='multi')
-            total += len(chunk)
-            print(f"  已导入 {total} 行...")
+        # 各数据块的字段画像先在内存中累积，导入结束后合并保存一次
+        profiles = {}
+        try:
+            for i, chunk in enumerate(chunk_iter, 1):
+                # 直接导入，不做任何日期格式处理
+                chunk.to_sql(table_name, engine, if_exists='append', index=False, method='multi')
+                bump_table_version(table_name)
+                try:
+                    profile_dataframe(profiles, chunk)
+                except Exception as e:
+                    print(f"字段画像更新失败（不影响导入）: {e}")
+                total += len(chunk)
+                print(f"  已导入 {total} 行...")
+        finally:
+            merge_table_profile(table_name, profiles)
         print(f"导入完成: {os.path.basename(csv_path)}，共导入 {total} 行到表 '{table_name}'。")
         
         # 验证导入结果
@@ -108,6 +128,8 @@ def truncate_table(table_name, engine):
         with engine.connect() as connection:
             with connection.begin(): # 使用事务确保TRUNCATE被正确执行
                 connection.execute(text(f"TRUNCATE TABLE `{table_name}`"))
+        bump_table_version(table_name)
+        reset_table_profile(table_name)
         print(f"成功清空表: {table_name}")
     except Exception as e:
         print(f"清空表 '{table_name}' 失败: {e}")
@@ -183,6 +205,7 @@ def import_table(table_name):
         print(f"错误：表 '{table_name}' 未在配置中找到")
         return
 
+    engine = get_engine('import')
     # 自动同步表结构
     sync_table_schema(table_name, engine)
 
@@ -224,6 +247,8 @@ def import_table(table_name):
             with engine.connect() as conn:
                 conn.execute(text(f"TRUNCATE TABLE {table_name}"))
                 print(f"已清空表 '{table_name}'")
+            bump_table_version(table_name)
+            reset_table_profile(table_name)
             
             df_to_import = df_all
             print(f"将导入所有 {len(df_to_import)} 行数据")
@@ -271,11 +296,15 @@ def import_table(table_name):
             
             try:
                 chunk.to_sql(table_name, engine, if_exists='append', index=False, method='multi')
+                bump_table_version(table_name)
                 total_imported += len(chunk)
                 print(f"  已导入 {total_imported} 行数据...")
             except SQLAlchemyError as e:
                 print(f"分块插入出错，已跳过本块: {str(e)[:300]}...")
         
+        # 累积字段画像，供字段类型优化使用
+        record_dataframe_profile(table_name, df_to_import)
+        
         # 验证最终结果
         with engine.connect() as conn:
             result = conn.execute(text(f"SELECT COUNT(*) FROM {table_name}"))
@@ -296,6 +325,7 @@ def import_dataframe_to_mysql(df, table_name, chunk_size=20000):
     直接将DataFrame分块导入指定表
     """
     print(f"\n开始导入DataFrame到表 '{table_name}' ...")
+    engine = get_engine('import')
     max_retries = 3 # 最大重试次数
     initial_delay = 1 # 初始等待秒数
 
@@ -419,6 +449,7 @@ def import_dataframe_to_mysql(df, table_name, chunk_size=20000):
             for attempt in range(max_retries):
                 try:
                     chunk.to_sql(table_name, engine, if_exists='append', index=False, method='multi')
+                    bump_table_version(table_name)
                     total += len(chunk)
                     print(f"  已导入 {total} 行...")
                     break # 成功则退出重试
@@ -434,6 +465,9 @@ def import_dataframe_to_mysql(df, table_name, chunk_size=20000):
         
         print(f"导入完成: DataFrame，共导入 {total} 行到表 '{table_name}'。")
         
+        # 累积字段画像，供字段类型优化使用
+        record_dataframe_profile(table_name, df_to_import)
+        
         # 验证导入结果
         with engine.connect() as conn:
             result = conn.execute(text(f"SELECT COUNT(*) FROM {table_name}"))
@@ -9,12 +9,12 @@ from typing import Optional, Tuple, List
 from src.importers.xlsx_to_csv import convert_excel_to_csv_by_schema
 from src.importers.db_importer import import_table, import_dataframe_to_mysql, truncate_table
 from src.shared.table_schemas import TABLE_SCHEMAS
-from src.shared.config import DATA_SOURCES, get_excel_dir, get_csv_dir_for_table, BATCH_GROUPS, TABLE_COLUMNS, get_update_strategy
+from src.shared.config import DATA_SOURCES, get_excel_dir, get_csv_dir_for_table, BATCH_GROUPS, TABLE_COLUMNS, get_update_strategy, CONCURRENCY
 import pandas as pd
 from concurrent.futures import ThreadPoolExecutor, Future
 import queue
 import threading
-from src.importers.db_importer import engine
+from src.shared.db_pool import configure_pool, get_engine
 
 
 # 配置日志
@@ -34,9 +34,12 @@ class ConcurrentExcelImporter:
     """
     通过管理生产者和消费者线程池，并发地处理和导入Excel文件。
     """
-    def __init__(self, max_producers: int = 4, max_consumers: int = 4):
+    def __init__(self, max_producers: int = CONCURRENCY['import_producers'],
+                 max_consumers: int = CONCURRENCY['import_consumers']):
         self.max_producers = max_producers
         self.max_consumers = max_consumers
+        # 每个消费者线程同时占用一个导入连接
+        configure_pool('import', max_consumers)
         self.dataframe_queue = queue.Queue(maxsize=20)
         self.error_queue = queue.Queue()
         self.pending_tasks = queue.Queue()
@@ -130,7 +133,7 @@ class ConcurrentExcelImporter:
                         if table_name not in self._truncated_tables:
                             try:
                                 self.log_progress(f"检测到 'truncate' 策略，首次任务将清空表: {table_name}")
-                                truncate_table(table_name, engine)
+                                truncate_table(table_name, get_engine('import'))
                                 self._truncated_tables.add(table_name)
                             except Exception as e:
                                 self.log_progress(f"清空表 {table_name} 失败: {e}", "ERROR")
@@ -216,7 +219,7 @@ def main():
         print("未找到需要导入的表，请检查参数。")
         return
 
-    importer = ConcurrentExcelImporter(max_producers=4, max_consumers=4)
+    importer = ConcurrentExcelImporter()
     try:
         importer.run(target_tables)
     except Exception as e:
@@ -7,16 +7,467 @@
 
 import os
 import sys
+import argparse
+import time
+import multiprocessing
+import multiprocessing.util
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
 
 # 添加项目根目录到Python路径
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 
+from src.shared.config import PREFLIGHT_THRESHOLDS
 from src.exporters.db_to_excel_exporter import DatabaseToExcelExporter
-from src.exporters.sql_manager import get_query, format_query, list_queries
+from src.exporters.preflight import print_preflight, record_preflight
+from src.exporters.sql_manager import build_query, list_queries, get_query_timeout, get_query_shard_key
+from src.exporters.writers import (
+    EXPORT_FORMATS, APPENDABLE_FORMATS, with_format_extension, split_extension, create_writer, SplitWriter,
+    TeeWriter, create_tee_writer, parse_formats
+)
+from src.exporters.watermarks import WatermarkStore, WatermarkTracker, build_incremental_sql
+from src.exporters.keyset import DEFAULT_PAGE_SIZE, sql_fingerprint
 
 
-def batch_export_queries(export_configs, output_dir, include_timestamp=True):
+def _job_output(config, output_dir):
+    """
+    任务的输出路径与格式
+    
+    Returns:
+        (输出路径, 主格式, 多格式列表或None)；格式配置错误时抛出 ValueError
+    """
+    fmt = config.get('format', 'xlsx')
+    # 配置 'outputs': ['xlsx', 'csv.gz', 'parquet'] 时查询只执行一次，同时写出多种格式
+    outputs = parse_formats(config['outputs']) if config.get('outputs') else None
+    if outputs:
+        fmt = outputs[0]
+    if config.get('output_filename'):
+        output_path = os.path.join(output_dir, config['output_filename'])
+    else:
+        output_path = os.path.join(output_dir, config['query_name'] + EXPORT_FORMATS[fmt])
+    return output_path, fmt, outputs
+
+
+def _job_timeout(config):
+    """超时优先级：任务配置 'timeout' > 命令行 --timeout > SQL文件中的 "-- 超时:" 配置"""
+    timeout = config.get('timeout')
+    if timeout is None:
+        timeout = get_query_timeout(config['query_name'])
+    return timeout
+
+
+def _job_preflight(exporter, sql_query, label):
+    """
+    导出前预检：超过拒绝阈值的任务跳过（计为失败），超过确认阈值只提示（批量导出不交互）
+    
+    Returns:
+        (是否继续, 预检结果或None)
+    """
+    try:
+        preflight_result = exporter.preflight(sql_query, PREFLIGHT_THRESHOLDS, label)
+    except Exception as e:
+        print(f"⚠️ 预检失败，跳过预检: {e}")
+        return True, None
+    if preflight_result:
+        print_preflight(preflight_result)
+        if preflight_result['verdict'] == 'refuse':
+            print(f"❌ 预检未通过，跳过任务: {label}")
+            record_preflight(preflight_result, executed=False)
+            return False, preflight_result
+    return True, preflight_result
+
+
+def _run_export_job(exporter, config, output_dir, include_timestamp, task_label):
+    """
+    执行单个导出任务
+
+    Returns:
+        bool: 导出是否成功
+    """
+    query_name = config['query_name']
+    sheet_name = config.get('sheet_name', query_name)
+    params = config.get('params', {})
+    
+    print(f"\n📊 任务 {task_label}: {query_name}")
+    print(f"📝 查询名称: {query_name}")
+    if params:
+        print(f"📋 参数: {params}")
+    
+    # 优先用 output_filename，否则用默认
+    try:
+        output_path, fmt, outputs = _job_output(config, output_dir)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return False
+    if config.get('output_filename'):
+        print(f"📁 指定输出文件: {config['output_filename']}")
+    else:
+        print(f"📁 使用默认文件名: {os.path.basename(output_path)}")
+    
+    # 获取SQL查询（声明了 "-- 参数:" 的查询使用绑定参数，同一连接上换参数执行时复用预处理语句）
+    sql_query = build_query(query_name, **params)
+    
+    if not sql_query:
+        print(f"❌ 查询 '{query_name}' 不存在或参数错误")
+        return False
+    
+    timeout = _job_timeout(config)
+    if timeout:
+        print(f"⏱️ 查询超时: {timeout:g} 秒")
+    
+    if config.get('incremental'):
+        # 增量任务每次只读水位之后的新数据，不做预检
+        return _run_incremental_job(exporter, config, with_format_extension(output_path, fmt), sql_query, fmt,
+                                    timeout)
+    
+    preflight_result = None
+    if config.get('preflight', True):
+        proceed, preflight_result = _job_preflight(exporter, sql_query, query_name)
+        if not proceed:
+            return False
+    
+    # 配置 'shards': N 且查询声明了 "-- 分片: 表.列" 时，分片并行执行（xlsx 自动改为流式导出）
+    shards = config.get('shards', 1)
+    shard_key = get_query_shard_key(query_name) if shards > 1 else None
+    if shards > 1 and not shard_key:
+        print(f"⚠️ 查询 '{query_name}' 没有声明分片键，按单个查询执行")
+    elif shard_key:
+        print(f"🧩 分片执行: {shard_key}，{shards} 个分片")
+    
+    exporter.last_row_count = None
+    start_time = time.time()
+    
+    # 执行导出（配置 'format' 为 csv/csv.gz/parquet 时流式写入对应格式）
+    if config.get('keyset'):
+        success = _run_keyset_job(exporter, config, with_format_extension(output_path, fmt), sql_query, fmt,
+                                  include_timestamp, timeout)
+    elif config.get('split_by'):
+        success = _run_split_job(exporter, config, with_format_extension(output_path, fmt), sql_query, fmt,
+                                 include_timestamp, timeout, shard_key, shards)
+    elif outputs and len(outputs) > 1:
+        print(f"📦 同时导出: {', '.join(outputs)}")
+        success = exporter.export_to_files(
+            sql=sql_query,
+            output_path=output_path,
+            formats=outputs,
+            include_timestamp=include_timestamp,
+            sheet_name=sheet_name,
+            rollover=config.get('rollover', 'sheet'),
+            timeout=timeout,
+            shard_key=shard_key,
+            shards=shards
+        )
+    elif fmt != 'xlsx':
+        success = exporter.export_to_file(
+            sql=sql_query,
+            output_path=with_format_extension(output_path, fmt),
+            fmt=fmt,
+            include_timestamp=include_timestamp,
+            timeout=timeout,
+            shard_key=shard_key,
+            shards=shards
+        )
+    else:
+        # 配置 'streaming': True 时流式导出大结果集
+        success = exporter.export_to_excel(
+            sql=sql_query,
+            output_path=output_path,
+            sheet_name=sheet_name,
+            include_timestamp=include_timestamp,
+            streaming=config.get('streaming', False) or bool(shard_key),
+            rollover=config.get('rollover', 'sheet'),
+            timeout=timeout,
+            shard_key=shard_key,
+            shards=shards
+        )
+    
+    if preflight_result:
+        record_preflight(preflight_result, exporter.last_row_count, time.time() - start_time)
+    
+    if success:
+        print(f"✅ 导出成功: {os.path.basename(output_path)}")
+    else:
+        print(f"❌ 导出失败: {os.path.basename(output_path)}")
+    return success
+
+
+def _group_export_jobs(export_configs):
+    """
+    按渲染后的SQL指纹给任务分组：查询名、参数渲染后相同（且超时、分片设置相同）的任务只执行一次查询
+    
+    增量、分页任务各自维护水位/检查点，不参与合并。
+    
+    Returns:
+        list: 每组为 [(任务序号, 配置), ...]，按每组第一个任务的顺序排列
+    """
+    groups = OrderedDict()
+    for index, config in enumerate(export_configs, 1):
+        key = ('job', index)
+        if not (config.get('incremental') or config.get('keyset')):
+            sql_query = build_query(config['query_name'], **config.get('params', {}))
+            if sql_query:
+                key = (sql_fingerprint(sql_query), _job_timeout(config), config.get('shards', 1))
+        groups.setdefault(key, []).append((index, config))
+    return list(groups.values())
+
+
+def _create_job_writer(config, output_path, fmt, outputs, timestamp=None):
+    """按任务配置创建流式写入器（拆分、多格式或单一格式）"""
+    output_path = with_format_extension(output_path, fmt)
+    if timestamp:
+        name, ext = split_extension(output_path)
+        output_path = f"{name}_{timestamp}{ext}"
+    sheet_name = config.get('sheet_name', config['query_name'])
+    rollover = config.get('rollover', 'sheet')
+    if config.get('split_by'):
+        return SplitWriter(output_path, fmt, config['split_by'], config.get('split_target', 'file'),
+                           sheet_name, rollover)
+    if outputs and len(outputs) > 1:
+        return create_tee_writer(outputs, output_path, sheet_name, rollover)
+    return create_writer(fmt, output_path, sheet_name, rollover)
+
+
+def _run_job_group(exporter, jobs, output_dir, include_timestamp, total):
+    """
+    执行一组相同查询的任务：查询只执行一次，流式结果同时写入每个任务的输出（xlsx 使用流式写入）
+    
+    Returns:
+        list: 每个任务是否成功
+    """
+    if len(jobs) == 1:
+        index, config = jobs[0]
+        return [_run_export_job(exporter, config, output_dir, include_timestamp, f"{index}/{total}")]
+    
+    first = jobs[0][1]
+    query_name = first['query_name']
+    labels = '、'.join(f"{index}/{total}" for index, _ in jobs)
+    print(f"\n📊 任务 {labels}: {query_name}")
+    print(f"🔗 {len(jobs)} 个任务的查询相同，只执行一次，结果同时写入各任务的输出")
+    if first.get('params'):
+        print(f"📋 参数: {first['params']}")
+    
+    results = [False] * len(jobs)
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S') if include_timestamp else None
+    writers = []
+    owners = {}     # 输出路径 -> 写入该文件的任务位置（相同输出路径的任务共用一个写入器）
+    members = []    # (任务位置, 写入器位置)
+    for position, (index, config) in enumerate(jobs):
+        try:
+            writer = _create_job_writer(config, *_job_output(config, output_dir), timestamp)
+        except (ValueError, ImportError) as e:
+            print(f"❌ 任务 {index}/{total}: {e}")
+            continue
+        key = writer.output_path
+        if key in owners:
+            print(f"⚠️ 任务 {index}/{total} 的输出文件与其他任务相同，共用同一文件")
+            members.append((position, owners[key]))
+            continue
+        owners[key] = len(writers)
+        members.append((position, len(writers)))
+        writers.append(writer)
+    if not writers:
+        return results
+    
+    sql_query = build_query(query_name, **first.get('params', {}))
+    timeout = _job_timeout(first)
+    if timeout:
+        print(f"⏱️ 查询超时: {timeout:g} 秒")
+    
+    preflight_result = None
+    if any(config.get('preflight', True) for _, config in jobs):
+        proceed, preflight_result = _job_preflight(exporter, sql_query, query_name)
+        if not proceed:
+            return results
+    
+    shards = first.get('shards', 1)
+    shard_key = get_query_shard_key(query_name) if shards > 1 else None
+    if shard_key:
+        print(f"🧩 分片执行: {shard_key}，{shards} 个分片")
+    
+    exporter.last_row_count = None
+    start_time = time.time()
+    try:
+        rows = exporter.export_to_writer(sql_query, TeeWriter(writers), timeout=timeout, shard_key=shard_key,
+                                         shards=shards)
+    except Exception as e:
+        print(f"❌ 导出失败: {e}")
+        rows = 0
+    else:
+        if rows == 0:
+            print("⚠️ 查询结果为空")
+    if preflight_result:
+        record_preflight(preflight_result, exporter.last_row_count, time.time() - start_time)
+    
+    if rows:
+        for position, _ in members:
+            results[position] = True
+        for writer in writers:
+            for path in getattr(writer, 'output_paths', None) or [writer.output_path]:
+                print(f"✅ 导出成功: {os.path.basename(path)}")
+    return results
+
+
+def _run_keyset_job(exporter, config, output_path, sql_query, fmt, include_timestamp, timeout=None):
+    """
+    执行键集分页导出任务：按唯一键分页读取，csv/csv.gz 失败后重跑从检查点继续
+    
+    配置示例:
+        'keyset': {'column': '订单id', 'page_size': 50000}
+    
+    有未完成的检查点时续写上次的输出文件（不再生成新的时间戳文件名）。
+    """
+    keyset = config['keyset']
+    name, ext = split_extension(output_path)
+    job_name = config.get('job_name') or os.path.basename(name)
+    if include_timestamp:
+        output_path = f"{name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}{ext}"
+    print(f"📄 分页导出: 按 {keyset['column']} 每页 {keyset.get('page_size', DEFAULT_PAGE_SIZE)} 行")
+    
+    try:
+        rows, output_path = exporter.export_keyset(
+            sql_query, output_path, keyset['column'], fmt,
+            job_name=job_name,
+            page_size=keyset.get('page_size', DEFAULT_PAGE_SIZE),
+            sheet_name=config.get('sheet_name', config['query_name']),
+            timeout=timeout
+        )
+    except Exception as e:
+        print(f"❌ 分页导出失败: {e}")
+        if fmt in APPENDABLE_FORMATS:
+            print("💾 已保存检查点，重新运行本任务将从断点继续")
+        return False
+    
+    if rows == 0:
+        print("⚠️ 查询结果为空")
+        return False
+    print(f"📁 {rows} 行 -> {output_path}")
+    return True
+
+
+def _run_split_job(exporter, config, output_path, sql_query, fmt, include_timestamp, timeout=None,
+                   shard_key=None, shards=1):
+    """
+    执行按列值拆分的导出任务：查询只执行一次，每行写入对应值的文件或工作表
+    
+    配置示例:
+        'split_by': '管理城市', 'split_target': 'file'    # 每个城市一个文件：文件名_城市.扩展名
+        'split_by': '管理城市', 'split_target': 'sheet'   # 每个城市一个工作表（仅xlsx）
+    """
+    split_by = config['split_by']
+    split_target = config.get('split_target', 'file')
+    if include_timestamp:
+        name, ext = split_extension(output_path)
+        output_path = f"{name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}{ext}"
+    print(f"🔀 按 {split_by} 拆分为" + ("工作表" if split_target == 'sheet' else "文件"))
+    
+    try:
+        writer = SplitWriter(output_path, fmt, split_by, split_target,
+                             config.get('sheet_name', config['query_name']), config.get('rollover', 'sheet'))
+        rows = exporter.export_to_writer(sql_query, writer, timeout=timeout, shard_key=shard_key, shards=shards)
+    except Exception as e:
+        print(f"❌ 拆分导出失败: {e}")
+        return False
+    
+    if rows == 0:
+        print("⚠️ 查询结果为空")
+        return False
+    print(f"📁 {rows} 行，拆分为 {len(writer.value_rows)} 份 -> {os.path.dirname(output_path) or '.'}")
+    return True
+
+
+def _run_incremental_job(exporter, config, output_path, sql_query, fmt, timeout=None):
+    """
+    执行增量导出任务：只导出水位列大于上次水位的新数据
+    
+    配置示例:
+        'incremental': {'column': '订单id', 'mode': 'append', 'initial': 0}
+    
+    mode:
+        delta  - 每次新数据写入一个带时间戳的新文件（默认，支持所有格式）
+        append - csv/csv.gz 追加到同一个文件；parquet 在同名目录下新增一个分片文件
+    
+    水位列应随新数据单调递增（如自增id、写入时间）；按天的日期列在当天数据分多次导入时会漏掉后导入的部分。
+    """
+    incremental = config['incremental']
+    column = incremental['column']
+    mode = incremental.get('mode', 'delta')
+    name, ext = split_extension(output_path)
+    job_name = config.get('job_name') or os.path.basename(name)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    
+    store = WatermarkStore()
+    state = store.load(job_name)
+    if state and state.get('column') != column:
+        print(f"⚠️ 水位列由 {state.get('column')} 改为 {column}，重新从初始水位导出")
+        state = None
+    watermark = state['value'] if state else incremental.get('initial')
+    print(f"💧 增量导出: {column} > {watermark}" if watermark is not None else "💧 增量导出: 首次运行，全量导出")
+    
+    if mode == 'append' and fmt in APPENDABLE_FORMATS:
+        target_path = output_path
+        writer = create_writer(fmt, target_path, append=True)
+    elif mode == 'append' and fmt == 'parquet':
+        target_path = os.path.join(name, f"part-{timestamp}.parquet")
+        writer = create_writer(fmt, target_path)
+    else:
+        if mode == 'append':
+            print(f"⚠️ {fmt} 格式不支持追加，改为写入增量文件")
+        target_path = f"{name}_{timestamp}{ext}"
+        writer = create_writer(fmt, target_path, config.get('sheet_name', config['query_name']),
+                               config.get('rollover', 'sheet'))
+    
+    tracker = WatermarkTracker(writer, column)
+    try:
+        rows = exporter.export_to_writer(build_incremental_sql(sql_query, column, watermark), tracker,
+                                         timeout=timeout)
+    except Exception as e:
+        print(f"❌ 增量导出失败（水位未更新）: {e}")
+        return False
+    
+    if rows == 0:
+        print("✅ 没有新数据，水位保持不变")
+        return True
+    
+    store.save(job_name, column, tracker.max_value, rows)
+    print(f"✅ 增量导出成功: {rows} 行 -> {target_path}")
+    print(f"💧 新水位: {column} = {tracker.max_value}")
+    return True
+
+
+# 子进程共享的查询并发信号量（由进程池 initializer 设置）
+_db_slots = None
+# 子进程内复用的导出器：同一进程执行的多个任务共用一个连接，绑定参数的查询复用预处理语句
+_worker_exporter = None
+
+
+def _init_worker(db_slots):
+    """进程池初始化：保存跨进程共享的查询并发信号量"""
+    global _db_slots
+    _db_slots = db_slots
+
+
+def _get_worker_exporter(pipelined):
+    """获取当前子进程的导出器（首次调用时创建，进程退出时断开连接）"""
+    global _worker_exporter
+    if _worker_exporter is None:
+        _worker_exporter = DatabaseToExcelExporter(query_slots=_db_slots)
+        multiprocessing.util.Finalize(_worker_exporter, _worker_exporter.disconnect, exitpriority=10)
+    _worker_exporter.pipelined = pipelined
+    return _worker_exporter
+
+
+def _export_group_in_process(jobs, output_dir, include_timestamp, total, pipelined=False):
+    """在子进程中执行一组导出任务（同一进程内的任务共用一个数据库连接，断开后自动重连）"""
+    try:
+        return _run_job_group(_get_worker_exporter(pipelined), jobs, output_dir, include_timestamp, total)
+    except Exception as e:
+        print(f"❌ 任务 {'、'.join(f'{index}/{total}' for index, _ in jobs)} 异常: {e}")
+        return [False] * len(jobs)
+
+
+def batch_export_queries(export_configs, output_dir, include_timestamp=True, workers=1, db_concurrency=None,
+                         timeout=None, preflight=True, pipelined=False):
     """
     批量导出多个查询
     
@@ -24,10 +475,19 @@ def batch_export_queries(export_configs, output_dir, include_timestamp=True):
         export_configs: 导出配置列表，每个配置包含查询名称、参数、输出文件名等
         output_dir: 输出目录
         include_timestamp: 是否在文件名中添加时间戳
+        workers: 并行进程数，大于1时每个导出任务在独立进程中执行（查询与写xlsx互相重叠）
+        db_concurrency: 所有进程同时执行的查询数上限，默认等于 workers
+        timeout: 未单独配置 'timeout' 的任务使用的查询超时秒数
+        preflight: 是否在每个任务执行前运行 EXPLAIN 预检（任务配置 'preflight': False 可单独关闭）
+        pipelined: 流式导出时后台预取下一批数据，读取与写入重叠执行
+    
+    查询名和参数渲染后相同的任务（如同一份数据导出为不同文件名或工作表）合并为一组，查询只执行一次。
     """
     print("🚀 开始批量导出...")
     print(f"📂 输出目录: {output_dir}")
     print(f"📋 导出任务数: {len(export_configs)}")
+    if workers > 1:
+        print(f"⚙️ 并行进程数: {workers}，数据库并发上限: {db_concurrency or workers}")
     print("=" * 60)
     
     # 确保输出目录存在
@@ -37,51 +497,38 @@ def batch_export_queries(export_configs, output_dir, include_timestamp=True):
     
     success_count = 0
     failed_count = 0
+    total = len(export_configs)
+    if timeout is not None:
+        export_configs = [dict(config, timeout=config.get('timeout', timeout)) for config in export_configs]
+    if not preflight:
+        export_configs = [dict(config, preflight=False) for config in export_configs]
     
-    with DatabaseToExcelExporter() as exporter:
-        for i, config in enumerate(export_configs, 1):
-            query_name = config['query_name']
-            sheet_name = config.get('sheet_name', query_name)
-            params = config.get('params', {})
-            
-            print(f"\n📊 任务 {i}/{len(export_configs)}: {query_name}")
-            print(f"📝 查询名称: {query_name}")
-            if params:
-                print(f"📋 参数: {params}")
-            
-            # 优先用 output_filename，否则用默认
-            if 'output_filename' in config and config['output_filename']:
-                output_path = os.path.join(output_dir, config['output_filename'])
-                print(f"📁 指定输出文件: {config['output_filename']}")
-            else:
-                output_path = os.path.join(output_dir, f"{query_name}.xlsx")
-                print(f"📁 使用默认文件名: {query_name}.xlsx")
-            
-            # 获取SQL查询
-            if params:
-                sql_query = format_query(query_name, **params)
-            else:
-                sql_query = get_query(query_name)
-            
-            if not sql_query:
-                print(f"❌ 查询 '{query_name}' 不存在或参数错误")
-                failed_count += 1
-                continue
-            
-            # 执行导出
-            success = exporter.export_to_excel(
-                sql=sql_query,
-                output_path=output_path,
-                sheet_name=sheet_name,
-                include_timestamp=include_timestamp
-            )
-            
-            if success:
-                print(f"✅ 导出成功: {os.path.basename(output_path)}")
-                success_count += 1
-            else:
-                print(f"❌ 导出失败: {os.path.basename(output_path)}")
-                failed_count += 1
+    groups = _group_export_jobs(export_configs)
+    if len(groups) < total:
+        print(f"🔗 {total} 个任务中有相同的查询，合并后实际执行 {len(groups)} 个查询")
+    
+    if workers > 1:
+        db_slots = multiprocessing.Semaphore(db_concurrency or workers)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(db_slots,)) as pool:
+            futures = {
+                pool.submit(_export_group_in_process, jobs, output_dir, include_timestamp, total, pipelined): jobs
+                for jobs in groups
+            }
+            for future in as_completed(futures):
+                try:
+                    results = future.result()
+                except Exception as e:
+                    print(f"❌ 导出进程异常退出: {e}")
+                    results = [False] * len(futures[future])
+                success_count += sum(results)
+                failed_count += len(results) - sum(results)
+    else:
+        with DatabaseToExcelExporter(pipelined=pipelined) as exporter:
+            for jobs in groups:
+                results = _run_job_group(exporter, jobs, output_dir, include_timestamp, total)
+                success_count += sum(results)
+                failed_count += len(results) - sum(results)
     
     print("\n" + "=" * 60)
     print("📊 批量导出完成！")
@@ -91,9 +538,29 @@ def batch_export_queries(export_configs, output_dir, include_timestamp=True):
     return success_count, failed_count
 
 
+def parse_cmd_args():
+    """
+    支持如下调用方式：
+    python batch_export.py [--workers N] [--db-concurrency M] [--timeout 秒] [--no-preflight] [--pipeline]
+    """
+    parser = argparse.ArgumentParser(description="批量数据库导出工具")
+    parser.add_argument('--workers', type=int, default=1, help='并行导出进程数（默认1，依次执行）')
+    parser.add_argument('--db-concurrency', type=int, default=None,
+                        help='同时执行的数据库查询数上限（默认等于 --workers）')
+    parser.add_argument('--timeout', type=float, default=None,
+                        help='查询超时秒数（任务配置中的 timeout 优先）')
+    parser.add_argument('--no-preflight', action='store_true',
+                        help='跳过导出前的 EXPLAIN 预检')
+    parser.add_argument('--pipeline', action='store_true',
+                        help='流式导出时后台预取下一批数据，读取与写入重叠执行')
+    return parser.parse_args()
+
+
 def main():
     """主函数 - 配置批量导出任务"""
     
+    args = parse_cmd_args()
+    
     # ========== 批量导出配置 ==========
     
     # 输出目录
@@ -117,6 +584,7 @@ def main():
             'query_name': 'get_orders_by_date_range',
             'output_filename': '2024年上半年订单.xlsx',  # 指定输出文件名
             'sheet_name': '近期订单',
+            # 'shards': 4,  # 按查询头部 "-- 分片:" 声明的分片键切成4段并行执行
             'params': {
                 'start_date': '2024-01-01',
                 'end_date': '2024-06-30'
@@ -146,7 +614,36 @@ def main():
                 'start_date': '2024-01-01',
                 'end_date': '2024-12-31'
             }
-        }
+        },
+        # 多格式导出示例：查询只执行一次，同时写出 订单信息.xlsx / 订单信息.csv.gz / 订单信息.parquet
+        # {
+        #     'query_name': 'get_all_orders',
+        #     'output_filename': '订单信息.xlsx',
+        #     'sheet_name': '订单信息',
+        #     'outputs': ['xlsx', 'csv.gz', 'parquet']
+        # },
+        # 拆分导出示例：查询只执行一次，每个管理城市一个文件（split_target 改为 'sheet' 则每个城市一个工作表）
+        # {
+        #     'query_name': 'get_all_customers',
+        #     'output_filename': '客户信息.csv',
+        #     'format': 'csv',
+        #     'split_by': '管理城市',
+        #     'split_target': 'file'
+        # },
+        # 分页导出示例：按订单id分页读取，失败后重跑从检查点继续（仅 csv/csv.gz 可续传）
+        # {
+        #     'query_name': 'get_all_orders',
+        #     'output_filename': '订单全量.csv.gz',
+        #     'format': 'csv.gz',
+        #     'keyset': {'column': '订单id', 'page_size': 50000}
+        # },
+        # 增量导出示例：每次只追加 订单id 大于上次水位的新订单
+        # {
+        #     'query_name': 'get_all_orders',
+        #     'output_filename': '订单增量.csv.gz',
+        #     'format': 'csv.gz',
+        #     'incremental': {'column': '订单id', 'mode': 'append'}
+        # }
     ]
     
     # ========== 配置完成 ==========
@@ -161,14 +658,19 @@ def main():
     print(f"\n📊 准备导出 {len(export_configs)} 个查询:")
     for config in export_configs:
         query_name = config['query_name']
-        output_filename = config.get('output_filename', f"{query_name}.xlsx")
+        output_filename = config.get('output_filename') or query_name + EXPORT_FORMATS[config.get('format', 'xlsx')]
         print(f"  • {query_name} -> {output_filename}")
     
     # 执行批量导出
     success_count, failed_count = batch_export_queries(
         export_configs=export_configs,
         output_dir=output_dir,
-        include_timestamp=True
+        include_timestamp=True,
+        workers=args.workers,
+        db_concurrency=args.db_concurrency,
+        timeout=args.timeout,
+        preflight=not args.no_preflight,
+        pipelined=args.pipeline
     )
     
     if failed_count == 0:
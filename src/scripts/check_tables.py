@@ -4,21 +4,13 @@
 检查数据库表状态
 """
 
-import pymysql
-from src.shared.config import DB_CONFIG
+from src.shared.db_pool import get_connection
 
 def check_tables():
     """检查数据库中的表"""
     try:
-        # 连接数据库
-        connection = pymysql.connect(
-            host=DB_CONFIG['host'],
-            user=DB_CONFIG['user'],
-            password=DB_CONFIG['password'],
-            database=DB_CONFIG['database'],
-            port=DB_CONFIG['port'],
-            charset=DB_CONFIG['charset']
-        )
+        # 连接数据库（从共享连接池借用）
+        connection = get_connection()
         
         cursor = connection.cursor()
         
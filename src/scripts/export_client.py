@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+导出服务命令行客户端
+把导出或预览请求发给常驻导出服务（export_server.py），本身只用标准库，启动很快
+访问令牌从服务启动时写入的令牌文件读取
+
+使用方法:
+    python src/scripts/export_client.py 查询名 [参数1=值1 ...] [--output 文件名] [--sheet 工作表名] [--format xlsx,csv.gz]
+    python src/scripts/export_client.py 查询名 [参数1=值1 ...] --preview 20
+    python src/scripts/export_client.py --sql "SELECT ..." --preview 20
+    python src/scripts/export_client.py --list | --ping
+"""
+
+import os
+import sys
+import argparse
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.exporters.export_server import DEFAULT_HOST, DEFAULT_PORT, ServiceError, call_server
+
+# 默认输出目录（与 quick_export.py 一致）
+DEFAULT_OUTPUT_DIR = r"E:\DOCUMENTS\inbox\new MySQL\data\exports"
+
+
+def parse_cmd_args():
+    parser = argparse.ArgumentParser(description="导出服务客户端")
+    parser.add_argument('query', nargs='?', help='SQL查询名称')
+    parser.add_argument('params', nargs='*', help='参数，格式为 key=value')
+    parser.add_argument('--output', type=str, help='输出文件路径')
+    parser.add_argument('--sheet', type=str, help='Excel工作表名称')
+    parser.add_argument('--format', type=str, default='xlsx', help='导出格式，逗号分隔可同时导出多种格式')
+    parser.add_argument('--stream', action='store_true', help='流式导出')
+    parser.add_argument('--rollover', choices=['sheet', 'file'], default='sheet',
+                        help='超过Excel单表行数上限时续写到新工作表或新文件')
+    parser.add_argument('--timeout', type=float, default=None, help='查询超时秒数')
+    parser.add_argument('--yes', '-y', action='store_true', help='预检超过确认阈值时不询问，直接执行')
+    parser.add_argument('--no-preflight', action='store_true', help='跳过导出前的 EXPLAIN 预检')
+    parser.add_argument('--shards', type=int, default=1, help='分片并行执行的分片数')
+    parser.add_argument('--split-by', type=str, default=None, help='按该列的值拆分输出')
+    parser.add_argument('--split-target', choices=['file', 'sheet'], default='file',
+                        help='拆分为每个值一个文件或一个工作表')
+    parser.add_argument('--preview', type=int, metavar='N', default=None, help='不导出，只显示前N行')
+    parser.add_argument('--sql', type=str, default=None, help='预览任意SQL语句（与 --preview 一起使用）')
+    parser.add_argument('--list', action='store_true', help='列出服务端可用的查询')
+    parser.add_argument('--ping', action='store_true', help='查看服务状态')
+    parser.add_argument('--reload', action='store_true', help='让服务重新加载 .sql 文件')
+    parser.add_argument('--host', type=str, default=DEFAULT_HOST, help='服务地址')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='服务端口')
+    return parser.parse_args()
+
+
+def print_table(columns, rows):
+    """按列宽对齐输出预览结果"""
+    cells = [[str(column) for column in columns]] + [['' if value is None else str(value) for value in row]
+                                                     for row in rows]
+    widths = [max(len(row[i]) for row in cells) for i in range(len(columns))]
+    for n, row in enumerate(cells):
+        print('  '.join(value.ljust(width) for value, width in zip(row, widths)))
+        if n == 0:
+            print('  '.join('-' * width for width in widths))
+
+
+def run_export(args, params, call):
+    output_path = args.output or os.path.join(DEFAULT_OUTPUT_DIR, f"{args.query}.xlsx")
+    payload = {
+        'query': args.query,
+        'params': params,
+        'output': os.path.abspath(output_path),
+        'sheet': args.sheet,
+        'format': args.format,
+        'stream': args.stream,
+        'rollover': args.rollover,
+        'timeout': args.timeout,
+        'yes': args.yes,
+        'preflight': not args.no_preflight,
+        'shards': args.shards,
+        'split_by': args.split_by,
+        'split_target': args.split_target,
+    }
+    result = call('/export', payload)
+    if result.get('needs_confirmation'):
+        preflight = result['preflight']
+        print(f"⚠️ 预检提示该查询开销较大: {'；'.join(preflight.get('reasons') or [])}")
+        try:
+            answer = input("是否继续导出？[y/N] ").strip().lower()
+        except EOFError:
+            answer = ''
+        if answer not in ('y', 'yes'):
+            print("🛑 已取消导出")
+            return False
+        result = call('/export', dict(payload, yes=True))
+
+    if not result.get('ok'):
+        print(f"❌ {result.get('error', '导出失败')}")
+        return False
+    print(f"✅ 导出成功！共 {result.get('rows')} 行，耗时 {result.get('elapsed')} 秒"
+          + ("（命中查询结果缓存）" if result.get('cached') else ""))
+    for path in result.get('outputs', []):
+        print(f"📁 文件位置: {path}")
+    return True
+
+
+def run_preview(args, params, call):
+    payload = {'limit': args.preview, 'timeout': args.timeout}
+    if args.sql:
+        payload['sql'] = args.sql
+    else:
+        payload.update(query=args.query, params=params)
+    result = call('/query', payload)
+    print_table(result['columns'], result['rows'])
+    print(f"\n📊 {len(result['rows'])} 行" + ("（只显示前面的行）" if result.get('truncated') else "")
+          + f"，耗时 {result.get('elapsed')} 秒")
+    return True
+
+
+def main():
+    args = parse_cmd_args()
+    params = dict(p.split('=', 1) for p in args.params if '=' in p)
+
+    def call(path, payload=None):
+        return call_server(path, payload, args.host, args.port)
+
+    try:
+        if args.ping:
+            status = call('/health')
+            print(f"✅ 导出服务运行中: 已运行 {status['uptime']} 秒，{status['queries']} 个查询，"
+                  f"空闲 {status['idle_workers']}/{status['workers']}")
+            success = True
+        elif args.reload:
+            print(f"🔄 已重新加载 {call('/reload', {})['queries']} 个查询")
+            success = True
+        elif args.list:
+            for query_name, description in call('/queries')['queries'].items():
+                print(f"  • {query_name}: {description}")
+            success = True
+        elif args.preview is not None or args.sql:
+            if args.preview is None:
+                args.preview = 20
+            if not args.sql and not args.query:
+                print("❌ 请指定查询名称或 --sql")
+                sys.exit(2)
+            success = run_preview(args, params, call)
+        elif args.query:
+            success = run_export(args, params, call)
+        else:
+            print("❌ 请指定查询名称，或使用 --list / --ping")
+            sys.exit(2)
+    except ConnectionError as e:
+        print(f"❌ {e}")
+        print("💡 请先启动导出服务: python src/scripts/export_server.py，或直接使用 quick_export.py")
+        sys.exit(1)
+    except ServiceError as e:
+        print(f"❌ 服务返回错误（{e.status}）: {e}")
+        if e.status == 403:
+            print("💡 客户端从 ~/.excel_to_sql/ 下的令牌文件读取访问令牌，请用同一用户启动导出服务")
+        sys.exit(1)
+    sys.exit(0 if success else 1)
+
+
+if __name__ == "__main__":
+    main()
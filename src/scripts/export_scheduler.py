@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+定时导出调度服务
+按 config/export_jobs.json 中的任务定义定时导出，限制同时执行的任务数和每张表的并发查询数，
+执行记录保存在 data/export_job_runs.jsonl。
+
+使用方法:
+    python src/scripts/export_scheduler.py                      # 常驻运行，按计划执行
+    python src/scripts/export_scheduler.py --list               # 查看任务、下次执行时间和最近一次结果
+    python src/scripts/export_scheduler.py --run-now [任务 ...]  # 立即执行指定任务（默认全部）后退出
+    python src/scripts/export_scheduler.py --config 其他配置.json --workers 2
+"""
+
+import os
+import sys
+import json
+import argparse
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+# 添加项目根目录到Python路径
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(PROJECT_ROOT)
+
+from src.exporters.scheduler import TIME_FORMAT, ExportScheduler, RunHistory, load_jobs
+from src.exporters.sql_manager import get_query
+from src.scripts.batch_export import _get_worker_exporter, _init_worker, _run_export_job
+
+DEFAULT_CONFIG_FILE = os.path.join(PROJECT_ROOT, 'config', 'export_jobs.json')
+DEFAULT_OUTPUT_DIR = os.path.join(PROJECT_ROOT, 'data', 'exports', 'scheduled')
+
+
+def _run_scheduled_job(job_name, config, output_dir, pipelined=False):
+    """在子进程中执行一个定时任务（同一进程执行的任务共用一个导出器，连接来自该进程的连接池）"""
+    exporter = _get_worker_exporter(pipelined)
+    return _run_export_job(exporter, config, output_dir, True, job_name)
+
+
+def load_definitions(config_file):
+    with open(config_file, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def print_jobs(scheduler, history):
+    """列出任务、涉及的表、下次执行时间和最近一次结果"""
+    last_runs = history.last_runs()
+    print(f"📋 共 {len(scheduler.jobs)} 个定时任务（同时执行上限 {scheduler.max_workers}）")
+    print("=" * 60)
+    for job in scheduler.jobs.values():
+        print(f"  • {job.name}: {job.schedule.expression}  查询 {job.config['query_name']}")
+        print(f"    涉及的表: {', '.join(sorted(job.tables)) or '未知'}")
+        print(f"    下次执行: {job.next_run.strftime(TIME_FORMAT)}")
+        last = last_runs.get(job.name)
+        if last:
+            print(f"    最近一次: {last.get('started') or last.get('scheduled')} {last['status']}"
+                  + (f"，耗时 {last['elapsed_seconds']} 秒" if last.get('elapsed_seconds') is not None else ""))
+
+
+def parse_cmd_args():
+    parser = argparse.ArgumentParser(description="定时导出调度服务")
+    parser.add_argument('--config', type=str, default=DEFAULT_CONFIG_FILE, help='任务定义文件')
+    parser.add_argument('--workers', type=int, default=None, help='同时执行的任务数（覆盖配置文件中的 max_workers）')
+    parser.add_argument('--list', action='store_true', help='列出任务和下次执行时间')
+    parser.add_argument('--run-now', nargs='*', metavar='任务', default=None,
+                        help='立即执行指定任务（不指定则执行全部）后退出')
+    parser.add_argument('--poll-interval', type=float, default=5.0, help='检查到期任务的间隔秒数')
+    parser.add_argument('--pipeline', action='store_true', help='流式导出时读取与写入重叠执行')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_cmd_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    # SQL 查询目录按项目根目录解析
+    os.chdir(PROJECT_ROOT)
+
+    try:
+        definitions = load_definitions(args.config)
+        jobs = load_jobs(definitions, query_text=get_query)
+    except (OSError, ValueError) as e:
+        print(f"❌ 读取任务定义失败: {e}")
+        sys.exit(1)
+    if not jobs:
+        print(f"⚠️ {args.config} 中没有启用的任务")
+        sys.exit(0)
+
+    output_dir = definitions.get('output_dir') or DEFAULT_OUTPUT_DIR
+    os.makedirs(output_dir, exist_ok=True)
+    max_workers = args.workers or definitions.get('max_workers', 2)
+    history = RunHistory()
+
+    # 每个任务在独立进程中执行，进程数即同时执行的任务数（也是同时占用的数据库连接数）
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=(None,)) as pool:
+        scheduler = ExportScheduler(
+            jobs,
+            submit=lambda name, config: pool.submit(_run_scheduled_job, name, config, output_dir, args.pipeline),
+            max_workers=max_workers,
+            table_limits=definitions.get('table_limits'),
+            default_table_limit=definitions.get('default_table_limit'),
+            history=history,
+        )
+        if args.list:
+            print_jobs(scheduler, history)
+            return
+
+        if args.run_now is not None:
+            try:
+                scheduler.run_now(args.run_now)
+            except ValueError as e:
+                print(f"❌ {e}")
+                sys.exit(2)
+            print(f"🚀 立即执行 {len(scheduler.queue)} 个任务...")
+            scheduler.run_until_idle()
+            print("✅ 执行完成，结果见 data/export_job_runs.jsonl")
+            return
+
+        print(f"🚀 定时导出调度已启动（{datetime.now().strftime(TIME_FORMAT)}，Ctrl-C 停止）")
+        print(f"📂 输出目录: {output_dir}")
+        for job in scheduler.jobs.values():
+            print(f"  • {job.name}: 下次执行 {job.next_run.strftime(TIME_FORMAT)}")
+        try:
+            scheduler.run_forever(poll_interval=args.poll_interval)
+        except KeyboardInterrupt:
+            print("\n🛑 正在停止调度，等待执行中的任务结束...")
+    print("👋 定时导出调度已停止")
+
+
+if __name__ == "__main__":
+    main()
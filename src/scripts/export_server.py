@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+常驻导出服务
+启动一次后保持数据库连接、已解析的SQL查询和查询结果缓存，
+export_client.py 发送请求即可导出或预览，小查询不再每次付出启动解释器、导入 pandas、
+解析 .sql 文件和建立数据库连接的开销。
+
+使用方法:
+    python src/scripts/export_server.py [--port 8765] [--workers 4] [--no-cache] [--pipeline]
+
+每次启动生成访问令牌，写入 ~/.excel_to_sql/export_server_<端口>.token（只有当前用户可读），
+export_client.py 自动读取；没有令牌或不是 application/json 的请求一律拒绝。
+
+接口（JSON）:
+    GET  /health   服务状态
+    GET  /queries  可用查询列表
+    POST /export   导出 {"query": 查询名, "params": {...}, "output": 绝对路径, "format": "xlsx,csv.gz", ...}
+    POST /query    预览 {"query": 查询名 或 "sql": 语句, "params": {...}, "limit": 200}
+                   （只允许 SELECT / WITH / SHOW / DESC / EXPLAIN）
+    POST /reload   重新加载 .sql 文件
+"""
+
+import os
+import sys
+import time
+import queue
+import argparse
+import logging
+from contextlib import contextmanager
+from datetime import datetime
+
+import pandas as pd
+
+# 添加项目根目录到Python路径
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(PROJECT_ROOT)
+
+from src.shared.config import PREFLIGHT_THRESHOLDS
+from src.shared.db_pool import configure_pool, pool_status
+from src.exporters.db_to_excel_exporter import DatabaseToExcelExporter
+from src.exporters.export_server import (
+    DEFAULT_HOST, DEFAULT_PORT, ServiceError, create_server, remove_token_file, write_token_file
+)
+from src.exporters.preflight import print_preflight, record_preflight
+from src.exporters.result_cache import ResultCache
+from src.exporters.sql_manager import build_preview_sql, get_sql_manager
+from src.exporters.sql_params import to_json_value
+from src.exporters.writers import SPLIT_TARGETS, SplitWriter, parse_formats, with_format_extension
+
+logger = logging.getLogger(__name__)
+
+# 预览默认返回行数与上限
+DEFAULT_PREVIEW_ROWS = 200
+MAX_PREVIEW_ROWS = 10000
+
+
+class ExportService:
+    """
+    导出服务：常驻的导出器池、SQL查询管理器与查询结果缓存
+
+    导出器处理请求时从共享连接池借用数据库连接，请求结束即归还；
+    连接池借出前检查连接，空闲期间断开的连接会自动重建。
+    """
+
+    def __init__(self, workers: int = 4, use_cache: bool = True, pipelined: bool = False):
+        self.started_at = time.time()
+        self.workers = max(workers, 1)
+        self.manager = get_sql_manager()
+        self.cache = ResultCache() if use_cache else None
+        # 后进先出：优先复用刚用过、连接仍然有效的导出器
+        self._exporters = queue.LifoQueue()
+        for _ in range(self.workers):
+            self._exporters.put(DatabaseToExcelExporter(result_cache=self.cache, pipelined=pipelined))
+        self._routes = {
+            ('GET', '/health'): self.health,
+            ('GET', '/queries'): self.queries,
+            ('POST', '/export'): self.export,
+            ('POST', '/query'): self.query,
+            ('POST', '/reload'): self.reload,
+        }
+
+    def warm_up(self) -> bool:
+        """启动时预先建立一个数据库连接（归还后留在连接池中）"""
+        with self._exporter() as exporter:
+            return exporter.connect()
+
+    def close(self):
+        """断开所有导出器的数据库连接"""
+        while not self._exporters.empty():
+            self._exporters.get_nowait().disconnect()
+
+    @contextmanager
+    def _exporter(self):
+        """借用一个导出器（全部在用时等待），用完后把它的数据库连接归还连接池"""
+        exporter = self._exporters.get()
+        try:
+            yield exporter
+        finally:
+            exporter.disconnect()
+            self._exporters.put(exporter)
+
+    def handle(self, method: str, path: str, payload: dict) -> dict:
+        handler = self._routes.get((method, path.rstrip('/') or '/'))
+        if handler is None:
+            raise ServiceError(f"未知接口: {method} {path}", 404)
+        return handler(payload)
+
+    def health(self, payload: dict) -> dict:
+        return {
+            'ok': True,
+            'uptime': round(time.time() - self.started_at, 1),
+            'queries': len(self.manager.queries),
+            'workers': self.workers,
+            'idle_workers': self._exporters.qsize(),
+            'cache': self.cache is not None,
+            'pools': pool_status(),
+        }
+
+    def queries(self, payload: dict) -> dict:
+        return {'ok': True, 'queries': self.manager.list_queries()}
+
+    def reload(self, payload: dict) -> dict:
+        self.manager.reload_queries()
+        return {'ok': True, 'queries': len(self.manager.queries)}
+
+    def _build(self, payload: dict):
+        """按请求准备查询，返回 (查询名, 查询)"""
+        query_name = payload.get('query')
+        params = payload.get('params') or {}
+        if not query_name:
+            raise ServiceError("缺少查询名称 query")
+        if not isinstance(params, dict):
+            raise ServiceError("params 应为对象")
+        sql_query = self.manager.build_query(query_name, **params)
+        if not sql_query:
+            raise ServiceError(f"查询 '{query_name}' 不存在或参数错误", 404)
+        return query_name, sql_query
+
+    def export(self, payload: dict) -> dict:
+        """执行一次导出，参数与 quick_export.py 的命令行选项对应"""
+        query_name, sql_query = self._build(payload)
+        output_path = payload.get('output')
+        if not output_path or not os.path.isabs(output_path):
+            raise ServiceError("output 应为输出文件的绝对路径")
+        try:
+            formats = parse_formats(payload.get('format') or 'xlsx')
+        except ValueError as e:
+            raise ServiceError(str(e))
+        fmt = formats[0]
+        output_path = with_format_extension(output_path, fmt)
+        sheet_name = payload.get('sheet') or query_name
+        rollover = payload.get('rollover', 'sheet')
+        split_by = payload.get('split_by')
+        split_target = payload.get('split_target', 'file')
+        if split_by and (len(formats) > 1 or split_target not in SPLIT_TARGETS):
+            raise ServiceError("拆分导出只支持单一格式，拆分方式为 file 或 sheet")
+
+        timeout = payload.get('timeout')
+        if timeout is None:
+            timeout = self.manager.get_query_timeout(query_name)
+        shards = int(payload.get('shards') or 1)
+        shard_key = self.manager.get_query_shard_key(query_name) if shards > 1 else None
+        streaming = bool(payload.get('stream')) or bool(shard_key)
+
+        with self._exporter() as exporter:
+            # 非流式 xlsx 命中结果缓存时不访问数据库，无需预检
+            cached = (fmt == 'xlsx' and len(formats) == 1 and not streaming and not split_by
+                      and self.cache is not None and self.cache.contains(str(sql_query)))
+            preflight_result = None
+            if payload.get('preflight', True) and not cached:
+                try:
+                    preflight_result = exporter.preflight(sql_query, PREFLIGHT_THRESHOLDS, query_name)
+                except Exception as e:
+                    logger.warning(f"预检失败，跳过预检: {e}")
+                if preflight_result:
+                    print_preflight(preflight_result)
+                    if preflight_result['verdict'] == 'refuse':
+                        record_preflight(preflight_result, executed=False)
+                        return {'ok': False, 'error': "预检未通过，已拒绝执行", 'preflight': preflight_result}
+                    if preflight_result['verdict'] == 'confirm' and not payload.get('yes'):
+                        return {'ok': False, 'needs_confirmation': True, 'preflight': preflight_result}
+
+            exporter.last_row_count = None
+            start_time = time.time()
+            outputs = [output_path]
+            if split_by:
+                writer = SplitWriter(output_path, fmt, split_by, split_target, sheet_name, rollover)
+                try:
+                    success = exporter.export_to_writer(sql_query, writer, timeout=timeout, shard_key=shard_key,
+                                                        shards=shards) > 0
+                except Exception as e:
+                    raise ServiceError(f"导出失败: {e}", 500)
+                outputs = writer.output_paths
+            elif len(formats) > 1:
+                success = exporter.export_to_files(sql_query, output_path, formats, include_timestamp=False,
+                                                   sheet_name=sheet_name, rollover=rollover, timeout=timeout,
+                                                   shard_key=shard_key, shards=shards)
+                outputs = [with_format_extension(output_path, f) for f in formats]
+            elif fmt != 'xlsx':
+                success = exporter.export_to_file(sql_query, output_path, fmt, include_timestamp=False,
+                                                  timeout=timeout, shard_key=shard_key, shards=shards)
+            else:
+                success = exporter.export_to_excel(sql_query, output_path, sheet_name, include_timestamp=False,
+                                                   streaming=streaming, rollover=rollover, timeout=timeout,
+                                                   shard_key=shard_key, shards=shards)
+            elapsed = time.time() - start_time
+            rows = exporter.last_row_count
+            if preflight_result:
+                record_preflight(preflight_result, rows, elapsed)
+
+        result = {'ok': bool(success), 'rows': rows, 'outputs': outputs, 'elapsed': round(elapsed, 3),
+                  'cached': cached}
+        if not success:
+            result['error'] = "导出失败或查询结果为空，详见服务端 db_export.log"
+        return result
+
+    def query(self, payload: dict) -> dict:
+        """执行查询并返回前 limit 行（供命令行预览）"""
+        if payload.get('sql'):
+            query_name, sql_query = None, payload['sql']
+        else:
+            query_name, sql_query = self._build(payload)
+        limit = min(int(payload.get('limit') or DEFAULT_PREVIEW_ROWS), MAX_PREVIEW_ROWS)
+        timeout = payload.get('timeout')
+        if timeout is None and query_name:
+            timeout = self.manager.get_query_timeout(query_name)
+
+        try:
+            preview_sql = build_preview_sql(sql_query, limit)
+        except ValueError as e:
+            raise ServiceError(str(e))
+
+        start_time = time.time()
+        with self._exporter() as exporter:
+            df = exporter.execute_query(preview_sql, timeout=timeout)
+        if df is None:
+            raise ServiceError("查询失败，详见服务端 db_export.log", 500)
+        df = df.head(limit)
+        df = df.astype(object).where(pd.notna(df), None)
+        rows = [[to_json_value(value) for value in row] for row in df.itertuples(index=False, name=None)]
+        return {
+            'ok': True,
+            'columns': [str(column) for column in df.columns],
+            'rows': rows,
+            'truncated': len(rows) >= limit,
+            'elapsed': round(time.time() - start_time, 3),
+        }
+
+
+def parse_cmd_args():
+    parser = argparse.ArgumentParser(description="常驻导出服务")
+    parser.add_argument('--host', type=str, default=DEFAULT_HOST, help=f'监听地址（默认 {DEFAULT_HOST}，只允许本机访问）')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f'监听端口（默认 {DEFAULT_PORT}）')
+    parser.add_argument('--workers', type=int, default=4, help='同时执行的导出数（每个占用一个数据库连接）')
+    parser.add_argument('--no-cache', action='store_true', help='不使用查询结果缓存')
+    parser.add_argument('--pipeline', action='store_true', help='流式导出时读取与写入重叠执行')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_cmd_args()
+    # SQL 查询目录与日志文件按项目根目录解析
+    os.chdir(PROJECT_ROOT)
+
+    print("🚀 正在启动导出服务...")
+    # 每个导出器同时最多占用一个连接
+    configure_pool('export', args.workers)
+    service = ExportService(workers=args.workers, use_cache=not args.no_cache, pipelined=args.pipeline)
+    print(f"📋 已加载 {len(service.manager.queries)} 个SQL查询")
+    if service.warm_up():
+        print("✅ 数据库连接成功")
+    else:
+        print("⚠️ 数据库暂时无法连接，收到请求时会重试")
+
+    server = create_server(service, args.host, args.port)
+    port = server.server_address[1]
+    token_file = write_token_file(port, server.token)
+    print(f"🌐 导出服务已启动: http://{args.host}:{port} "
+          f"（{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}，Ctrl-C 停止）")
+    print(f"🔑 访问令牌已写入: {token_file}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n🛑 正在停止导出服务...")
+    finally:
+        server.server_close()
+        remove_token_file(port)
+        service.close()
+        print("👋 导出服务已停止")
+
+
+if __name__ == "__main__":
+    main()
@@ -20,10 +20,25 @@ from src.shared.table_schemas import (
     generate_create_index_sql,
     generate_drop_index_sql,
     get_all_indexes_sql,
-    validate_index_config
+    validate_index_config,
+    find_redundant_indexes,
+    generate_combined_index_sql
 )
 
-def generate_index_sql_file(table_name: str, output_dir: str = "sql_scripts") -> str:
+def _append_create_statements(sql_content: List[str], table_name: str, indexes: List[Dict], combined: bool):
+    """追加索引创建语句：逐个 CREATE INDEX，或合并为一条在线 ALTER TABLE"""
+    for index in indexes:
+        sql_content.append(f"-- {index['name']}: {', '.join(index['columns'])} ({index['type']})")
+        if not combined:
+            sql_content.append(generate_create_index_sql(table_name, index))
+            sql_content.append("")
+    if combined:
+        sql_content.append("-- 合并构建: 一次扫描建立全部索引，构建期间不阻塞读写")
+        sql_content.append("-- 进度查询: SELECT EVENT_NAME, WORK_COMPLETED, WORK_ESTIMATED FROM performance_schema.events_stages_current;")
+        sql_content.append(generate_combined_index_sql(table_name, indexes))
+        sql_content.append("")
+
+def generate_index_sql_file(table_name: str, output_dir: str = "sql_scripts", combined: bool = False) -> str:
     """为指定表生成索引SQL文件"""
     
     # 验证表配置
@@ -63,10 +78,7 @@ def generate_index_sql_file(table_name: str, output_dir: str = "sql_scripts") ->
     
     # 添加索引创建语句
     sql_content.append("-- 创建索引")
-    for index in indexes:
-        sql_content.append(f"-- {index['name']}: {', '.join(index['columns'])} ({index['type']})")
-        sql_content.append(generate_create_index_sql(table_name, index))
-        sql_content.append("")
+    _append_create_statements(sql_content, table_name, indexes, combined)
     
     # 添加索引删除语句（注释形式）
     sql_content.append("-- 删除索引语句（如需删除请取消注释）")
@@ -82,7 +94,7 @@ def generate_index_sql_file(table_name: str, output_dir: str = "sql_scripts") ->
     
     return filepath
 
-def generate_all_indexes_sql(output_dir: str = "sql_scripts") -> str:
+def generate_all_indexes_sql(output_dir: str = "sql_scripts", combined: bool = False) -> str:
     """为所有表生成索引SQL文件"""
     
     # 创建输出目录
@@ -130,10 +142,7 @@ def generate_all_indexes_sql(output_dir: str = "sql_scripts") -> str:
         sql_content.append(f"-- ========================================")
         sql_content.append("")
         
-        for index in indexes:
-            sql_content.append(f"-- {index['name']}: {', '.join(index['columns'])} ({index['type']})")
-            sql_content.append(generate_create_index_sql(table_name, index))
-            sql_content.append("")
+        _append_create_statements(sql_content, table_name, indexes, combined)
         
         total_indexes += len(indexes)
     
@@ -169,6 +178,8 @@ def generate_index_report(output_dir: str = "reports") -> str:
     
     total_indexes = 0
     index_types = {}
+    total_redundant = 0
+    total_redundant_bytes = 0
     
     for table_name in TABLE_SCHEMAS.keys():
         report_content.append(f"表: {table_name}")
@@ -202,6 +213,20 @@ def generate_index_report(output_dir: str = "reports") -> str:
             report_content.append(f"    类型: {index_type}")
             report_content.append("")
         
+        # 冗余索引检测
+        redundant = find_redundant_indexes(table_name)
+        if redundant:
+            table_bytes = sum(item['entry_bytes'] for item in redundant)
+            table_writes = sum(item['extra_writes'] for item in redundant)
+            report_content.append(f"冗余索引: {len(redundant)} 个")
+            for item in redundant:
+                report_content.append(f"  ! {item['message']}")
+                report_content.append(f"    建议: {generate_drop_index_sql(table_name, item['index'])}")
+            report_content.append(f"  每行导入额外开销: {table_writes} 次B+树操作, 约 {table_bytes} 字节")
+            report_content.append("")
+            total_redundant += len(redundant)
+            total_redundant_bytes += table_bytes
+        
         total_indexes += len(indexes)
     
     # 统计信息
@@ -210,6 +235,8 @@ def generate_index_report(output_dir: str = "reports") -> str:
     report_content.append(f"总索引数: {total_indexes}")
     for index_type, count in index_types.items():
         report_content.append(f"{index_type} 类型: {count}")
+    report_content.append(f"冗余索引数: {total_redundant}")
+    report_content.append(f"冗余索引每行额外写入: 约 {total_redundant_bytes} 字节（各表合计）")
     
     # 写入文件
     with open(filepath, 'w', encoding='utf-8') as f:
@@ -226,6 +253,8 @@ def main():
     parser.add_argument('--table', help='表名（用于table操作）')
     parser.add_argument('--output-dir', default='sql_scripts', help='输出目录')
     parser.add_argument('--report-dir', default='reports', help='报告输出目录')
+    parser.add_argument('--combined', action='store_true',
+                       help='每个表合并为一条 ALTER TABLE ... ALGORITHM=INPLACE, LOCK=NONE 语句')
     
     args = parser.parse_args()
     
@@ -241,10 +270,10 @@ def main():
                 print(f"  - {table_name}")
             return
         
-        generate_index_sql_file(args.table, args.output_dir)
+        generate_index_sql_file(args.table, args.output_dir, combined=args.combined)
     
     elif args.action == 'all':
-        generate_all_indexes_sql(args.output_dir)
+        generate_all_indexes_sql(args.output_dir, combined=args.combined)
     
     elif args.action == 'report':
         generate_index_report(args.report_dir)
@@ -9,12 +9,15 @@ import sys
 import os
 import argparse
 import logging
-from typing import List, Dict, Any
+import threading
+from datetime import datetime
+from typing import List, Dict, Any, Optional
 
 # 添加项目根目录到路径
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
 from src.shared.config import get_database_connection
+from src.shared.db_pool import get_read_connection
 from src.shared.table_schemas import (
     TABLE_SCHEMAS, 
     get_table_indexes, 
@@ -23,8 +26,15 @@ from src.shared.table_schemas import (
     get_indexes_by_column,
     generate_create_index_sql,
     generate_drop_index_sql,
+    generate_combined_index_sql,
     get_all_indexes_sql,
     validate_index_config,
+    find_redundant_indexes,
+    is_text_column,
+    get_primary_key_columns,
+    choose_prefix_length,
+    save_index_prefix_lengths,
+    DEFAULT_PREFIX_SELECTIVITY,
     INDEX_TYPES
 )
 
@@ -39,6 +49,24 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# 前缀长度候选值（字符数）
+PREFIX_LENGTH_CANDIDATES = (4, 6, 8, 12, 16, 20, 24, 32, 48, 64, 96, 128)
+# 按整数主键采样时，把主键取值范围均分成的区段数
+SAMPLE_BLOCKS = 100
+INTEGER_TYPES = ('TINYINT', 'SMALLINT', 'MEDIUMINT', 'INT', 'INTEGER', 'BIGINT')
+
+
+def get_integer_primary_key(table_name: str) -> Optional[str]:
+    """表的单列整数主键（可按取值范围均匀切分），没有时返回None"""
+    primary_key = get_primary_key_columns(table_name)
+    if len(primary_key) != 1:
+        return None
+    for col, col_type in TABLE_SCHEMAS.get(table_name, {}).get('columns', []):
+        if col == primary_key[0]:
+            return col if col_type.upper().split()[0].split('(')[0] in INTEGER_TYPES else None
+    return None
+
+
 class IndexManager:
     """索引管理器"""
     
@@ -136,14 +164,24 @@ class IndexManager:
             self.connection.rollback()
             return False
     
-    def create_all_indexes(self, table_name: str) -> bool:
-        """创建表的所有配置索引"""
+    def create_all_indexes(self, table_name: str, combined: bool = False, progress_interval: int = 10) -> bool:
+        """
+        创建表的所有配置索引
+        
+        Args:
+            table_name: 表名
+            combined: 是否合并为一条在线 ALTER TABLE（只扫描一次表）
+            progress_interval: 合并构建时进度报告的间隔秒数
+        """
         try:
             indexes = get_table_indexes(table_name)
             if not indexes:
                 logger.warning(f"表 {table_name} 没有配置索引")
                 return True
             
+            if combined:
+                return self.create_indexes_combined(table_name, indexes, progress_interval)
+            
             success_count = 0
             for index in indexes:
                 if self.create_index(table_name, index['name']):
@@ -155,6 +193,248 @@ class IndexManager:
             logger.error(f"创建所有索引失败: {e}")
             return False
     
+    def create_indexes_combined(self, table_name: str, indexes: List[Dict[str, Any]], progress_interval: int = 10) -> bool:
+        """用一条 ALTER TABLE ... ALGORITHM=INPLACE, LOCK=NONE 创建所有尚不存在的索引"""
+        existing = {idx['name'] for idx in self.show_table_indexes(table_name)}
+        pending = [idx for idx in indexes if idx['name'] not in existing]
+        if not pending:
+            logger.info(f"表 {table_name} 的配置索引均已存在")
+            return True
+        if len(pending) < len(indexes):
+            logger.info(f"跳过已存在的 {len(indexes) - len(pending)} 个索引")
+        
+        sql = generate_combined_index_sql(table_name, pending)
+        self.cursor.execute("SELECT CONNECTION_ID()")
+        connection_id = self.cursor.fetchone()[0]
+        saved_instruments = self._enable_stage_instruments()
+        
+        stop_event = threading.Event()
+        monitor = threading.Thread(
+            target=self._monitor_alter_progress,
+            args=(connection_id, stop_event, progress_interval),
+            name='AlterProgress',
+            daemon=True
+        )
+        
+        start = datetime.now()
+        try:
+            logger.info(f"执行SQL: {sql}")
+            monitor.start()
+            self.cursor.execute(sql)
+            self.connection.commit()
+            elapsed = (datetime.now() - start).total_seconds()
+            logger.info(f"表 {table_name} 合并构建完成: {len(pending)} 个索引, 耗时 {elapsed:.1f} 秒")
+            return True
+        except Exception as e:
+            logger.error(f"合并构建索引失败: {e}")
+            self.connection.rollback()
+            return False
+        finally:
+            stop_event.set()
+            monitor.join(timeout=progress_interval)
+            self._restore_stage_instruments(saved_instruments)
+    
+    def _enable_stage_instruments(self) -> Optional[Dict[str, list]]:
+        """
+        开启 InnoDB ALTER 阶段事件采集，使 events_stages_current 可报告进度
+        
+        performance_schema 的设置对整个实例生效，返回修改前的设置，ALTER 结束后用
+        _restore_stage_instruments 恢复；无法开启时返回None。
+        """
+        try:
+            self.cursor.execute("""
+            SELECT NAME, ENABLED, TIMED FROM performance_schema.setup_instruments
+            WHERE NAME LIKE 'stage/innodb/alter%'
+            """)
+            instruments = list(self.cursor.fetchall())
+            self.cursor.execute("""
+            SELECT NAME, ENABLED FROM performance_schema.setup_consumers
+            WHERE NAME LIKE 'events_stages_%'
+            """)
+            consumers = list(self.cursor.fetchall())
+            self.cursor.execute("""
+            UPDATE performance_schema.setup_instruments
+            SET ENABLED = 'YES', TIMED = 'YES'
+            WHERE NAME LIKE 'stage/innodb/alter%'
+            """)
+            self.cursor.execute("""
+            UPDATE performance_schema.setup_consumers
+            SET ENABLED = 'YES'
+            WHERE NAME LIKE 'events_stages_%'
+            """)
+            self.connection.commit()
+            return {'instruments': instruments, 'consumers': consumers}
+        except Exception as e:
+            logger.warning(f"无法开启阶段事件采集（需要 performance_schema 的UPDATE权限），将无法报告进度: {e}")
+            return None
+    
+    def _restore_stage_instruments(self, saved: Optional[Dict[str, list]]):
+        """把阶段事件采集恢复为 _enable_stage_instruments 修改前的设置"""
+        if not saved:
+            return
+        try:
+            self.cursor.executemany(
+                "UPDATE performance_schema.setup_instruments SET ENABLED = %s, TIMED = %s WHERE NAME = %s",
+                [(enabled, timed, name) for name, enabled, timed in saved['instruments']]
+            )
+            self.cursor.executemany(
+                "UPDATE performance_schema.setup_consumers SET ENABLED = %s WHERE NAME = %s",
+                [(enabled, name) for name, enabled in saved['consumers']]
+            )
+            self.connection.commit()
+        except Exception as e:
+            logger.warning(f"恢复 performance_schema 阶段事件采集设置失败: {e}")
+    
+    def _monitor_alter_progress(self, connection_id: int, stop_event: threading.Event, interval: int):
+        """在独立连接上轮询 events_stages_current，报告 ALTER 的完成百分比"""
+        sql = """
+        SELECT 
+            s.EVENT_NAME,
+            s.WORK_COMPLETED,
+            s.WORK_ESTIMATED
+        FROM performance_schema.events_stages_current s
+        JOIN performance_schema.threads t ON s.THREAD_ID = t.THREAD_ID
+        WHERE t.PROCESSLIST_ID = %s
+        """
+        try:
+            monitor_connection = get_database_connection()
+        except Exception as e:
+            logger.warning(f"进度监控连接失败: {e}")
+            return
+        
+        try:
+            with monitor_connection.cursor() as cursor:
+                while not stop_event.wait(interval):
+                    cursor.execute(sql, (connection_id,))
+                    row = cursor.fetchone()
+                    if not row:
+                        continue
+                    stage, completed, estimated = row
+                    stage = stage.replace('stage/innodb/', '')
+                    if estimated:
+                        logger.info(f"索引构建进度 [{stage}]: {completed / estimated * 100:.1f}% ({completed}/{estimated})")
+                    else:
+                        logger.info(f"索引构建阶段: {stage}")
+        except Exception as e:
+            logger.warning(f"进度监控中断: {e}")
+        finally:
+            monitor_connection.close()
+    
+    def _sample_rows_sql(self, cursor, table_name: str, column: str, sample_size: int) -> str:
+        """
+        生成在整张表上均匀取 sample_size 个非空值的子查询
+        
+        - 单列整数主键：把主键取值范围均分为 SAMPLE_BLOCKS 段，每段按主键顺序取前若干行，
+          走主键索引的范围读取，不扫描全表
+        - 其他表：按 information_schema 中估算的行数算出步长 N，用 ROW_NUMBER() 每隔 N 行取一行，
+          需要扫描一遍该列
+        表的行数不超过 sample_size 时直接读取全部非空值。
+        """
+        primary_key = get_integer_primary_key(table_name)
+        if primary_key:
+            cursor.execute(f"SELECT MIN(`{primary_key}`), MAX(`{primary_key}`) FROM `{table_name}`")
+            low, high = cursor.fetchone()
+            if low is not None:
+                low, high = int(low), int(high)
+                blocks = min(SAMPLE_BLOCKS, high - low + 1)
+                per_block = -(-sample_size // blocks)
+                bounds = [low + (high - low + 1) * i // blocks for i in range(blocks)] + [high + 1]
+                return "\nUNION ALL\n".join(
+                    f"(SELECT `{column}` FROM `{table_name}` WHERE `{primary_key}` >= {start} AND `{primary_key}` < {end} "
+                    f"AND `{column}` IS NOT NULL ORDER BY `{primary_key}` LIMIT {per_block})"
+                    for start, end in zip(bounds, bounds[1:])
+                )
+        
+        cursor.execute(
+            "SELECT TABLE_ROWS FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+            (table_name,)
+        )
+        row = cursor.fetchone()
+        step = -(-int(row[0] or 0) // sample_size) if row else 1
+        if step <= 1:
+            return f"SELECT `{column}` FROM `{table_name}` WHERE `{column}` IS NOT NULL LIMIT {int(sample_size)}"
+        return f"""
+            SELECT `{column}` FROM (
+                SELECT `{column}`, ROW_NUMBER() OVER () AS sample_rn
+                FROM `{table_name}` WHERE `{column}` IS NOT NULL
+            ) AS numbered
+            WHERE sample_rn % {step} = 0
+            LIMIT {int(sample_size)}
+        """
+    
+    def sample_prefix_selectivity(self, table_name: str, column: str, sample_size: int = 100000) -> Dict[str, Any]:
+        """
+        采样统计字段完整值与各候选前缀的不同值个数
+        
+        样本在整张表上均匀分布（方法见 _sample_rows_sql），不是按存储顺序取前 sample_size 行，
+        避免只看到最早导入的数据。
+        采样查询只读，配置了只读副本时在副本上执行，不占用主库
+        
+        Returns:
+            Dict: {'full_distinct', 'max_length', 'prefix_distincts': {长度: 不同值个数}}
+        """
+        prefix_exprs = ', '.join(f"COUNT(DISTINCT LEFT(`{column}`, {n}))" for n in PREFIX_LENGTH_CANDIDATES)
+        connection = get_read_connection()
+        try:
+            with connection.cursor() as cursor:
+                sample_sql = self._sample_rows_sql(cursor, table_name, column, sample_size)
+                cursor.execute(f"""
+                SELECT 
+                    COUNT(DISTINCT `{column}`),
+                    MAX(CHAR_LENGTH(`{column}`)),
+                    {prefix_exprs}
+                FROM (
+                    {sample_sql}
+                ) AS sample
+                """)
+                row = cursor.fetchone()
+        finally:
+            connection.close()
+        full_distinct, max_length = int(row[0] or 0), int(row[1] or 0)
+        prefix_distincts = {}
+        for length, distinct in zip(PREFIX_LENGTH_CANDIDATES, row[2:]):
+            prefix_distincts[length] = int(distinct or 0)
+            # 超过最大长度的前缀与完整值等价，不再考虑更长的候选
+            if length >= max_length:
+                break
+        return {'full_distinct': full_distinct, 'max_length': max_length, 'prefix_distincts': prefix_distincts}
+    
+    def infer_prefix_lengths(self, table_name: str,
+                             target_selectivity: float = DEFAULT_PREFIX_SELECTIVITY,
+                             sample_size: int = 100000) -> Dict[str, int]:
+        """为索引中的TEXT字段采样推断前缀长度，并保存到前缀长度配置文件"""
+        text_columns = []
+        for index in get_table_indexes(table_name):
+            if index['type'] == 'FULLTEXT':
+                continue
+            for col in index['columns']:
+                if is_text_column(table_name, col) and col not in text_columns:
+                    text_columns.append(col)
+                    if index['type'] == 'UNIQUE':
+                        logger.warning(f"唯一索引 {index['name']} 包含TEXT字段 {col}，前缀索引只保证前缀唯一")
+        
+        if not text_columns:
+            logger.info(f"表 {table_name} 的索引不包含TEXT字段")
+            return {}
+        
+        prefix_lengths = {}
+        for col in text_columns:
+            try:
+                stats = self.sample_prefix_selectivity(table_name, col, sample_size)
+            except Exception as e:
+                logger.error(f"采样字段 {col} 失败: {e}")
+                continue
+            length = choose_prefix_length(stats['full_distinct'], stats['prefix_distincts'], target_selectivity)
+            prefix_lengths[col] = length
+            selectivity = stats['prefix_distincts'].get(length, 0) / stats['full_distinct'] if stats['full_distinct'] else 1.0
+            logger.info(f"字段 {col}: 不同值 {stats['full_distinct']}, 最大长度 {stats['max_length']}, "
+                        f"前缀 {length} 区分度 {selectivity:.2%}")
+        
+        if prefix_lengths:
+            save_index_prefix_lengths(table_name, prefix_lengths)
+            logger.info(f"表 {table_name} 前缀长度已保存: {prefix_lengths}")
+        return prefix_lengths
+    
     def compare_indexes(self, table_name: str) -> Dict[str, Any]:
         """比较配置的索引和实际的索引"""
         configured = self.show_configured_indexes(table_name)
@@ -175,6 +455,149 @@ class IndexManager:
             'actual': actual
         }
     
+    def get_index_usage(self, table_name: str) -> Dict[Optional[str], Dict[str, int]]:
+        """
+        从 performance_schema 读取表各索引的读写次数
+        
+        Returns:
+            Dict: 索引名 -> {'reads', 'writes', 'fetches'}；键为None的项表示未走索引的访问（全表扫描、插入）
+        """
+        sql = """
+        SELECT 
+            INDEX_NAME,
+            COUNT_READ,
+            COUNT_WRITE,
+            COUNT_FETCH
+        FROM performance_schema.table_io_waits_summary_by_index_usage
+        WHERE OBJECT_SCHEMA = DATABASE()
+        AND OBJECT_NAME = %s
+        """
+        self.cursor.execute(sql, (table_name,))
+        usage = {}
+        for index_name, count_read, count_write, count_fetch in self.cursor.fetchall():
+            usage[index_name] = {
+                'reads': int(count_read or 0),
+                'writes': int(count_write or 0),
+                'fetches': int(count_fetch or 0)
+            }
+        return usage
+    
+    def get_unused_indexes_from_sys(self, table_name: str) -> List[str]:
+        """performance_schema 统计不可用时，退而使用 sys.schema_unused_indexes"""
+        sql = """
+        SELECT index_name
+        FROM sys.schema_unused_indexes
+        WHERE object_schema = DATABASE()
+        AND object_name = %s
+        """
+        self.cursor.execute(sql, (table_name,))
+        return [row[0] for row in self.cursor.fetchall()]
+    
+    def get_server_uptime(self) -> Optional[int]:
+        """获取服务器运行时长（秒），即索引统计的观测窗口"""
+        try:
+            self.cursor.execute("SHOW GLOBAL STATUS LIKE 'Uptime'")
+            row = self.cursor.fetchone()
+            return int(row[1]) if row else None
+        except Exception as e:
+            logger.warning(f"查询服务器运行时长失败: {e}")
+            return None
+    
+    def analyze_index_usage(self, table_name: str) -> Dict[str, Any]:
+        """
+        对比配置的索引与实际流量中的索引使用情况
+        
+        Returns:
+            Dict: 包含 indexes（每个索引的读写统计与状态）、table_writes、write_only、source；
+                  没有可用的统计时 source 为None，indexes 与 write_only 为空
+        """
+        configured = {idx['name']: idx for idx in self.show_configured_indexes(table_name)}
+        result = {'table': table_name, 'indexes': [], 'table_writes': 0, 'write_only': [], 'source': 'performance_schema'}
+        
+        try:
+            usage = self.get_index_usage(table_name)
+        except Exception as e:
+            logger.warning(f"读取 performance_schema 索引统计失败: {e}，改用 sys.schema_unused_indexes")
+            try:
+                unused = set(self.get_unused_indexes_from_sys(table_name))
+            except Exception as sys_error:
+                logger.error(f"读取 sys.schema_unused_indexes 失败: {sys_error}")
+                return result
+            result['source'] = 'sys.schema_unused_indexes'
+            for name, index in configured.items():
+                status = 'write_only' if name in unused else 'used'
+                result['indexes'].append({'name': name, 'type': index['type'], 'reads': None, 'writes': None, 'status': status})
+                if status == 'write_only':
+                    result['write_only'].append(name)
+            return result
+        
+        if not usage:
+            # performance_schema 未开启或统计刚被重置时没有任何行，据此会把所有索引误判为未使用
+            logger.warning(f"performance_schema 中没有表 {table_name} 的索引统计（未开启 performance_schema 或统计已重置），"
+                           f"不判断索引是否使用")
+            result['source'] = None
+            return result
+        
+        # 插入操作记录在 INDEX_NAME 为 NULL 的行上，所有行的写入之和即为表的写入量
+        result['table_writes'] = sum(item['writes'] for item in usage.values())
+        actual_names = {name for name in usage if name is not None}
+        
+        for name in list(configured.keys()) + sorted(actual_names - set(configured.keys())):
+            index_type = configured[name]['type'] if name in configured else 'UNCONFIGURED'
+            if name not in usage:
+                result['indexes'].append({'name': name, 'type': index_type, 'reads': None, 'writes': None, 'status': 'missing'})
+                continue
+            stats = usage[name]
+            if name == 'PRIMARY':
+                status = 'primary'
+            elif stats['reads'] == 0 and result['table_writes'] > 0:
+                status = 'write_only'
+            elif stats['reads'] == 0:
+                status = 'idle'
+            else:
+                status = 'used'
+            result['indexes'].append({'name': name, 'type': index_type, 'reads': stats['reads'], 'writes': stats['writes'], 'status': status})
+            if status == 'write_only':
+                result['write_only'].append(name)
+        
+        return result
+    
+    def generate_unused_drop_script(self, usage_results: List[Dict[str, Any]], output_dir: str = "sql_scripts") -> Optional[str]:
+        """为只写不读的索引生成删除脚本；唯一索引承担约束，仅以注释形式给出"""
+        tables = [item for item in usage_results if item['write_only']]
+        if not tables:
+            logger.info("没有只写不读的索引，无需生成删除脚本")
+            return None
+        
+        os.makedirs(output_dir, exist_ok=True)
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filepath = os.path.join(output_dir, f"unused_indexes_drop_{timestamp}.sql")
+        
+        sql_content = []
+        sql_content.append("-- 只写不读索引删除脚本")
+        sql_content.append(f"-- 生成时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        uptime = self.get_server_uptime()
+        if uptime is not None:
+            sql_content.append(f"-- 统计窗口: 服务器已运行 {uptime / 3600:.1f} 小时，请确认窗口覆盖了完整的业务周期")
+        sql_content.append("")
+        
+        for item in tables:
+            index_types = {idx['name']: idx['type'] for idx in item['indexes']}
+            sql_content.append(f"-- 表: {item['table']}（表写入次数: {item['table_writes']}）")
+            for index_name in item['write_only']:
+                drop_sql = generate_drop_index_sql(item['table'], index_name)
+                if index_types.get(index_name) == 'UNIQUE':
+                    sql_content.append(f"-- 唯一索引承担数据约束，确认后再删除: {drop_sql}")
+                else:
+                    sql_content.append(drop_sql)
+            sql_content.append("")
+        
+        with open(filepath, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(sql_content))
+        
+        logger.info(f"删除脚本已生成: {filepath}")
+        return filepath
+    
     def validate_table_indexes(self, table_name: str) -> bool:
         """验证表索引配置"""
         is_valid, errors = validate_index_config(table_name)
@@ -184,6 +607,9 @@ class IndexManager:
                 logger.error(f"  - {error}")
         else:
             logger.info(f"表 {table_name} 索引配置验证通过")
+        
+        for finding in find_redundant_indexes(table_name):
+            logger.warning(f"  冗余索引 [{finding['kind']}]: {finding['message']}")
         return is_valid
 
 def print_index_info(indexes: List[Dict[str, Any]], title: str):
@@ -202,20 +628,46 @@ def print_index_info(indexes: List[Dict[str, Any]], title: str):
         print(f"    类型: {index.get('type', 'BTREE')}")
         print()
 
+def print_index_usage(result: Dict[str, Any]):
+    """打印索引使用统计"""
+    status_labels = {
+        'used': '使用中', 'write_only': '只写不读', 'idle': '无访问',
+        'missing': '数据库中不存在', 'primary': '主键'
+    }
+    print(f"\n表 {result['table']} 索引使用统计 (来源: {result['source'] or '无'}):")
+    print("=" * 60)
+    if result['source'] is None:
+        print("  没有索引使用统计（performance_schema 未开启或统计已重置），未判断索引是否使用")
+        return
+    if result['source'] == 'performance_schema':
+        print(f"  表写入次数: {result['table_writes']}")
+    for index in result['indexes']:
+        reads = '-' if index['reads'] is None else index['reads']
+        writes = '-' if index['writes'] is None else index['writes']
+        label = status_labels.get(index['status'], index['status'])
+        print(f"  {index['name']} ({index['type']}): 读 {reads}, 写 {writes} [{label}]")
+
 def main():
     parser = argparse.ArgumentParser(description='数据库索引管理工具')
-    parser.add_argument('action', choices=['list', 'show', 'create', 'drop', 'create-all', 'compare', 'validate'], 
+    parser.add_argument('action', choices=['list', 'show', 'create', 'drop', 'create-all', 'compare', 'validate', 'usage', 'infer-prefix'], 
                        help='操作类型')
     parser.add_argument('table', nargs='?', help='表名（list操作不需要）')
     parser.add_argument('--index', help='索引名称（用于create/drop操作）')
     parser.add_argument('--type', choices=list(INDEX_TYPES.keys()), help='索引类型过滤')
     parser.add_argument('--column', help='字段名过滤')
+    parser.add_argument('--output-dir', default='sql_scripts', help='删除脚本输出目录（用于usage操作）')
+    parser.add_argument('--combined', action='store_true',
+                       help='create-all时合并为一条在线 ALTER TABLE，只扫描一次表')
+    parser.add_argument('--progress-interval', type=int, default=10, help='合并构建时进度报告间隔（秒）')
+    parser.add_argument('--target-selectivity', type=float, default=DEFAULT_PREFIX_SELECTIVITY,
+                       help='infer-prefix: 前缀区分度需达到完整值区分度的比例')
+    parser.add_argument('--sample-size', type=int, default=100000, help='infer-prefix: 采样行数')
     
     args = parser.parse_args()
     
     # 检查参数
-    if args.action != 'list' and not args.table:
-        print("错误: 除list操作外，其他操作都需要指定表名")
+    if args.action not in ('list', 'usage') and not args.table:
+        print("错误: 除list、usage操作外，其他操作都需要指定表名")
         return
     
     manager = IndexManager()
@@ -257,7 +709,7 @@ def main():
             manager.drop_index(args.table, args.index)
         
         elif args.action == 'create-all':
-            manager.create_all_indexes(args.table)
+            manager.create_all_indexes(args.table, combined=args.combined, progress_interval=args.progress_interval)
         
         elif args.action == 'compare':
             result = manager.compare_indexes(args.table)
@@ -269,6 +721,19 @@ def main():
         
         elif args.action == 'validate':
             manager.validate_table_indexes(args.table)
+        
+        elif args.action == 'infer-prefix':
+            manager.infer_prefix_lengths(args.table, args.target_selectivity, args.sample_size)
+        
+        elif args.action == 'usage':
+            # 未指定表名时统计所有配置的表
+            tables = [args.table] if args.table else list(TABLE_SCHEMAS.keys())
+            results = []
+            for table_name in tables:
+                result = manager.analyze_index_usage(table_name)
+                print_index_usage(result)
+                results.append(result)
+            manager.generate_unused_drop_script(results, args.output_dir)
     
     except Exception as e:
         logger.error(f"操作失败: {e}")
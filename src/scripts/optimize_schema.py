@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+字段类型优化工具
+根据导入时累积的字段画像，推荐更紧凑的字段类型并生成迁移SQL
+"""
+
+import os
+import sys
+import argparse
+from datetime import datetime
+
+# 添加项目根目录到路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.shared.table_schemas import TABLE_SCHEMAS
+from src.importers.column_profiler import load_table_profile, propose_column_type, DISTINCT_CAP
+
+
+def propose_table_schema(table_name: str):
+    """
+    为表生成字段类型推荐
+
+    Returns:
+        List[Dict]: 每个字段的 column、current、proposed（无需变更时为None）、reason、profile
+    """
+    profiles = load_table_profile(table_name)
+    proposals = []
+    for column, current_type in TABLE_SCHEMAS[table_name]['columns']:
+        profile = profiles.get(column)
+        if profile is None:
+            proposals.append({'column': column, 'current': current_type, 'proposed': None,
+                              'reason': '无画像数据', 'profile': None})
+            continue
+        proposed, reason = propose_column_type(current_type, profile)
+        proposals.append({'column': column, 'current': current_type, 'proposed': proposed,
+                          'reason': reason, 'profile': profile})
+    return proposals
+
+
+def format_schema_columns(table_name: str, proposals) -> str:
+    """生成可直接粘贴到 table_schemas.py 的 columns 列表"""
+    lines = [f"    '{table_name}': {{", "        'columns': ["]
+    for i, item in enumerate(proposals):
+        column_type = item['proposed'] or item['current']
+        comma = ',' if i < len(proposals) - 1 else ''
+        comment = f"  # 原类型: {item['current']}" if item['proposed'] else ''
+        lines.append(f"            ('{item['column']}', \"{column_type}\"){comma}{comment}")
+    lines.append("        ],")
+    return '\n'.join(lines)
+
+
+def generate_migration_sql(table_name: str, proposals) -> str:
+    """生成字段类型迁移的 ALTER TABLE 语句（合并为一条，只重建一次表）"""
+    changes = [item for item in proposals if item['proposed']]
+    if not changes:
+        return None
+    clauses = [f"MODIFY COLUMN `{item['column']}` {item['proposed']}" for item in changes]
+    return f"ALTER TABLE `{table_name}`\n    " + ",\n    ".join(clauses) + ";"
+
+
+def print_profile_report(table_name: str, proposals):
+    """打印字段画像与推荐结果"""
+    print(f"\n表 {table_name} 字段画像:")
+    print("=" * 60)
+    for item in proposals:
+        profile = item['profile']
+        if profile is None:
+            print(f"  {item['column']}: 无画像数据")
+            continue
+        cardinality = profile.cardinality if profile.cardinality is not None else f">{DISTINCT_CAP}"
+        value_range = ''
+        if profile.numeric_min is not None and profile.numeric_count == profile.non_null:
+            value_range = f", 范围 [{profile.numeric_min:.15g}, {profile.numeric_max:.15g}]"
+        print(f"  {item['column']}: 行数 {profile.count}, 空值率 {profile.null_rate:.1%}, "
+              f"最大长度 {profile.max_length}, 不同值 {cardinality}{value_range}")
+        if item['proposed']:
+            print(f"    推荐: {item['current']} -> {item['proposed']}（{item['reason']}）")
+
+
+def write_migration_file(table_name: str, proposals, output_dir: str = "sql_scripts") -> str:
+    """将推荐的schema与迁移SQL写入文件"""
+    migration_sql = generate_migration_sql(table_name, proposals)
+    if migration_sql is None:
+        print(f"表 {table_name} 没有需要优化的字段")
+        return None
+
+    os.makedirs(output_dir, exist_ok=True)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    filepath = os.path.join(output_dir, f"{table_name}_type_migration_{timestamp}.sql")
+
+    sql_content = []
+    sql_content.append(f"-- {table_name} 表字段类型优化脚本")
+    sql_content.append(f"-- 生成时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    sql_content.append("-- 注意: 修改字段类型会重建整张表，请在导入空闲时执行并提前备份")
+    sql_content.append("-- 注意: ENUM 字段遇到新取值会导入失败，请确认取值集合稳定")
+    sql_content.append("-- BIGINT 形式的 YYYYMMDD 日期会被 MySQL 直接转换为 DATE")
+    sql_content.append("")
+    for item in proposals:
+        if item['proposed']:
+            sql_content.append(f"-- {item['column']}: {item['current']} -> {item['proposed']}（{item['reason']}）")
+    sql_content.append(migration_sql)
+    sql_content.append("")
+    sql_content.append("-- 同步更新 table_schemas.py（否则下次导入时 sync_table_schema 会把类型改回去）:")
+    sql_content.extend(f"-- {line}" for line in format_schema_columns(table_name, proposals).split('\n'))
+
+    with open(filepath, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(sql_content))
+
+    print(f"迁移脚本已生成: {filepath}")
+    return filepath
+
+
+def main():
+    parser = argparse.ArgumentParser(description='字段类型优化工具')
+    parser.add_argument('tables', nargs='*', help='表名（默认所有有画像数据的表）')
+    parser.add_argument('--output-dir', default='sql_scripts', help='迁移脚本输出目录')
+    args = parser.parse_args()
+
+    tables = args.tables or [name for name in TABLE_SCHEMAS if load_table_profile(name)]
+    if not tables:
+        print("没有字段画像数据，请先执行一次导入")
+        return
+
+    for table_name in tables:
+        if table_name not in TABLE_SCHEMAS:
+            print(f"错误: 表 {table_name} 不存在")
+            continue
+        proposals = propose_table_schema(table_name)
+        print_profile_report(table_name, proposals)
+        if any(item['proposed'] for item in proposals):
+            print("\n推荐的 TABLE_SCHEMAS 配置:")
+            print(format_schema_columns(table_name, proposals))
+        write_migration_file(table_name, proposals, args.output_dir)
+
+
+if __name__ == '__main__':
+    main()
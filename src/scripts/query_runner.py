@@ -1,22 +1,23 @@
-import mysql.connector
-from mysql.connector import errorcode
+import os
+import sys
 import pandas as pd
 
-# ——— 请在这里填入您的数据库连接信息 ———
-DB_CONFIG = {
-    'user': 'root',      # 您的用户名
-    'password': '3114423240',  # 您的密码
-    'host': 'localhost',          # 您的数据库主机，本地通常是 127.0.0.1
-    'database': 'excel_import_db',  # 您要连接的数据库名
-    'port': 3306                  # 数据库端口，MySQL 默认为 3306
-}
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.shared.config import DB_CONFIG
+from src.shared.db_pool import get_read_connection
+
+# 数据库连接信息统一在 src/shared/local_config.py 中配置，连接从共享连接池借用
+# 配置了只读副本（DB_CONFIG_READ）时查询发往副本，副本延迟过大时回退主库
 
 def execute_query(query):
     """
     连接到数据库，执行查询，并返回结果为 Pandas DataFrame。
     """
+    cnx = None
     try:
-        cnx = mysql.connector.connect(**DB_CONFIG)
+        cnx = get_read_connection()
         print("数据库连接成功！")
         
         # 使用 pandas 直接从 SQL 查询读取数据，更简洁高效
@@ -24,21 +25,20 @@ def execute_query(query):
         
         return df
 
-    except mysql.connector.Error as err:
-        if err.errno == errorcode.ER_ACCESS_DENIED_ERROR:
+    except Exception as err:
+        # pymysql 错误的第一个参数是错误码
+        errno = err.args[0] if getattr(err, 'args', None) else None
+        if errno == 1045:
             print("❌ 错误：用户名或密码不正确。")
-        elif err.errno == errorcode.ER_BAD_DB_ERROR:
+        elif errno == 1049:
             print(f"❌ 错误：数据库 '{DB_CONFIG['database']}' 不存在。")
         else:
-            print(f"❌ 发生未知数据库错误: {err}")
-        return None
-    except Exception as e:
-        print(f"❌ 发生了一个非数据库错误: {e}")
+            print(f"❌ 查询失败: {err}")
         return None
     finally:
-        if 'cnx' in locals() and cnx.is_connected():
+        if cnx is not None:
+            # 归还连接池
             cnx.close()
-            # print("数据库连接已关闭。")
 
 if __name__ == "__main__":
     # ——— 在这里写下您想执行的 SQL 查询 ———
@@ -62,4 +62,4 @@ if __name__ == "__main__":
         print("\n✅ 查询结果:")
         # 设置 pandas 显示所有列，避免结果被折叠
         pd.set_option('display.max_columns', None)
-        print(query_result_df) 
\ No newline at end of file
+        print(query_result_df) 
@@ -10,60 +10,281 @@
 import os
 import sys
 import pandas as pd
-import pymysql
 import argparse
+import time
 from datetime import datetime
 
 # 添加项目根目录到Python路径
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 
-from src.shared.config import DB_CONFIG
-from src.exporters.sql_manager import get_query, format_query, list_queries
+from src.shared.config import PREFLIGHT_THRESHOLDS
+from src.shared.db_pool import get_connection, connect_direct, discard_connection, is_replica, read_config
+from src.exporters.sql_manager import build_query, list_queries, get_query_timeout, get_query_shard_key
+from src.exporters.query_guard import QueryGuard, QueryTimeoutError
+from src.exporters.db_to_excel_exporter import DatabaseToExcelExporter
+from src.exporters.writers import (
+    write_dataframe_sheets, with_format_extension, parse_formats, EXPORT_FORMATS, SPLIT_TARGETS, SplitWriter
+)
+from src.exporters.result_cache import ResultCache
+from src.exporters.preflight import run_preflight, confirm_preflight, record_preflight
+from src.exporters.sql_params import read_sql_dataframe
 
 
 def parse_cmd_args():
     """
     支持如下调用方式：
-    python quick_export.py 查询名 [参数1=值1 参数2=值2 ...] [--output 输出文件名] [--sheet 工作表名]
+    python quick_export.py 查询名 [参数1=值1 参数2=值2 ...] [--output 输出文件名] [--sheet 工作表名] [--stream] [--rollover sheet|file] [--format xlsx|csv|csv.gz|parquet[,...]] [--cache] [--timeout 秒] [--yes] [--no-preflight] [--pipeline] [--shards N] [--split-by 列名] [--split-target file|sheet]
     """
     parser = argparse.ArgumentParser(description="数据库导出工具")
     parser.add_argument('query', nargs='?', help='查询名称')
     parser.add_argument('params', nargs='*', help='参数，格式为 key=value')
     parser.add_argument('--output', type=str, help='输出Excel文件路径')
     parser.add_argument('--sheet', type=str, help='Excel工作表名称')
+    parser.add_argument('--stream', action='store_true', help='流式导出（大结果集内存占用恒定）')
+    parser.add_argument('--rollover', choices=['sheet', 'file'], default='sheet',
+                        help='超过Excel单表行数上限时续写到新工作表或新文件（新文件仅流式导出）')
+    parser.add_argument('--format', type=str, default='xlsx',
+                        help=f'导出格式 {"/".join(EXPORT_FORMATS)}，逗号分隔可同时导出多种格式（查询只执行一次），'
+                             f'如 xlsx,csv.gz（csv/csv.gz/parquet 及多格式始终流式写入）')
+    parser.add_argument('--cache', action='store_true',
+                        help='使用查询结果缓存（相关表没有新导入时直接复用上次结果，不访问数据库）')
+    parser.add_argument('--timeout', type=float, default=None,
+                        help='查询超时秒数，超时后在服务端取消查询（默认使用SQL文件中 "-- 超时:" 的配置）')
+    parser.add_argument('--yes', '-y', action='store_true',
+                        help='预检超过确认阈值时不询问，直接执行（超过拒绝阈值仍会拒绝）')
+    parser.add_argument('--no-preflight', action='store_true',
+                        help='跳过导出前的 EXPLAIN 预检')
+    parser.add_argument('--pipeline', action='store_true',
+                        help='流式导出时后台预取下一批数据，读取与写入重叠执行')
+    parser.add_argument('--shards', type=int, default=1,
+                        help='按查询头部 "-- 分片: 表.列" 把查询切成N段在多个连接上并行执行（流式导出）')
+    parser.add_argument('--split-by', type=str, default=None,
+                        help='按该列的值拆分输出（查询只执行一次），如 管理城市、销售组')
+    parser.add_argument('--split-target', choices=list(SPLIT_TARGETS), default='file',
+                        help='拆分为每个值一个文件（file）或一个工作表（sheet，仅xlsx）')
     return parser.parse_args()
 
 
-def quick_export_to_excel(sql_query, output_path, sheet_name="数据"):
+def create_connection(db_config=None):
+    """从共享连接池借用数据库连接（close() 时归还连接池），默认按只读查询路由（只读副本或主库）"""
+    return get_connection(db_config or read_config())
+
+
+def preflight_check(sql_query, label=None, assume_yes=False):
+    """
+    导出前运行 EXPLAIN 预检，超过阈值时询问或拒绝
+    
+    Returns:
+        (是否继续执行, 预检结果)；EXPLAIN 本身失败时不阻止导出，预检结果为None
+    """
+    try:
+        connection = create_connection()
+        try:
+            result = run_preflight(connection, str(sql_query), PREFLIGHT_THRESHOLDS, label)
+        finally:
+            connection.close()
+    except Exception as e:
+        print(f"⚠️ 预检失败，跳过预检: {e}")
+        return True, None
+    
+    if not confirm_preflight(result, assume_yes):
+        record_preflight(result, executed=False)
+        return False, result
+    return True, result
+
+
+def quick_export_to_file(sql_query, output_path, fmt, timeout=None, stats=None, pipelined=False,
+                         shard_key=None, shards=1):
+    """
+    流式导出SQL查询结果到 csv / csv.gz / parquet 文件
+    
+    Args:
+        sql_query (str | BoundQuery): SQL查询语句或绑定参数的查询
+        output_path (str): 输出文件路径（扩展名按格式自动修正）
+        fmt (str): 导出格式
+        timeout (float): 查询超时秒数
+        stats (dict): 传入时写入实际导出行数 stats['rows']
+        pipelined (bool): 读取与写入是否流水线重叠执行
+        shard_key (str): 分片键 "表.列"
+        shards (int): 分片数，大于1时分片并行执行
+    
+    Returns:
+        bool: 导出是否成功
+    """
+    output_path = with_format_extension(output_path, fmt)
+    print(f"正在流式导出到 {fmt} 文件: {output_path}")
+    with DatabaseToExcelExporter(pipelined=pipelined) as exporter:
+        success = exporter.export_to_file(sql_query, output_path, fmt, include_timestamp=False, timeout=timeout,
+                                          shard_key=shard_key, shards=shards)
+        if stats is not None:
+            stats['rows'] = exporter.last_row_count
+    if success:
+        print("✅ 导出成功！")
+        print(f"📁 文件位置: {output_path}")
+    else:
+        print("❌ 导出失败，详见 db_export.log")
+    return success
+
+
+def quick_export_to_files(sql_query, output_path, formats, sheet_name="数据", rollover='sheet', timeout=None,
+                          stats=None, pipelined=False, shard_key=None, shards=1):
+    """
+    查询只执行一次，流式结果同时写入多种格式的文件
+    
+    Args:
+        sql_query (str | BoundQuery): SQL查询语句或绑定参数的查询
+        output_path (str): 输出文件路径（扩展名按各格式替换）
+        formats (list): 导出格式列表
+        sheet_name (str): 工作表名称（仅xlsx）
+        rollover (str): 超过单表行数上限时的续写方式（仅xlsx）
+        timeout (float): 查询超时秒数
+        stats (dict): 传入时写入实际导出行数 stats['rows']
+        pipelined (bool): 读取与写入是否流水线重叠执行
+        shard_key (str): 分片键 "表.列"
+        shards (int): 分片数
+    
+    Returns:
+        bool: 导出是否成功
+    """
+    print(f"正在同时流式导出到 {', '.join(formats)}: {output_path}")
+    with DatabaseToExcelExporter(pipelined=pipelined) as exporter:
+        success = exporter.export_to_files(sql_query, output_path, formats, include_timestamp=False,
+                                           sheet_name=sheet_name, rollover=rollover, timeout=timeout,
+                                           shard_key=shard_key, shards=shards)
+        if stats is not None:
+            stats['rows'] = exporter.last_row_count
+    if success:
+        print("✅ 导出成功！")
+        for fmt in formats:
+            print(f"📁 文件位置: {with_format_extension(output_path, fmt)}")
+    else:
+        print("❌ 导出失败，详见 db_export.log")
+    return success
+
+
+def quick_export_split(sql_query, output_path, fmt, split_by, split_target='file', sheet_name="数据",
+                       rollover='sheet', timeout=None, stats=None, pipelined=False, shard_key=None, shards=1):
+    """
+    读一遍查询结果，按某列的值拆分写入多个文件或工作表
+    
+    Args:
+        sql_query (str | BoundQuery): SQL查询语句或绑定参数的查询
+        output_path (str): 输出路径，拆分文件命名为 文件名_值.扩展名
+        fmt (str): 导出格式
+        split_by (str): 拆分列名
+        split_target (str): file=每个值一个文件，sheet=每个值一个工作表（仅xlsx）
+        sheet_name (str): 工作表名称（按文件拆分的xlsx）
+        rollover (str): 超过单表行数上限时的续写方式
+        timeout (float): 查询超时秒数
+        stats (dict): 传入时写入实际导出行数 stats['rows']
+        pipelined (bool): 读取与写入是否流水线重叠执行
+        shard_key (str): 分片键 "表.列"
+        shards (int): 分片数
+    
+    Returns:
+        bool: 导出是否成功
+    """
+    output_path = with_format_extension(output_path, fmt)
+    print(f"正在按 {split_by} 拆分导出到 {fmt} " + ("工作表" if split_target == 'sheet' else "文件") + f": {output_path}")
+    try:
+        writer = SplitWriter(output_path, fmt, split_by, split_target, sheet_name, rollover)
+        with DatabaseToExcelExporter(pipelined=pipelined) as exporter:
+            rows = exporter.export_to_writer(sql_query, writer, timeout=timeout, shard_key=shard_key, shards=shards)
+    except QueryTimeoutError as e:
+        print(f"⏱️ {e}")
+        return False
+    except Exception as e:
+        print(f"❌ 导出失败: {e}")
+        return False
+    if stats is not None:
+        stats['rows'] = rows
+    if rows == 0:
+        print("警告: 查询结果为空")
+        return False
+    
+    print(f"✅ 导出成功！共 {rows} 行，拆分为 {len(writer.value_rows)} 份")
+    for value, count in sorted(writer.value_rows.items(), key=lambda item: -item[1])[:20]:
+        print(f"   • {value}: {count} 行")
+    if len(writer.value_rows) > 20:
+        print(f"   ... 其余 {len(writer.value_rows) - 20} 份")
+    if split_target == 'sheet':
+        print(f"📁 文件位置: {output_path}")
+    else:
+        print(f"📁 文件位置: {os.path.dirname(output_path) or '.'}")
+    return True
+
+
+def quick_export_to_excel(sql_query, output_path, sheet_name="数据", streaming=False, rollover='sheet',
+                          use_cache=False, timeout=None, stats=None, pipelined=False, shard_key=None, shards=1):
     """
     快速导出SQL查询结果到Excel文件
     
     Args:
-        sql_query (str): SQL查询语句
+        sql_query (str | BoundQuery): SQL查询语句或绑定参数的查询
         output_path (str): 输出Excel文件路径
         sheet_name (str): Excel工作表名称
+        streaming (bool): 是否流式导出（服务端游标分批读取，write-only 模式写入）
+        rollover (str): 超过单表行数上限时续写到新工作表（sheet）或新文件（file）
+        use_cache (bool): 是否使用查询结果缓存（仅非流式导出）
+        timeout (float): 查询超时秒数，超时或 Ctrl-C 时在服务端取消查询
+        stats (dict): 传入时写入实际导出行数 stats['rows']
+        pipelined (bool): 流式导出时读取与写入是否流水线重叠执行
+        shard_key (str): 分片键 "表.列"（仅流式导出）
+        shards (int): 分片数，大于1时分片并行执行
     
     Returns:
         bool: 导出是否成功
     """
+    if streaming:
+        print(f"正在流式导出到Excel文件: {output_path}")
+        with DatabaseToExcelExporter(pipelined=pipelined) as exporter:
+            success = exporter.export_to_excel(sql_query, output_path, sheet_name,
+                                               include_timestamp=False, streaming=True,
+                                               rollover=rollover, timeout=timeout,
+                                               shard_key=shard_key, shards=shards)
+            if stats is not None:
+                stats['rows'] = exporter.last_row_count
+        if success:
+            print("✅ 导出成功！")
+            print(f"📁 文件位置: {output_path}")
+        else:
+            print("❌ 导出失败，详见 db_export.log")
+        return success
+    
     try:
-        print(f"正在连接数据库...")
+        cache = ResultCache() if use_cache else None
+        # 缓存键在查询前计算，查询期间表被导入更新时结果不会记到新版本下
+        cache_key, df = cache.lookup(str(sql_query)) if cache else (None, None)
         
-        # 连接数据库
-        connection = pymysql.connect(
-            host=DB_CONFIG['host'],
-            user=DB_CONFIG['user'],
-            password=DB_CONFIG['password'],
-            database=DB_CONFIG['database'],
-            port=DB_CONFIG['port'],
-            charset=DB_CONFIG['charset']
-        )
-        
-        print(f"数据库连接成功")
-        print(f"正在执行SQL查询...")
+        if df is not None:
+            print("⚡ 命中查询结果缓存，未访问数据库")
+        else:
+            print("正在连接数据库...")
+            
+            # 连接数据库（只读副本可用时连接副本，取消查询的旁路连接连同一个库）
+            db_config = read_config()
+            connection = create_connection(db_config)
+            
+            print("数据库连接成功")
+            print("正在执行SQL查询..." + (f"（超时 {timeout:g} 秒）" if timeout else ""))
+            
+            # 执行查询（超时或 Ctrl-C 时通过旁路连接 KILL QUERY，查询不会在服务端继续运行）
+            try:
+                with QueryGuard(connection, timeout, lambda: connect_direct(db_config)):
+                    df = read_sql_dataframe(connection, sql_query)
+            except KeyboardInterrupt:
+                # 读结果途中被中断的连接状态不确定，不归还连接池
+                discard_connection(connection)
+                raise
+            finally:
+                connection.close()
+            
+            # 只读副本可能还没复制到表版本戳对应的写入，其结果不写入缓存
+            if cache and not is_replica(db_config) and cache.put(cache_key, df):
+                print("💾 查询结果已缓存")
         
-        # 执行查询
-        df = pd.read_sql(sql_query, connection)
+        if stats is not None:
+            stats['rows'] = len(df)
         
         if df.empty:
             print("警告: 查询结果为空")
@@ -80,16 +301,18 @@ def quick_export_to_excel(sql_query, output_path, sheet_name="数据"):
         # 导出到Excel
         print(f"正在导出到Excel文件: {output_path}")
         with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
-            df.to_excel(writer, sheet_name=sheet_name, index=False)
+            sheet_names = write_dataframe_sheets(writer, df, sheet_name)
         
-        print(f"✅ 导出成功！")
+        print("✅ 导出成功！")
         print(f"📊 数据统计: {len(df)} 行, {len(df.columns)} 列")
+        if len(sheet_names) > 1:
+            print(f"📑 超过单表行数上限，已拆分为 {len(sheet_names)} 个工作表: {', '.join(sheet_names)}")
         print(f"📁 文件位置: {output_path}")
-        
-        # 关闭数据库连接
-        connection.close()
         return True
         
+    except QueryTimeoutError as e:
+        print(f"⏱️ {e}")
+        return False
     except Exception as e:
         print(f"❌ 导出失败: {e}")
         return False
@@ -111,7 +334,9 @@ def show_available_queries():
         print()
 
 
-def export_by_query_name(query_name, output_path, sheet_name=None, **params):
+def export_by_query_name(query_name, output_path, sheet_name=None, streaming=False, rollover='sheet',
+                         fmt='xlsx', use_cache=False, timeout=None, preflight=True, assume_yes=False,
+                         pipelined=False, shards=1, split_by=None, split_target='file', **params):
     """
     通过查询名称导出数据
     
@@ -119,13 +344,31 @@ def export_by_query_name(query_name, output_path, sheet_name=None, **params):
         query_name (str): 查询名称
         output_path (str): 输出路径
         sheet_name (str): 工作表名称
+        streaming (bool): 是否流式导出
+        rollover (str): 超过单表行数上限时的续写方式
+        fmt (str | list): 导出格式 xlsx / csv / csv.gz / parquet，多个格式时查询只执行一次同时写入
+        use_cache (bool): 是否使用查询结果缓存
+        timeout (float): 查询超时秒数，默认使用查询头部 "-- 超时:" 的配置
+        preflight (bool): 导出前是否运行 EXPLAIN 预检
+        assume_yes (bool): 预检超过确认阈值时不询问直接执行
+        pipelined (bool): 流式导出时读取与写入是否流水线重叠执行
+        shards (int): 分片数，大于1时按查询声明的分片键并行执行
+        split_by (str): 按该列的值拆分输出
+        split_target (str): 拆分为文件（file）或工作表（sheet）
         **params: 查询参数
     """
-    # 获取SQL查询
-    if params:
-        sql_query = format_query(query_name, **params)
-    else:
-        sql_query = get_query(query_name)
+    try:
+        formats = parse_formats(fmt)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return False
+    fmt = formats[0]
+    if len(formats) > 1 and split_by:
+        print("❌ 拆分导出只支持单一格式")
+        return False
+    
+    # 获取SQL查询（声明了 "-- 参数:" 的查询使用绑定参数，否则按原方式替换 {参数}）
+    sql_query = build_query(query_name, **params)
     
     if not sql_query:
         print(f"❌ 查询 '{query_name}' 不存在或参数错误")
@@ -139,7 +382,55 @@ def export_by_query_name(query_name, output_path, sheet_name=None, **params):
     if params:
         print(f"📋 参数: {params}")
     
-    return quick_export_to_excel(sql_query, output_path, sheet_name)
+    if timeout is None:
+        timeout = get_query_timeout(query_name)
+    if timeout:
+        print(f"⏱️ 查询超时: {timeout:g} 秒")
+    
+    shard_key = None
+    if shards > 1:
+        shard_key = get_query_shard_key(query_name)
+        if not shard_key:
+            print(f"⚠️ 查询 '{query_name}' 没有声明 \"-- 分片: 表.列\"，按单个查询执行")
+            shards = 1
+        else:
+            print(f"🧩 分片执行: {shard_key}，{shards} 个分片")
+            if fmt == 'xlsx' and not streaming:
+                print("ℹ️ 分片执行需要流式导出，已自动启用 --stream")
+                streaming = True
+    
+    if use_cache and (streaming or fmt != 'xlsx' or split_by or len(formats) > 1):
+        print("⚠️ 查询结果缓存仅用于非流式 xlsx 导出，本次不使用缓存")
+        use_cache = False
+    
+    # 命中缓存时不访问数据库，无需预检
+    preflight_result = None
+    if preflight and not (use_cache and ResultCache().contains(str(sql_query))):
+        proceed, preflight_result = preflight_check(sql_query, query_name, assume_yes)
+        if not proceed:
+            print("🛑 已取消导出")
+            return False
+    
+    stats = {}
+    start_time = time.time()
+    if split_by:
+        success = quick_export_split(sql_query, output_path, fmt, split_by, split_target, sheet_name,
+                                     rollover=rollover, timeout=timeout, stats=stats, pipelined=pipelined,
+                                     shard_key=shard_key, shards=shards)
+    elif len(formats) > 1:
+        success = quick_export_to_files(sql_query, output_path, formats, sheet_name, rollover=rollover,
+                                        timeout=timeout, stats=stats, pipelined=pipelined,
+                                        shard_key=shard_key, shards=shards)
+    elif fmt != 'xlsx':
+        success = quick_export_to_file(sql_query, output_path, fmt, timeout=timeout, stats=stats,
+                                       pipelined=pipelined, shard_key=shard_key, shards=shards)
+    else:
+        success = quick_export_to_excel(sql_query, output_path, sheet_name, streaming=streaming, rollover=rollover,
+                                        use_cache=use_cache, timeout=timeout, stats=stats, pipelined=pipelined,
+                                        shard_key=shard_key, shards=shards)
+    if preflight_result:
+        record_preflight(preflight_result, stats.get('rows'), time.time() - start_time)
+    return success
 
 
 def main():
@@ -161,6 +452,12 @@ def main():
         else:
             output_dir = r"E:\DOCUMENTS\inbox\new MySQL\data\exports"
             output_path = os.path.join(output_dir, f"{query_name}.xlsx")
+        try:
+            formats = parse_formats(args.format)
+        except ValueError as e:
+            print(f"❌ {e}")
+            return
+        output_path = with_format_extension(output_path, formats[0])
         
         sheet_name = args.sheet or query_name
         
@@ -170,7 +467,12 @@ def main():
         print(f"📂 输出路径: {output_path}")
         print("-" * 50)
         
-        success = export_by_query_name(query_name, output_path, sheet_name, **params)
+        success = export_by_query_name(query_name, output_path, sheet_name, streaming=args.stream,
+                                       rollover=args.rollover, fmt=formats,
+                                       use_cache=args.cache, timeout=args.timeout,
+                                       preflight=not args.no_preflight, assume_yes=args.yes,
+                                       pipelined=args.pipeline, shards=args.shards,
+                                       split_by=args.split_by, split_target=args.split_target, **params)
         if success:
             print("-" * 50)
             print("🎉 导出完成！")
@@ -228,7 +530,7 @@ def main():
         print(f"📝 使用查询名称: {query_name}")
         success = export_by_query_name(query_name, output_path, sheet_name, **params)
     else:
-        print(f"📝 使用直接SQL查询")
+        print("📝 使用直接SQL查询")
         success = quick_export_to_excel(sql_query, output_path, sheet_name)
     
     if success:
@@ -6,12 +6,19 @@ SQL查询查看器
 """
 
 import os
+import re
 import sys
 
 # 添加项目根目录到Python路径
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 
-from src.exporters.sql_manager import list_queries, get_query, format_query
+from src.exporters.sql_manager import (
+    list_queries, get_query, format_query, build_query, build_preview_sql, get_query_timeout
+)
+from src.exporters.sql_params import find_placeholders
+
+# 预览默认显示的行数
+PREVIEW_ROWS = 20
 
 
 def show_query_details(query_name):
@@ -59,6 +66,45 @@ def show_query_details(query_name):
             print(f"格式化失败: {e}")
 
 
+def preview_query(query_name, limit=PREVIEW_ROWS):
+    """执行查询并显示前 limit 行（配置了只读副本时在副本上执行）"""
+    # 导出器依赖 pandas 和数据库驱动，只在预览时导入
+    from src.exporters.db_to_excel_exporter import DatabaseToExcelExporter
+    
+    original_query = get_query(query_name)
+    if not original_query:
+        print(f"❌ 查询 '{query_name}' 不存在")
+        return
+    
+    # :name 绑定参数与 {name} 格式化参数
+    names = [name for _, _, name in find_placeholders(original_query)] + re.findall(r'\{(\w+)\}', original_query)
+    params = {}
+    for param in dict.fromkeys(names):
+        params[param] = input(f"请输入参数 {param}: ").strip()
+    sql_query = build_query(query_name, **params)
+    if not sql_query:
+        print("❌ 查询参数错误")
+        return
+    
+    try:
+        preview_sql = build_preview_sql(sql_query, limit)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return
+    
+    print(f"\n🔍 正在预览查询 {query_name}（前 {limit} 行）...")
+    with DatabaseToExcelExporter() as exporter:
+        df = exporter.execute_query(preview_sql, timeout=get_query_timeout(query_name))
+        server = exporter.active_config['host'] if exporter.active_config else None
+    if df is None:
+        print("❌ 查询失败，详见 db_export.log")
+        return
+    
+    print(f"📊 {len(df)} 行（数据库: {server}）")
+    print("-" * 60)
+    print(df.head(limit).to_string(index=False))
+
+
 def show_all_queries():
     """显示所有查询"""
     print("📋 所有可用的SQL查询")
@@ -127,9 +173,10 @@ def main():
         print("2. 查看查询详情")
         print("3. 查看SQL文件列表")
         print("4. 查看SQL文件内容")
-        print("5. 退出")
+        print("5. 预览查询结果")
+        print("6. 退出")
         
-        choice = input("\n请输入选项 (1-5): ").strip()
+        choice = input("\n请输入选项 (1-6): ").strip()
         
         if choice == '1':
             show_all_queries()
@@ -182,6 +229,26 @@ def main():
                 print("❌ 请输入有效的数字")
                 
         elif choice == '5':
+            queries = list_queries()
+            if not queries:
+                print("❌ 没有可用的查询")
+                continue
+            
+            print("\n可用的查询:")
+            for i, query_name in enumerate(queries.keys(), 1):
+                print(f"{i}. {query_name}")
+            
+            try:
+                idx = int(input("\n请输入查询编号: ")) - 1
+                query_names = list(queries.keys())
+                if 0 <= idx < len(query_names):
+                    preview_query(query_names[idx])
+                else:
+                    print("❌ 无效的编号")
+            except ValueError:
+                print("❌ 请输入有效的数字")
+                
+        elif choice == '6':
             print("👋 再见！")
             break
             
@@ -2,7 +2,6 @@
 # 集中管理所有数据相关路径和数据库配置，支持多表、多路径管理
 
 import os
-import pymysql
 from src.shared.table_schemas import TABLE_SCHEMAS
 
 # 尝试从 local_config.py 导入个人配置，如果不存在则从示例文件导入
@@ -14,6 +13,13 @@ except ImportError:
     print("请复制 'local_config.example.py' 为 'local_config.py' 并填入您的真实配置。")
     from src.shared.local_config_example import DB_CONFIG, DATA_SOURCES
 
+# 只读副本配置（可选）：在 local_config.py 中定义 DB_CONFIG_READ，导出和分析查询发往只读副本，
+# 减少与导入争用主库；未定义时所有查询都使用 DB_CONFIG
+try:
+    from src.shared.local_config import DB_CONFIG_READ
+except ImportError:
+    DB_CONFIG_READ = None
+
 
 # 自动生成每个表的字段名和主键信息
 TABLE_COLUMNS = {k: [col[0] for col in v['columns']] for k, v in TABLE_SCHEMAS.items()}
@@ -56,24 +62,16 @@ def get_update_strategy(table_name):
 # 8. 数据库连接函数
 def get_database_connection(db_config: dict = None):
     """
-    获取数据库连接
+    获取数据库连接（从共享连接池借用，close() 时归还，见 db_pool.py）
     
     Args:
         db_config: 数据库配置字典，如果为None则使用默认配置
         
     Returns:
-        pymysql.Connection: 数据库连接对象
+        pymysql.Connection: 数据库连接对象（autocommit）
     """
-    config = db_config or DB_CONFIG
-    return pymysql.connect(
-        host=config['host'],
-        user=config['user'],
-        password=config['password'],
-        database=config['database'],
-        port=config['port'],
-        charset=config['charset'],
-        autocommit=True
-    )
+    from src.shared.db_pool import get_connection
+    return get_connection(db_config or DB_CONFIG)
 
 # 定义批量导入的组
 BATCH_GROUPS = {
@@ -82,5 +80,38 @@ BATCH_GROUPS = {
     # 'my_custom_group': ['table_a', 'table_b'],
 }
 
+# 导出前预检（EXPLAIN）阈值，超过 confirm_* 需要确认，超过 refuse_* 拒绝执行
+# 估算值与实际值记录在 data/preflight_history.jsonl，可据此调整阈值
+PREFLIGHT_THRESHOLDS = {
+    'confirm_rows_examined': 5_000_000,
+    'refuse_rows_examined': 200_000_000,
+    'confirm_result_rows': 1_000_000,
+    'full_scan_rows': 1_000_000,
+}
+
+# 并发配置：导入的生产者/消费者线程数、常驻导出服务的工作线程数
+# 连接池大小按这里的并发数计算（见 db_pool.py），命令行指定的并发数优先
+CONCURRENCY = {
+    'import_producers': 4,
+    'import_consumers': 4,
+    'export_workers': 4,
+}
+
+# 数据库连接池配置（见 db_pool.py）
+DB_POOL_CONFIG = {
+    'pool_size': None,      # 常驻连接数，None 表示按 CONCURRENCY 中的并发数 + 1 计算
+    'max_overflow': 16,     # 高峰时额外创建的连接数（分片、多表并行查询），用完即关闭
+    'pool_timeout': 30,     # 连接全部被占用时等待的秒数
+    'pool_recycle': 3600,   # 连接使用超过该秒数后重建，避免被服务端 wait_timeout 断开
+    'pool_pre_ping': True,  # 借出前检查连接是否可用，断开的连接自动重连
+}
+
+# 只读副本延迟检查（配置了 DB_CONFIG_READ 时生效）：
+# 复制延迟超过 max_lag_seconds、复制线程停止或副本无法连接时，只读查询回退到主库
+REPLICA_LAG_CONFIG = {
+    'max_lag_seconds': 30,  # 允许的最大复制延迟（秒）
+    'check_interval': 10,   # 延迟检查结果缓存的秒数
+}
+
 # 迁移或切换环境时，只需修改本文件中的路径和数据库配置即可。
 # 添加新表时，只需在 DATA_SOURCES 中添加新的配置项即可。 
\ No newline at end of file
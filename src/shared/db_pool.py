@@ -0,0 +1,220 @@
+# db_pool.py
+# 共享数据库连接池：导入、导出、查询脚本都从这里取连接
+# 同一进程内同一数据库配置、同一用途只建一个 SQLAlchemy 连接池，所有入口共用：
+#   'import' - 导入用（db_importer 的 to_sql / engine.connect()，普通事务）
+#   'export' - 导出和查询用（借出 pymysql 原生连接，autocommit，支持 SSCursor 流式读取）
+# 连接池大小按 config.CONCURRENCY 中的并发数计算，也可在创建前用 configure_pool() 按命令行参数调整；
+# 借出前 pre_ping 检查连接，断开的连接自动重建。
+# 连接池按进程号区分：多进程批量导出时每个子进程各建自己的连接池（连接不能跨进程共享）。
+# 配置了只读副本（DB_CONFIG_READ）时，只读查询通过 read_config() / get_read_connection() 发往副本，
+# 复制延迟超过阈值时回退主库（见 replica.py）。
+
+import os
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+import pymysql
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine, URL
+
+from src.shared.config import DB_CONFIG, DB_CONFIG_READ, CONCURRENCY, DB_POOL_CONFIG, REPLICA_LAG_CONFIG
+from src.shared.replica import ReplicaRouter, lag_from_status
+
+logger = logging.getLogger(__name__)
+
+# 连接池用途及其并发数在 CONCURRENCY 中对应的配置项
+POOL_ROLES = {
+    'import': 'import_consumers',
+    'export': 'export_workers',
+}
+
+_engines: Dict[tuple, Engine] = {}
+_concurrency: Dict[str, int] = {}
+_routers: Dict[int, ReplicaRouter] = {}
+_lock = threading.Lock()
+
+
+def _config_key(db_config: Dict[str, Any]) -> tuple:
+    return tuple(sorted((k, str(v)) for k, v in db_config.items()))
+
+
+def pool_size_for(role: str) -> int:
+    """连接池常驻连接数：配置了 pool_size 时使用配置值，否则为该用途的并发数 + 1（预检、取值范围等辅助查询）"""
+    if DB_POOL_CONFIG.get('pool_size'):
+        return int(DB_POOL_CONFIG['pool_size'])
+    concurrency = _concurrency.get(role) or CONCURRENCY.get(POOL_ROLES[role], 1)
+    return max(int(concurrency), 1) + 1
+
+
+def configure_pool(role: str, concurrency: int):
+    """
+    按实际并发数调整连接池大小（命令行指定了 --workers 等参数时调用）
+
+    需要在该用途的连接池创建之前调用；已创建的连接池不再调整，超出部分使用溢出连接。
+    """
+    if role not in POOL_ROLES:
+        raise ValueError(f"未知的连接池用途: {role}，可选: {', '.join(POOL_ROLES)}")
+    with _lock:
+        _concurrency[role] = max(int(concurrency), 1)
+        created = [engine for (pid, r, _), engine in _engines.items() if pid == os.getpid() and r == role]
+    for engine in created:
+        if engine.pool.size() < pool_size_for(role):
+            logger.warning(f"{role} 连接池已创建（{engine.pool.size()} 个连接），"
+                           f"并发数 {concurrency} 超出的部分使用溢出连接")
+
+
+def _create_engine(role: str, db_config: Dict[str, Any]) -> Engine:
+    url = URL.create(
+        'mysql+pymysql',
+        username=db_config['user'],
+        password=db_config['password'],
+        host=db_config['host'],
+        port=db_config['port'],
+        database=db_config['database'],
+        query={'charset': db_config.get('charset', 'utf8mb4')},
+    )
+    options = dict(
+        pool_size=pool_size_for(role),
+        max_overflow=DB_POOL_CONFIG.get('max_overflow', 16),
+        pool_timeout=DB_POOL_CONFIG.get('pool_timeout', 30),
+        pool_recycle=DB_POOL_CONFIG.get('pool_recycle', 3600),
+        pool_pre_ping=DB_POOL_CONFIG.get('pool_pre_ping', True),
+        echo=False,
+    )
+    if role == 'export':
+        # 导出连接每条语句自动提交，长期复用的连接不会停留在旧的快照上
+        options['isolation_level'] = 'AUTOCOMMIT'
+    logger.info(f"创建 {role} 连接池: {db_config['host']}:{db_config['port']}/{db_config['database']}，"
+                f"常驻 {options['pool_size']} 个连接，溢出上限 {options['max_overflow']}")
+    return create_engine(url, **options)
+
+
+def get_engine(role: str = 'export', db_config: Optional[Dict[str, Any]] = None) -> Engine:
+    """
+    获取当前进程的共享连接池（首次调用时创建）
+
+    Args:
+        role: 'import' 或 'export'
+        db_config: 数据库配置字典，默认 DB_CONFIG
+    """
+    if role not in POOL_ROLES:
+        raise ValueError(f"未知的连接池用途: {role}，可选: {', '.join(POOL_ROLES)}")
+    db_config = db_config or DB_CONFIG
+    key = (os.getpid(), role, _config_key(db_config))
+    engine = _engines.get(key)
+    if engine is None:
+        with _lock:
+            engine = _engines.get(key)
+            if engine is None:
+                engine = _engines[key] = _create_engine(role, db_config)
+    return engine
+
+
+def get_connection(db_config: Optional[Dict[str, Any]] = None):
+    """
+    从导出连接池借用一个 pymysql 连接（autocommit）
+
+    用法与 pymysql 连接相同（cursor()、thread_id() 等）；close() 时归还连接池而不是断开。
+    """
+    return get_engine('export', db_config).raw_connection()
+
+
+def connect_direct(db_config: Optional[Dict[str, Any]] = None,
+                   connect_timeout: int = 10) -> pymysql.connections.Connection:
+    """
+    创建一个不经过连接池的连接
+
+    用于 KILL QUERY 等旁路操作：连接池被占满时也能立即取消正在执行的查询。
+    """
+    config = db_config or DB_CONFIG
+    return pymysql.connect(
+        host=config['host'],
+        user=config['user'],
+        password=config['password'],
+        database=config['database'],
+        port=config['port'],
+        charset=config['charset'],
+        autocommit=True,
+        connect_timeout=connect_timeout
+    )
+
+
+def replica_lag(db_config: Dict[str, Any]) -> Optional[float]:
+    """查询只读副本的复制延迟秒数（复制线程未运行时返回None，连接失败时抛出异常）"""
+    connection = connect_direct(db_config, connect_timeout=5)
+    try:
+        with connection.cursor(pymysql.cursors.DictCursor) as cursor:
+            try:
+                cursor.execute("SHOW REPLICA STATUS")
+            except pymysql.MySQLError:
+                # MySQL 8.0.22 之前没有 SHOW REPLICA STATUS
+                cursor.execute("SHOW SLAVE STATUS")
+            return lag_from_status(cursor.fetchone())
+    finally:
+        connection.close()
+
+
+def _get_router() -> ReplicaRouter:
+    router = _routers.get(os.getpid())
+    if router is None:
+        with _lock:
+            router = _routers.setdefault(os.getpid(), ReplicaRouter(
+                DB_CONFIG, DB_CONFIG_READ, replica_lag,
+                max_lag=REPLICA_LAG_CONFIG.get('max_lag_seconds', 30),
+                check_interval=REPLICA_LAG_CONFIG.get('check_interval', 10),
+            ))
+    return router
+
+
+def read_config() -> Dict[str, Any]:
+    """
+    只读查询（导出、预览、采样分析）使用的数据库配置
+
+    配置了 DB_CONFIG_READ 且复制延迟未超过阈值时返回只读副本配置，否则返回 DB_CONFIG。
+    同一次查询的取消连接（connect_direct）应使用同一个配置。
+    """
+    if not DB_CONFIG_READ:
+        return DB_CONFIG
+    return _get_router().choose()
+
+
+def is_replica(db_config: Optional[Dict[str, Any]]) -> bool:
+    """
+    该配置是否为只读副本
+
+    副本读到的数据可能落后于表版本戳（见 table_versions.py），查询结果缓存不写入副本的查询结果。
+    """
+    if not DB_CONFIG_READ or not db_config:
+        return False
+    replica_key = _config_key(DB_CONFIG_READ)
+    return _config_key(db_config) == replica_key and replica_key != _config_key(DB_CONFIG)
+
+
+def get_read_connection():
+    """借用一个只读查询用的连接（只读副本可用时连接副本，否则连接主库）"""
+    return get_connection(read_config())
+
+
+def discard_connection(connection):
+    """作废状态不确定的连接（如读结果途中被中断），不再归还连接池复用"""
+    try:
+        if hasattr(connection, 'invalidate'):
+            connection.invalidate()
+        else:
+            connection.close()
+    except Exception as e:
+        logger.debug(f"作废连接失败: {e}")
+
+
+def pool_status() -> Dict[str, str]:
+    """当前进程各连接池的状态（调试用）"""
+    return {f"{role}:{dict(key).get('host')}/{dict(key).get('database')}": engine.pool.status()
+            for (pid, role, key), engine in list(_engines.items()) if pid == os.getpid()}
+
+
+def dispose_all():
+    """关闭当前进程的所有连接池"""
+    with _lock:
+        for key in [key for key in _engines if key[0] == os.getpid()]:
+            _engines.pop(key).dispose()
@@ -13,6 +13,16 @@ DB_CONFIG = {
     'charset': 'utf8mb4'
 }
 
+# 1.1 只读副本配置（可选）- 导出、预览等只读查询发往只读副本，复制延迟过大时自动回退主库
+# DB_CONFIG_READ = {
+#     'host': 'replica-host',
+#     'user': 'your_readonly_username',
+#     'password': 'your_password',
+#     'database': 'excel_import_db',
+#     'port': 3306,
+#     'charset': 'utf8mb4'
+# }
+
 # 2. 多表数据源配置 - 请在此处填入您的真实文件路径
 DATA_SOURCES = {
     'new_customer_orders': {
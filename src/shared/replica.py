@@ -0,0 +1,103 @@
+# replica.py
+# 只读副本路由：导出、预览等只读查询优先发往只读副本，复制延迟过大时回退主库
+# 复制延迟超过阈值、复制线程停止或副本无法连接时使用主库；检查结果缓存 check_interval 秒，
+# 不必每次借连接都查询一次副本状态。
+# 本模块不依赖数据库驱动：延迟由调用方传入的 lag_probe(db_config) 获取（见 db_pool.replica_lag）。
+
+import time
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# SHOW REPLICA STATUS 中的延迟列（MySQL 8.0.22 起为 Source，之前的 SHOW SLAVE STATUS 为 Master）
+LAG_COLUMNS = ('Seconds_Behind_Source', 'Seconds_Behind_Master')
+
+
+def lag_from_status(status: Optional[Dict[str, Any]]) -> Optional[float]:
+    """
+    从 SHOW REPLICA STATUS 的一行结果（字典）中取复制延迟秒数
+
+    Returns:
+        延迟秒数；没有复制状态（不是复制副本，如定期同步的只读实例）视为 0；
+        复制线程未运行（延迟为 NULL）时返回 None
+    """
+    if not status:
+        return 0.0
+    for column in LAG_COLUMNS:
+        if column in status:
+            value = status[column]
+            return None if value is None else float(value)
+    return None
+
+
+class ReplicaRouter:
+    """按复制延迟在只读副本与主库之间选择只读查询使用的数据库配置"""
+
+    def __init__(self, primary: Dict[str, Any], replica: Optional[Dict[str, Any]],
+                 lag_probe: Callable[[Dict[str, Any]], Optional[float]],
+                 max_lag: float = 30, check_interval: float = 10, clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            primary: 主库配置
+            replica: 只读副本配置，为None时始终使用主库
+            lag_probe: 查询副本复制延迟的函数，返回秒数或None（复制未运行），连接失败时抛出异常
+            max_lag: 允许的最大复制延迟（秒）
+            check_interval: 延迟检查结果缓存的秒数
+            clock: 计时函数（测试时替换）
+        """
+        self.primary = primary
+        self.replica = replica
+        self.lag_probe = lag_probe
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.clock = clock
+        # 最近一次检查的延迟（秒），副本不可用时为None
+        self.last_lag: Optional[float] = None
+        self._use_replica: Optional[bool] = None
+        self._checked_at: Optional[float] = None
+        self._reason = ''
+        self._lock = threading.Lock()
+
+    def choose(self) -> Dict[str, Any]:
+        """返回只读查询应使用的数据库配置（超过检查间隔时重新检查副本延迟）"""
+        if not self.replica:
+            return self.primary
+        with self._lock:
+            now = self.clock()
+            if self._checked_at is None or now - self._checked_at >= self.check_interval:
+                self._update(self._check())
+                self._checked_at = now
+            return self.replica if self._use_replica else self.primary
+
+    def using_replica(self) -> bool:
+        """只读查询当前是否使用只读副本"""
+        return bool(self.replica) and self.choose() is self.replica
+
+    def _check(self) -> bool:
+        """检查副本延迟，返回是否可以使用副本（原因写入日志）"""
+        try:
+            lag = self.lag_probe(self.replica)
+        except Exception as e:
+            self.last_lag = None
+            self._reason = f"只读副本无法连接: {e}"
+            return False
+        self.last_lag = lag
+        if lag is None:
+            self._reason = "只读副本复制线程未运行"
+            return False
+        if lag > self.max_lag:
+            self._reason = f"只读副本复制延迟 {lag:g} 秒，超过阈值 {self.max_lag:g} 秒"
+            return False
+        return True
+
+    def _update(self, use_replica: bool):
+        """切换路由时记录日志（状态不变时不重复输出）"""
+        if use_replica == self._use_replica:
+            return
+        if use_replica:
+            logger.info(f"只读查询使用只读副本 {self.replica['host']}（复制延迟 {self.last_lag:g} 秒）")
+        else:
+            logger.warning(f"{self._reason}，只读查询回退到主库")
+        self._use_replica = use_replica
@@ -1,6 +1,9 @@
 # table_schemas.py
 # 集中管理所有表的结构（字段名、类型、主键、索引）
 
+import os
+import json
+
 TABLE_SCHEMAS = {
     'customer_info': {
         'columns': [
@@ -380,11 +383,100 @@ def get_indexes_by_column(table_name, column_name):
     indexes = get_table_indexes(table_name)
     return [index for index in indexes if column_name in index['columns']]
 
-def generate_create_index_sql(table_name, index_info):
+# TEXT列索引前缀长度配置（由 index_manager.py infer-prefix 采样生成）
+INDEX_PREFIX_LENGTHS_FILE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    'config', 'index_prefix_lengths.json'
+)
+DEFAULT_TEXT_PREFIX_LENGTH = 32      # 尚未采样时TEXT列使用的前缀长度
+DEFAULT_PREFIX_SELECTIVITY = 0.95    # 前缀区分度需达到完整值区分度的比例
+
+def is_text_column(table_name, column_name):
+    """判断字段是否为TEXT/BLOB类型（建索引必须指定前缀长度）"""
+    for col, col_type in TABLE_SCHEMAS.get(table_name, {}).get('columns', []):
+        if col == column_name:
+            base_type = col_type.upper().split()[0].split('(')[0]
+            return base_type.endswith('TEXT') or base_type.endswith('BLOB')
+    return False
+
+def load_index_prefix_lengths(table_name=None):
+    """读取已采样的前缀长度配置，返回 {表名: {字段名: 长度}} 或指定表的 {字段名: 长度}"""
+    try:
+        with open(INDEX_PREFIX_LENGTHS_FILE, 'r', encoding='utf-8') as f:
+            all_lengths = json.load(f)
+    except (FileNotFoundError, ValueError):
+        all_lengths = {}
+    if table_name is None:
+        return all_lengths
+    return all_lengths.get(table_name, {})
+
+def save_index_prefix_lengths(table_name, prefix_lengths):
+    """保存指定表的前缀长度配置（与已有配置合并）"""
+    all_lengths = load_index_prefix_lengths()
+    all_lengths.setdefault(table_name, {}).update(prefix_lengths)
+    os.makedirs(os.path.dirname(INDEX_PREFIX_LENGTHS_FILE), exist_ok=True)
+    with open(INDEX_PREFIX_LENGTHS_FILE, 'w', encoding='utf-8') as f:
+        json.dump(all_lengths, f, ensure_ascii=False, indent=2)
+
+def choose_prefix_length(full_distinct, prefix_distincts, target_selectivity=DEFAULT_PREFIX_SELECTIVITY):
+    """
+    选择达到目标区分度的最短前缀长度
+    
+    Args:
+        full_distinct: 完整值的不同值个数
+        prefix_distincts: {前缀长度: 该前缀的不同值个数}
+        target_selectivity: 前缀不同值个数 / 完整值不同值个数 需达到的比例
+    
+    Returns:
+        int: 前缀长度；所有候选都达不到时返回最长的候选
+    """
+    if not prefix_distincts:
+        return DEFAULT_TEXT_PREFIX_LENGTH
+    lengths = sorted(prefix_distincts)
+    if not full_distinct:
+        return lengths[0]
+    for length in lengths:
+        if prefix_distincts[length] / full_distinct >= target_selectivity:
+            return length
+    return lengths[-1]
+
+def resolve_index_prefix_lengths(table_name, index_info, prefix_lengths=None):
+    """
+    确定索引中各字段的前缀长度
+    
+    优先级: 索引配置中的 'prefix_lengths' > 传入的 prefix_lengths > 采样配置文件 > 默认值（仅TEXT列）
+    全文索引不使用前缀。
+    """
+    if index_info['type'] == 'FULLTEXT':
+        return {}
+    sampled = load_index_prefix_lengths(table_name) if prefix_lengths is None else prefix_lengths
+    configured = index_info.get('prefix_lengths', {})
+    resolved = {}
+    for col in index_info['columns']:
+        if col in configured:
+            resolved[col] = configured[col]
+        elif col in sampled:
+            resolved[col] = sampled[col]
+        elif is_text_column(table_name, col):
+            resolved[col] = DEFAULT_TEXT_PREFIX_LENGTH
+    return resolved
+
+def format_index_columns(table_name, index_info, prefix_lengths=None):
+    """生成索引字段列表，字段名加反引号（兼容含空格的字段，如 `spu ID`），TEXT列带前缀长度"""
+    resolved = resolve_index_prefix_lengths(table_name, index_info, prefix_lengths)
+    parts = []
+    for col in index_info['columns']:
+        if col in resolved:
+            parts.append(f"`{col}`({resolved[col]})")
+        else:
+            parts.append(f"`{col}`")
+    return ', '.join(parts)
+
+def generate_create_index_sql(table_name, index_info, prefix_lengths=None):
     """生成创建索引的SQL语句"""
     index_type = index_info['type']
     index_name = index_info['name']
-    columns = ', '.join(index_info['columns'])
+    columns = format_index_columns(table_name, index_info, prefix_lengths)
     
     if index_type == 'UNIQUE':
         return f"CREATE UNIQUE INDEX {index_name} ON {table_name} ({columns});"
@@ -395,6 +487,42 @@ def generate_create_index_sql(table_name, index_info):
     else:
         return f"CREATE INDEX {index_name} ON {table_name} ({columns});"
 
+def generate_add_index_clause(table_name, index_info, prefix_lengths=None):
+    """生成 ALTER TABLE 中的 ADD INDEX 子句"""
+    index_type = index_info['type']
+    columns = format_index_columns(table_name, index_info, prefix_lengths)
+    if index_type in ('UNIQUE', 'FULLTEXT', 'SPATIAL'):
+        return f"ADD {index_type} INDEX {index_info['name']} ({columns})"
+    return f"ADD INDEX {index_info['name']} ({columns})"
+
+def generate_combined_index_sql(table_name, indexes=None, online=True, prefix_lengths=None):
+    """
+    生成一次性创建多个索引的 ALTER TABLE 语句
+    
+    InnoDB 在一条 ALTER 中添加多个二级索引时只扫描一遍聚簇索引，
+    比逐个 CREATE INDEX 少 N-1 次全表扫描。
+    
+    Args:
+        table_name: 表名
+        indexes: 索引配置列表，为None时使用表的全部配置索引
+        online: 是否指定 ALGORITHM=INPLACE 与在线锁级别
+        prefix_lengths: TEXT列前缀长度 {字段名: 长度}，为None时读取采样配置
+    
+    Returns:
+        str: ALTER TABLE 语句；没有索引时返回None
+    """
+    if indexes is None:
+        indexes = get_table_indexes(table_name)
+    if not indexes:
+        return None
+    
+    clauses = [generate_add_index_clause(table_name, index, prefix_lengths) for index in indexes]
+    if online:
+        # 全文/空间索引不支持 LOCK=NONE，只能允许并发读
+        has_special = any(index['type'] in ('FULLTEXT', 'SPATIAL') for index in indexes)
+        clauses.append(f"ALGORITHM=INPLACE, LOCK={'SHARED' if has_special else 'NONE'}")
+    return f"ALTER TABLE {table_name}\n    " + ",\n    ".join(clauses) + ";"
+
 def generate_drop_index_sql(table_name, index_name):
     """生成删除索引的SQL语句"""
     return f"DROP INDEX {index_name} ON {table_name};"
@@ -407,8 +535,130 @@ def get_all_indexes_sql(table_name):
         sql_statements.append(generate_create_index_sql(table_name, index))
     return sql_statements
 
-def validate_index_config(table_name):
-    """验证索引配置的合理性"""
+# 冗余索引检测相关常量（InnoDB估算值）
+INDEX_RECORD_OVERHEAD_BYTES = 5      # 二级索引记录头
+TEXT_INDEX_KEY_BYTES = 767           # 未指定前缀的TEXT列按最大前缀估算
+BTREE_INDEX_TYPES = ('INDEX', 'UNIQUE')
+
+def estimate_column_bytes(column_type):
+    """按字段类型估算其在索引键中占用的最大字节数（utf8mb4）"""
+    col_type = column_type.upper().split()[0] if column_type else ''
+    base_type = col_type.split('(')[0]
+    length = None
+    if '(' in col_type:
+        try:
+            length = int(col_type.split('(')[1].split(',')[0].rstrip(')'))
+        except ValueError:
+            length = None
+    fixed_sizes = {
+        'TINYINT': 1, 'SMALLINT': 2, 'MEDIUMINT': 3, 'INT': 4, 'INTEGER': 4,
+        'BIGINT': 8, 'FLOAT': 4, 'DOUBLE': 8, 'DATE': 3, 'TIME': 3,
+        'DATETIME': 5, 'TIMESTAMP': 4, 'YEAR': 1
+    }
+    if base_type in fixed_sizes:
+        return fixed_sizes[base_type]
+    if base_type == 'DECIMAL':
+        return (length or 10) // 2 + 1
+    if base_type in ('VARCHAR', 'CHAR'):
+        return (length or 255) * 4 + 2
+    if base_type.endswith('TEXT') or base_type.endswith('BLOB'):
+        return TEXT_INDEX_KEY_BYTES
+    return 8
+
+def get_primary_key_columns(table_name):
+    """获取表的主键字段列表"""
+    primary_key = TABLE_SCHEMAS.get(table_name, {}).get('primary_key')
+    if not primary_key:
+        return []
+    if isinstance(primary_key, (list, tuple)):
+        return list(primary_key)
+    return [primary_key]
+
+def estimate_index_entry_bytes(table_name, index_info):
+    """估算一个二级索引在每行写入时新增的索引记录字节数（键 + 主键 + 记录头）"""
+    column_types = {col[0]: col[1] for col in TABLE_SCHEMAS[table_name]['columns']}
+    prefixes = resolve_index_prefix_lengths(table_name, index_info)
+    key_bytes = sum(
+        prefixes[col] * 4 + 2 if col in prefixes else estimate_column_bytes(column_types.get(col, ''))
+        for col in index_info['columns']
+    )
+    pk_bytes = sum(estimate_column_bytes(column_types.get(col, '')) for col in get_primary_key_columns(table_name))
+    return key_bytes + pk_bytes + INDEX_RECORD_OVERHEAD_BYTES
+
+def find_redundant_indexes(table_name):
+    """
+    检测冗余索引
+    
+    检测三类问题：
+        'primary_key' - 索引字段与主键完全相同
+        'duplicate'   - 两个索引字段完全相同（保留UNIQUE或先声明的一个）
+        'prefix'      - 普通索引字段是另一个索引的最左前缀
+    
+    Returns:
+        List[Dict]: 每个冗余索引的检测结果，包含 index、kind、covered_by、
+                    entry_bytes（每行额外写入字节）、extra_writes（每行额外B+树写入次数）、message
+    """
+    if table_name not in TABLE_SCHEMAS:
+        return []
+    
+    indexes = [idx for idx in get_table_indexes(table_name) if idx['type'] in BTREE_INDEX_TYPES]
+    pk_columns = get_primary_key_columns(table_name)
+    findings = []
+    
+    for i, index in enumerate(indexes):
+        columns = index['columns']
+        is_unique = index['type'] == 'UNIQUE'
+        kind = None
+        covered_by = None
+        
+        if pk_columns and columns == pk_columns:
+            kind, covered_by = 'primary_key', 'PRIMARY'
+        else:
+            longest_cover = 0
+            for j, other in enumerate(indexes):
+                if i == j:
+                    continue
+                other_columns = other['columns']
+                other_unique = other['type'] == 'UNIQUE'
+                if columns == other_columns:
+                    # 字段相同时保留UNIQUE；类型相同时保留先声明的索引
+                    if (other_unique and not is_unique) or (other_unique == is_unique and j < i):
+                        kind, covered_by = 'duplicate', other['name']
+                        break
+                elif (not is_unique and len(other_columns) > max(len(columns), longest_cover)
+                        and other_columns[:len(columns)] == columns):
+                    # 前缀冗余时指向最长的覆盖索引，避免指向本身也冗余的索引
+                    kind, covered_by = 'prefix', other['name']
+                    longest_cover = len(other_columns)
+        
+        if kind is None:
+            continue
+        
+        entry_bytes = estimate_index_entry_bytes(table_name, index)
+        messages = {
+            'primary_key': f"索引 {index['name']} 与主键 ({', '.join(pk_columns)}) 重复",
+            'duplicate': f"索引 {index['name']} 与 {covered_by} 字段完全相同",
+            'prefix': f"索引 {index['name']} 是 {covered_by} 的最左前缀，可由其覆盖"
+        }
+        findings.append({
+            'index': index['name'],
+            'kind': kind,
+            'covered_by': covered_by,
+            'entry_bytes': entry_bytes,
+            # 唯一索引每次写入还需要一次唯一性检查读，且无法使用change buffer
+            'extra_writes': 2 if is_unique else 1,
+            'message': f"{messages[kind]}，每行额外写入约 {entry_bytes} 字节"
+        })
+    
+    return findings
+
+def validate_index_config(table_name, check_redundancy=False):
+    """验证索引配置的合理性
+    
+    Args:
+        table_name: 表名
+        check_redundancy: 是否将冗余索引（重复、前缀冗余、重复主键）也视为错误
+    """
     if table_name not in TABLE_SCHEMAS:
         return False, f"表 {table_name} 不存在"
     
@@ -429,4 +679,7 @@ def validate_index_config(table_name):
         if index_names.count(index['name']) > 1:
             errors.append(f"索引名称 {index['name']} 重复")
     
+    if check_redundancy:
+        errors.extend(finding['message'] for finding in find_redundant_indexes(table_name))
+    
     return len(errors) == 0, errors 
\ No newline at end of file
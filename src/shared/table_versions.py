@@ -0,0 +1,58 @@
+# table_versions.py
+# 记录每张表的数据版本戳：导入程序每次写表都会更新版本戳，查询结果缓存据此判断是否失效
+# 每张表一个版本戳文件，整文件原子替换：导入、批量导出、定时任务等多个进程同时更新不同表时互不覆盖
+import os
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# 版本戳目录，每张表一个文件
+TABLE_VERSIONS_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    'data', 'table_versions'
+)
+
+
+def _version_path(table_name):
+    safe_name = "".join(ch if ch.isalnum() or ch in '-_.' else '_' for ch in table_name.lower())
+    return os.path.join(TABLE_VERSIONS_DIR, f"{safe_name}.version")
+
+
+def load_table_version(table_name):
+    """读取一张表的版本戳；从未被导入程序写过的表返回 0"""
+    try:
+        with open(_version_path(table_name), 'r', encoding='utf-8') as f:
+            return int(f.read().strip())
+    except (FileNotFoundError, ValueError):
+        return 0
+
+
+def get_table_versions(table_names):
+    """
+    获取指定表的版本戳
+
+    从未被导入程序写过的表版本戳为 0。
+    """
+    return {name: load_table_version(name) for name in sorted(set(table_names))}
+
+
+def bump_table_version(table_name):
+    """
+    更新表的版本戳（表数据发生变化后调用）
+
+    版本戳取当前纳秒时间，多个进程同时更新同一张表时也不会回到旧值。
+    先写临时文件再替换，读取方不会读到半个文件。
+    版本戳更新失败不影响导入，只记录警告。
+    """
+    try:
+        path = _version_path(table_name)
+        version = max(time.time_ns(), load_table_version(table_name) + 1)
+        os.makedirs(TABLE_VERSIONS_DIR, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(str(version))
+        os.replace(tmp_path, path)
+    except Exception as e:
+        logger.warning(f"表版本戳更新失败（查询缓存可能返回旧数据）: {e}")
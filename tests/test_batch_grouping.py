@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试批量导出中相同查询的任务合并：查询只执行一次，结果写入每个任务的输出
+"""
+
+import os
+import sys
+import csv
+import tempfile
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.scripts import batch_export
+
+ROWS = [(1, '北京'), (2, '上海')]
+
+
+def fake_build_query(query_name, **params):
+    return f"SELECT * FROM {query_name} WHERE city = '{params.get('city', '')}'"
+
+
+class FakeExporter:
+    """记录执行的查询，把固定结果写入写入器"""
+
+    def __init__(self):
+        self.queries = []
+        self.last_row_count = None
+
+    def export_to_writer(self, sql, writer, timeout=None, shard_key=None, shards=1):
+        self.queries.append(sql)
+        writer.open(['客户id', '城市'])
+        writer.write_rows(ROWS)
+        writer.close()
+        self.last_row_count = len(ROWS)
+        return len(ROWS)
+
+
+def _job(output_filename, city, fmt='csv', **extra):
+    return dict({'query_name': 'orders', 'params': {'city': city}, 'format': fmt,
+                 'output_filename': output_filename, 'preflight': False}, **extra)
+
+
+def _patched(check):
+    original = batch_export.build_query, batch_export.get_query_timeout
+    batch_export.build_query = fake_build_query
+    batch_export.get_query_timeout = lambda query_name: None
+    try:
+        check()
+    finally:
+        batch_export.build_query, batch_export.get_query_timeout = original
+
+
+def test_group_identical_jobs():
+    """查询名与参数相同的任务合并，参数、超时不同或增量任务不合并"""
+    def check():
+        configs = [
+            _job('a.csv', '北京'),
+            _job('b.csv', '上海'),
+            _job('c.csv.gz', '北京', fmt='csv.gz'),
+            _job('d.csv', '北京', timeout=30),
+            _job('e.csv', '北京', incremental={'column': 'id'}),
+        ]
+        groups = batch_export._group_export_jobs(configs)
+        assert [[index for index, _ in group] for group in groups] == [[1, 3], [2], [4], [5]]
+    _patched(check)
+
+
+def test_group_runs_query_once():
+    """合并的任务只执行一次查询，每个任务的输出都写入完整结果"""
+    def check():
+        exporter = FakeExporter()
+        with tempfile.TemporaryDirectory() as temp_dir:
+            jobs = [(1, _job('a.csv', '北京')), (3, _job('c.csv', '北京', sheet_name='另一个'))]
+            results = batch_export._run_job_group(exporter, jobs, temp_dir, False, 3)
+            assert results == [True, True]
+            assert exporter.queries == [fake_build_query('orders', city='北京')]
+            for name in ('a.csv', 'c.csv'):
+                with open(os.path.join(temp_dir, name), 'r', encoding='utf-8-sig', newline='') as f:
+                    assert list(csv.reader(f)) == [['客户id', '城市'], ['1', '北京'], ['2', '上海']]
+    _patched(check)
+
+
+if __name__ == "__main__":
+    test_group_identical_jobs()
+    test_group_runs_query_once()
+    print("✅ 批量导出任务合并测试通过")
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试字段画像与类型推荐
+"""
+
+import os
+import sys
+import pandas as pd
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.importers.column_profiler import (
+    DATE_SAMPLE_SIZE, ColumnProfile, profile_dataframe, propose_column_type
+)
+
+
+def _profile(values):
+    profile = ColumnProfile()
+    profile.update(pd.Series(values, dtype=object))
+    return profile
+
+
+def test_profile_statistics():
+    """统计最大长度、空值率、基数与数值范围"""
+    profile = _profile(['10', '200', None, '-', '3000'])
+    assert profile.count == 5
+    assert profile.nulls == 2
+    assert profile.max_length == 4
+    assert profile.cardinality == 3
+    assert (profile.numeric_min, profile.numeric_max) == (10, 3000)
+
+
+def test_profile_accumulates_and_roundtrips():
+    """多次导入累积，序列化后可恢复"""
+    profiles = profile_dataframe({}, pd.DataFrame({'城市': ['北京', '上海']}))
+    profiles = profile_dataframe(profiles, pd.DataFrame({'城市': ['上海', '广州市']}))
+    restored = ColumnProfile.from_dict(profiles['城市'].to_dict())
+    assert restored.count == 4
+    assert restored.cardinality == 3
+    assert restored.max_length == 3
+
+
+def test_integer_dates_become_date():
+    """YYYYMMDD 形式的BIGINT推荐为DATE"""
+    profile = _profile([str(20250601 + i % 28) for i in range(2000)])
+    proposed, _ = propose_column_type('BIGINT', profile)
+    assert proposed == 'DATE'
+
+
+def test_text_dates_sampled():
+    """日期字符串只解析抽样；出现非日期值后后续数据块不再做日期检测"""
+    dates = [f"2025-{1 + i % 12:02d}-{1 + i % 28:02d}" for i in range(20000)]
+    profile = _profile(dates)
+    assert profile.date_checked == DATE_SAMPLE_SIZE
+    proposed, _ = propose_column_type('TEXT', profile)
+    assert proposed == 'DATE'
+
+    profile = _profile(['2025-06-01', '备注'] * 1000)
+    checked = profile.date_checked
+    profile.update(pd.Series(dates, dtype=object))
+    assert profile.date_checked == checked
+    assert propose_column_type('TEXT', profile)[0] != 'DATE'
+
+
+def test_chunk_profiles_merge():
+    """各数据块分别画像后合并，与整体画像一致；旧版画像按全部值做过日期检测处理"""
+    chunks = [pd.DataFrame({'编号': [str(i) for i in range(start, start + 500)],
+                            '日期': [str(20250601 + i % 28) for i in range(500)]}) for start in (0, 500)]
+    merged = profile_dataframe({}, chunks[0])
+    for column, profile in profile_dataframe({}, chunks[1]).items():
+        merged[column].merge(profile)
+    whole = profile_dataframe({}, pd.concat(chunks))
+    for column in whole:
+        assert merged[column].to_dict() == whole[column].to_dict()
+
+    legacy = whole['日期'].to_dict()
+    del legacy['date_checked']
+    assert ColumnProfile.from_dict(legacy).date_checked == 1000
+
+
+def test_small_integers_shrink():
+    """取值范围小的整数推荐更小的整数类型"""
+    profile = _profile([str(i % 200) for i in range(2000)])
+    proposed, _ = propose_column_type('BIGINT', profile)
+    assert proposed == 'TINYINT UNSIGNED'
+
+
+def test_text_becomes_enum_or_varchar():
+    """低基数TEXT推荐ENUM，高基数按最大长度推荐VARCHAR"""
+    profile = _profile(['普通', '重点'] * 1000)
+    proposed, _ = propose_column_type('TEXT', profile)
+    assert proposed == "ENUM('普通', '重点')"
+    profile = _profile([f"客户{i}" for i in range(2000)])
+    proposed, _ = propose_column_type('TEXT', profile)
+    assert proposed == 'VARCHAR(16)'
+
+
+def test_small_sample_no_proposal():
+    """样本不足时不推荐"""
+    proposed, _ = propose_column_type('TEXT', _profile(['a', 'b']))
+    assert proposed is None
+
+
+if __name__ == "__main__":
+    test_profile_statistics()
+    test_profile_accumulates_and_roundtrips()
+    test_integer_dates_become_date()
+    test_text_dates_sampled()
+    test_chunk_profiles_merge()
+    test_small_integers_shrink()
+    test_text_becomes_enum_or_varchar()
+    test_small_sample_no_proposal()
+    print("✅ 字段画像测试通过")
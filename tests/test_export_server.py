@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试导出服务的 HTTP 层与客户端调用
+"""
+
+import os
+import sys
+import stat
+import tempfile
+import urllib.error
+import urllib.request
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.exporters import export_server
+from src.exporters.export_server import (
+    TOKEN_HEADER, ServiceError, call_server, create_server, read_token_file, remove_token_file,
+    start_server_thread, write_token_file
+)
+
+
+class FakeService:
+    """按路径返回固定结果，记录收到的请求"""
+
+    def __init__(self):
+        self.requests = []
+
+    def handle(self, method, path, payload):
+        self.requests.append((method, path, payload))
+        if path == '/health':
+            return {'ok': True, 'queries': 3}
+        if path == '/export':
+            if not payload.get('query'):
+                raise ServiceError("缺少查询名称 query")
+            return {'ok': True, 'rows': 2, 'outputs': [f"/tmp/{payload['query']}.xlsx"]}
+        if path == '/boom':
+            raise RuntimeError("内部错误")
+        raise ServiceError(f"未知接口: {method} {path}", 404)
+
+
+def run_with_server(check):
+    service = FakeService()
+    server = create_server(service, port=0)
+    start_server_thread(server)
+    try:
+        check(service, server.server_address[1], server.token)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_round_trip():
+    """GET 无请求体，POST 传 JSON（中文不转义）"""
+    def check(service, port, token):
+        assert call_server('/health', port=port, token=token) == {'ok': True, 'queries': 3}
+        result = call_server('/export', {'query': '客户', 'params': {'city': '北京'}}, port=port, token=token)
+        assert result == {'ok': True, 'rows': 2, 'outputs': ['/tmp/客户.xlsx']}
+        assert service.requests == [('GET', '/health', {}),
+                                    ('POST', '/export', {'query': '客户', 'params': {'city': '北京'}})]
+    run_with_server(check)
+
+
+def test_errors():
+    """服务返回的错误带状态码，客户端抛出 ServiceError"""
+    def check(service, port, token):
+        for path, payload, status in (('/export', {}, 400), ('/nope', None, 404), ('/boom', {}, 500)):
+            try:
+                call_server(path, payload, port=port, token=token)
+                assert False, "应当报错"
+            except ServiceError as e:
+                assert e.status == status
+    run_with_server(check)
+
+
+def test_rejects_requests_without_token_or_json():
+    """没有正确令牌的请求返回403，不是 application/json 的 POST（如浏览器 no-cors 请求）返回415，都不交给服务处理"""
+    def check(service, port, token):
+        for wrong_token in ('', 'wrong'):
+            try:
+                call_server('/export', {'query': '客户'}, port=port, token=wrong_token or None)
+                assert False, "应当报错"
+            except ServiceError as e:
+                assert e.status == 403
+        request = urllib.request.Request(f"http://127.0.0.1:{port}/export", data=b'{"query": "x"}', method='POST',
+                                         headers={'Content-Type': 'text/plain', TOKEN_HEADER: token})
+        try:
+            urllib.request.urlopen(request, timeout=5)
+            assert False, "应当报错"
+        except urllib.error.HTTPError as e:
+            assert e.code == 415
+        assert service.requests == []
+    run_with_server(check)
+
+
+def test_token_file():
+    """令牌文件只有当前用户可读写，客户端未传令牌时从文件读取"""
+    original_dir = export_server.TOKEN_DIR
+    with tempfile.TemporaryDirectory() as temp_dir:
+        export_server.TOKEN_DIR = os.path.join(temp_dir, 'tokens')
+        try:
+            service = FakeService()
+            server = create_server(service, port=0)
+            port = server.server_address[1]
+            start_server_thread(server)
+            try:
+                assert read_token_file(port) is None
+                path = write_token_file(port, server.token)
+                if os.name == 'posix':
+                    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+                assert read_token_file(port) == server.token
+                assert call_server('/health', port=port) == {'ok': True, 'queries': 3}
+                remove_token_file(port)
+                assert read_token_file(port) is None
+            finally:
+                server.shutdown()
+                server.server_close()
+        finally:
+            export_server.TOKEN_DIR = original_dir
+
+
+def test_server_not_running():
+    """服务未启动时抛出 ConnectionError"""
+    server = create_server(FakeService(), port=0)
+    port = server.server_address[1]
+    server.server_close()
+    try:
+        call_server('/health', port=port, timeout=2)
+        assert False, "应当报错"
+    except ConnectionError:
+        pass
+
+
+if __name__ == "__main__":
+    test_round_trip()
+    test_errors()
+    test_rejects_requests_without_token_or_json()
+    test_token_file()
+    test_server_not_running()
+    print("✅ 导出服务测试通过")
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试导入连接池按实际消费者线程数创建：导入模块时不创建连接池
+"""
+
+import os
+import sys
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.shared import db_pool
+from src.importers import db_importer
+from src.importers.main_importer import ConcurrentExcelImporter
+
+
+def _import_engines():
+    return [engine for (pid, role, _), engine in db_pool._engines.items() if pid == os.getpid() and role == 'import']
+
+
+def test_pool_sized_by_consumers():
+    """导入模块后还没有导入连接池；按消费者线程数配置后创建的连接池大小与之一致"""
+    assert _import_engines() == []
+    importer = ConcurrentExcelImporter(max_producers=1, max_consumers=12)
+    try:
+        engine = db_importer.engine
+        assert _import_engines() == [engine]
+        assert engine.pool.size() == db_pool.pool_size_for('import')
+    finally:
+        importer.producer_executor.shutdown()
+        importer.consumer_executor.shutdown()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    test_pool_sized_by_consumers()
+    print("✅ 导入连接池测试通过")
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试冗余索引检测
+"""
+
+import os
+import sys
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.shared.table_schemas import find_redundant_indexes, validate_index_config, estimate_column_bytes
+
+
+def _findings_by_index(table_name):
+    return {item['index']: item for item in find_redundant_indexes(table_name)}
+
+
+def test_primary_key_repeats():
+    """重复主键的索引应被检测"""
+    findings = _findings_by_index('customer_info')
+    assert findings['idx_customer_id']['kind'] == 'primary_key'
+    assert findings['uk_customer_id']['kind'] == 'primary_key'
+    assert _findings_by_index('visit_record')['uk_visit_id']['covered_by'] == 'PRIMARY'
+
+
+def test_duplicate_keeps_unique():
+    """字段相同的索引中保留唯一索引"""
+    findings = _findings_by_index('last_7_days_customer_info')
+    assert findings['idx_customer_date']['kind'] == 'duplicate'
+    assert findings['idx_customer_date']['covered_by'] == 'uk_customer_date'
+    assert 'uk_customer_date' not in findings
+
+
+def test_prefix_points_to_longest_cover():
+    """前缀冗余索引指向最长的覆盖索引"""
+    findings = _findings_by_index('new_customer_orders')
+    assert findings['idx_customer_id']['kind'] == 'prefix'
+    assert findings['idx_customer_id']['covered_by'] == 'idx_customer_date_kind4'
+    # 复合索引的最左列不是被检测索引时不算冗余
+    assert 'idx_order_date' not in findings
+
+
+def test_write_cost_estimate():
+    """每行写入字节估算包含键、主键和记录头"""
+    assert estimate_column_bytes('BIGINT') == 8
+    assert estimate_column_bytes('VARCHAR(50) NOT NULL') == 202
+    finding = _findings_by_index('new_customer_orders')['idx_bd_id']
+    assert finding['entry_bytes'] == 8 + 8 + 5
+    assert finding['extra_writes'] == 1
+
+
+def test_validate_with_redundancy():
+    """开启冗余检查后验证失败"""
+    is_valid, _ = validate_index_config('visit_record')
+    assert is_valid
+    is_valid, errors = validate_index_config('visit_record', check_redundancy=True)
+    assert not is_valid
+    assert any('uk_visit_id' in error for error in errors)
+
+
+if __name__ == "__main__":
+    test_primary_key_repeats()
+    test_duplicate_keeps_unique()
+    test_prefix_points_to_longest_cover()
+    test_write_cost_estimate()
+    test_validate_with_redundancy()
+    print("✅ 冗余索引检测测试通过")
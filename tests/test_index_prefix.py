@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试TEXT字段索引前缀长度
+"""
+
+import os
+import sys
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.shared.table_schemas import (
+    choose_prefix_length,
+    generate_create_index_sql,
+    generate_combined_index_sql,
+    get_index_by_name,
+    DEFAULT_TEXT_PREFIX_LENGTH
+)
+
+
+def test_choose_shortest_prefix():
+    """选择达到目标区分度的最短前缀"""
+    prefix_distincts = {4: 50, 8: 90, 16: 97, 32: 100}
+    assert choose_prefix_length(100, prefix_distincts, 0.95) == 16
+    assert choose_prefix_length(100, prefix_distincts, 0.9) == 8
+    # 达不到目标时取最长候选
+    assert choose_prefix_length(200, prefix_distincts, 0.95) == 32
+
+
+def test_text_columns_get_prefix():
+    """TEXT字段自动带前缀，数值字段不带"""
+    index = get_index_by_name('new_customer_orders', 'idx_city_date')
+    sql = generate_create_index_sql('new_customer_orders', index, prefix_lengths={'管理城市': 12})
+    assert sql == "CREATE INDEX idx_city_date ON new_customer_orders (`管理城市`(12), `日期`);"
+    sql = generate_create_index_sql('new_customer_orders', index, prefix_lengths={})
+    assert f"`管理城市`({DEFAULT_TEXT_PREFIX_LENGTH})" in sql
+
+
+def test_configured_prefix_wins():
+    """索引配置中的前缀长度优先于采样结果"""
+    index = dict(get_index_by_name('new_customer_orders', 'idx_brand'), prefix_lengths={'品牌': 10})
+    sql = generate_combined_index_sql('new_customer_orders', [index], prefix_lengths={'品牌': 40})
+    assert "ADD INDEX idx_brand (`品牌`(10))" in sql
+    assert sql.endswith("ALGORITHM=INPLACE, LOCK=NONE;")
+
+
+if __name__ == "__main__":
+    test_choose_shortest_prefix()
+    test_text_columns_get_prefix()
+    test_configured_prefix_wins()
+    print("✅ 索引前缀长度测试通过")
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试索引使用统计分析与只写不读索引删除脚本
+"""
+
+import os
+import sys
+import tempfile
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.scripts.index_manager import IndexManager
+
+TABLE = 'customer_info'
+
+
+class FakeCursor:
+    """按SQL返回预设结果：索引使用统计行与服务器运行时长"""
+
+    def __init__(self, usage_rows):
+        self.usage_rows = usage_rows
+        self.last_sql = ''
+
+    def execute(self, sql, params=None):
+        self.last_sql = sql
+
+    def fetchall(self):
+        if 'table_io_waits_summary_by_index_usage' in self.last_sql:
+            return self.usage_rows
+        return []
+
+    def fetchone(self):
+        if 'Uptime' in self.last_sql:
+            return ('Uptime', 7200)
+        return None
+
+
+def _manager(usage_rows):
+    manager = IndexManager()
+    manager.cursor = FakeCursor(usage_rows)
+    return manager
+
+
+def test_empty_usage_reports_nothing():
+    """performance_schema 没有统计行时不判断索引使用，也不生成删除脚本"""
+    manager = _manager([])
+    result = manager.analyze_index_usage(TABLE)
+    assert result['source'] is None
+    assert result['indexes'] == [] and result['write_only'] == []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        assert manager.generate_unused_drop_script([result], temp_dir) is None
+        assert os.listdir(temp_dir) == []
+
+
+def test_write_only_indexes_dropped():
+    """有写入但从未读取的索引列入删除脚本，唯一索引只以注释给出"""
+    rows = [
+        (None, 0, 500, 0),
+        ('PRIMARY', 80, 500, 80),
+        ('idx_customer_id', 120, 500, 120),
+        ('idx_first_order_time', 0, 500, 0),
+        ('uk_customer_id', 0, 500, 0),
+    ]
+    manager = _manager(rows)
+    result = manager.analyze_index_usage(TABLE)
+    assert result['source'] == 'performance_schema'
+    assert result['table_writes'] == 2500
+    status = {index['name']: index['status'] for index in result['indexes']}
+    assert status['idx_customer_id'] == 'used'
+    assert status['idx_first_order_time'] == 'write_only'
+    assert status['idx_customer_source'] == 'missing'
+    assert status['PRIMARY'] == 'primary'
+    assert result['write_only'] == ['idx_first_order_time', 'uk_customer_id']
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = manager.generate_unused_drop_script([result], temp_dir)
+        with open(path, 'r', encoding='utf-8') as f:
+            lines = f.read().splitlines()
+    assert f"DROP INDEX idx_first_order_time ON {TABLE};" in lines
+    assert f"-- 唯一索引承担数据约束，确认后再删除: DROP INDEX uk_customer_id ON {TABLE};" in lines
+    assert not any(line.startswith('DROP INDEX idx_customer_id') for line in lines)
+    assert any('2.0 小时' in line for line in lines)
+
+
+if __name__ == "__main__":
+    test_empty_usage_reports_nothing()
+    test_write_only_indexes_dropped()
+    print("✅ 索引使用统计测试通过")
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试并行流式多表导出：各工作表的查询同时读取，排在后面的工作表不等待前面的写出
+"""
+
+import os
+import sys
+import time
+import tempfile
+
+from openpyxl import load_workbook
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.exporters.db_to_excel_exporter import DatabaseToExcelExporter
+
+
+class FakeStream:
+    """模拟服务端游标：每批读取耗时 delay 秒，记录读到结尾的时间"""
+
+    def __init__(self, start, count, delay=0.0):
+        self.batches = iter([[(start + i,)] for i in range(count)])
+        self.delay = delay
+        self.exhausted_at = None
+        self.cancelled = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        time.sleep(self.delay)
+        try:
+            return next(self.batches)
+        except StopIteration:
+            self.exhausted_at = time.perf_counter()
+            raise
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class FakeExporter(DatabaseToExcelExporter):
+    """按SQL返回预先准备的流，不连接数据库"""
+
+    def __init__(self, streams):
+        super().__init__(db_config={})
+        self.streams = streams
+
+    def stream_query(self, sql, batch_size=1000, connection=None, timeout=None, acquire_slot=True):
+        stream = self.streams[sql]
+        if isinstance(stream, Exception):
+            raise stream
+        return ['值'], stream
+
+
+def test_later_sheets_read_while_first_is_written():
+    """第一个工作表慢慢读写时，第二个工作表的查询照样读到结尾，输出顺序不变"""
+    first, second = FakeStream(0, 5, delay=0.05), FakeStream(100, 50)
+    exporter = FakeExporter({'q1': first, 'q2': second})
+    with tempfile.TemporaryDirectory() as temp_dir:
+        output_path = os.path.join(temp_dir, 'multi.xlsx')
+        assert exporter._export_multiple_streaming({'表1': 'q1', '表2': 'q2'}, output_path, 1,
+                                                   connections=[object(), object()])
+        assert second.exhausted_at < first.exhausted_at
+        workbook = load_workbook(output_path, read_only=True)
+        assert [row[0] for row in workbook['表1'].iter_rows(min_row=2, values_only=True)] == list(range(5))
+        assert [row[0] for row in workbook['表2'].iter_rows(min_row=2, values_only=True)] == list(range(100, 150))
+        workbook.close()
+
+
+def test_failed_start_cancels_other_sheets():
+    """任一工作表的查询开始失败时，取消已开始的查询，不留下输出文件"""
+    first = FakeStream(0, 1000, delay=0.001)
+    exporter = FakeExporter({'q1': first, 'q2': RuntimeError("查询失败")})
+    with tempfile.TemporaryDirectory() as temp_dir:
+        output_path = os.path.join(temp_dir, 'multi.xlsx')
+        try:
+            exporter._export_multiple_streaming({'表1': 'q1', '表2': 'q2'}, output_path, 1,
+                                                connections=[object(), object()])
+            assert False, "应当抛出异常"
+        except RuntimeError:
+            pass
+        assert first.cancelled
+        assert not os.path.exists(output_path)
+
+
+if __name__ == "__main__":
+    test_later_sheets_read_while_first_is_written()
+    test_failed_start_cancels_other_sheets()
+    print("✅ 并行流式多表导出测试通过")
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试读取/写入流水线（预取线程 + 有界队列，以及暂存到临时文件的不限长度预取）
+"""
+
+import os
+import sys
+import time
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.exporters.pipeline import PrefetchedBatches, SpooledBatches
+
+
+class FakeBatches:
+    """模拟 _StreamBatches：每批读取耗时 delay 秒，可在第 fail_at 批出错"""
+
+    def __init__(self, count, delay=0.0, fail_at=None):
+        self.count = count
+        self.delay = delay
+        self.fail_at = fail_at
+        self.fetched = 0
+        self.cancelled = False
+        self.interrupted = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.interrupted or self.fetched >= self.count:
+            raise StopIteration
+        time.sleep(self.delay)
+        self.fetched += 1
+        if self.fetched == self.fail_at:
+            raise RuntimeError("读取失败")
+        return [(self.fetched,)]
+
+    def interrupt(self):
+        self.interrupted = True
+
+    def cancel(self):
+        self.cancelled = True
+
+
+def test_batches_in_order():
+    """预取后批次顺序不变"""
+    batches = PrefetchedBatches(FakeBatches(20), depth=2)
+    assert [rows[0][0] for rows in batches] == list(range(1, 21))
+
+
+def test_overlap():
+    """读取与写入重叠：总耗时接近较慢的一方"""
+    count, delay = 10, 0.05
+    start = time.perf_counter()
+    for _ in PrefetchedBatches(FakeBatches(count, delay=delay)):
+        time.sleep(delay)
+    elapsed = time.perf_counter() - start
+    assert elapsed < count * delay * 2 * 0.8
+
+
+def test_error_propagates():
+    """读取线程中的异常在主线程抛出"""
+    batches = PrefetchedBatches(FakeBatches(10, fail_at=3))
+    received = []
+    try:
+        for rows in batches:
+            received.append(rows)
+        assert False, "应当抛出异常"
+    except RuntimeError:
+        pass
+    assert len(received) == 2
+
+
+def test_cancel_stops_fetching():
+    """取消时中断读取并取消底层查询"""
+    inner = FakeBatches(1000, delay=0.01)
+    batches = PrefetchedBatches(inner, depth=2)
+    next(batches)
+    batches.cancel()
+    assert inner.cancelled and inner.interrupted
+    assert inner.fetched < 1000
+    assert list(batches) == []
+
+
+def test_spooled_reads_ahead_without_waiting():
+    """SpooledBatches 不等待消费，超出内存上限的批次写入临时文件后按顺序取出"""
+    inner = FakeBatches(30)
+    batches = SpooledBatches(inner, memory_batches=5)
+    batches._thread.join(5)
+    assert inner.fetched == 30
+    assert batches.spilled_batches == 25
+    assert [rows[0][0] for rows in batches] == list(range(1, 31))
+    assert batches._spool is None
+
+    batches = SpooledBatches(FakeBatches(10, fail_at=8), memory_batches=2)
+    received = []
+    try:
+        for rows in batches:
+            received.append(rows)
+        assert False, "应当抛出异常"
+    except RuntimeError:
+        pass
+    assert len(received) == 7
+
+
+def test_spooled_cancel_removes_spool():
+    """取消时中断读取、取消底层查询并删除临时文件"""
+    inner = FakeBatches(1000, delay=0.001)
+    batches = SpooledBatches(inner, memory_batches=1)
+    next(batches)
+    time.sleep(0.05)
+    batches.cancel()
+    assert inner.cancelled and inner.interrupted
+    assert batches._spool is None
+    assert list(batches) == []
+
+
+if __name__ == "__main__":
+    test_batches_in_order()
+    test_overlap()
+    test_error_propagates()
+    test_cancel_stops_fetching()
+    test_spooled_reads_ahead_without_waiting()
+    test_spooled_cancel_removes_spool()
+    print("✅ 流水线测试通过")
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试导出前 EXPLAIN 预检的估算与阈值判断
+"""
+
+import os
+import sys
+import tempfile
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.exporters.preflight import (
+    parse_size, estimate_plan, evaluate_estimate, record_preflight, load_preflight_history
+)
+
+# 两表连接：订单表全表扫描，客户表按主键查找
+JOIN_PLAN = {
+    'query_block': {
+        'select_id': 1,
+        'cost_info': {'query_cost': '1234567.80'},
+        'ordering_operation': {
+            'using_filesort': True,
+            'nested_loop': [
+                {'table': {
+                    'table_name': 'o',
+                    'access_type': 'ALL',
+                    'rows_examined_per_scan': 3000000,
+                    'rows_produced_per_join': 300000,
+                    'cost_info': {'data_read_per_join': '1G'},
+                }},
+                {'table': {
+                    'table_name': 'c',
+                    'access_type': 'eq_ref',
+                    'rows_examined_per_scan': 1,
+                    'rows_produced_per_join': 300000,
+                    'cost_info': {'data_read_per_join': '24M'},
+                }},
+            ],
+        },
+    }
+}
+
+
+def test_parse_size():
+    """解析 EXPLAIN 中的数据量单位"""
+    assert parse_size('512') == 512
+    assert parse_size('24K') == 24 * 1024
+    assert parse_size('1.5G') == int(1.5 * 1024 ** 3)
+    assert parse_size(None) == 0
+
+
+def test_estimate_join_plan():
+    """嵌套循环连接：后面的表按前面产生的行数重复扫描"""
+    estimate = estimate_plan(JOIN_PLAN)
+    assert estimate['rows_examined'] == 3000000 + 300000
+    assert estimate['result_rows'] == 300000
+    assert estimate['bytes_read'] == 1024 ** 3 + 24 * 1024 ** 2
+    assert estimate['query_cost'] == 1234567.8
+    assert [scan['table'] for scan in estimate['full_scans']] == ['o']
+
+
+def test_estimate_union_and_subquery():
+    """UNION 各分支的结果行数相加，物化子查询计入扫描行数"""
+    plan = {'query_block': {'union_result': {'query_specifications': [
+        {'query_block': {'table': {'table_name': 'a', 'access_type': 'ref',
+                                   'rows_examined_per_scan': 10, 'rows_produced_per_join': 10}}},
+        {'query_block': {'table': {
+            'table_name': 't', 'access_type': 'ALL',
+            'rows_examined_per_scan': 5, 'rows_produced_per_join': 5,
+            'materialized_from_subquery': {'query_block': {'table': {
+                'table_name': 'b', 'access_type': 'range',
+                'rows_examined_per_scan': 100, 'rows_produced_per_join': 5}}},
+        }}},
+    ]}}}
+    estimate = estimate_plan(plan)
+    assert estimate['result_rows'] == 15
+    assert estimate['rows_examined'] == 10 + 100 + 5
+
+
+def test_evaluate_thresholds():
+    """按阈值给出 ok / confirm / refuse"""
+    estimate = estimate_plan(JOIN_PLAN)
+    verdict, reasons = evaluate_estimate(estimate)
+    assert verdict == 'confirm'
+    assert any('全表扫描' in reason for reason in reasons)
+
+    verdict, _ = evaluate_estimate(estimate, {'full_scan_rows': 10 ** 9})
+    assert verdict == 'ok'
+    verdict, _ = evaluate_estimate(estimate, {'refuse_rows_examined': 1000})
+    assert verdict == 'refuse'
+
+
+def test_record_history():
+    """记录估算值与实际值"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        history_file = os.path.join(temp_dir, 'history.jsonl')
+        result = estimate_plan(JOIN_PLAN)
+        result.update(verdict='confirm', label='get_all_orders', sql_hash='abc')
+        record_preflight(result, actual_rows=280000, elapsed_seconds=12.3456, history_file=history_file)
+        records = load_preflight_history(history_file)
+        assert len(records) == 1
+        assert records[0]['estimated_result_rows'] == 300000
+        assert records[0]['actual_rows'] == 280000
+        assert records[0]['elapsed_seconds'] == 12.346
+
+
+if __name__ == "__main__":
+    test_parse_size()
+    test_estimate_join_plan()
+    test_estimate_union_and_subquery()
+    test_evaluate_thresholds()
+    test_record_history()
+    print("✅ 预检测试通过")
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试查询超时配置
+"""
+
+import os
+import sys
+import tempfile
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.exporters.sql_manager import SQLQueryManager
+from src.exporters.query_guard import is_timeout_error
+
+SQL_CONTENT = """-- 订单查询
+
+-- 使用: heavy_query
+
+-- 全部订单明细
+-- 超时: 300
+SELECT * FROM new_customer_orders;
+
+-- 使用: plain_query
+SELECT 1;
+-- 超时: 5
+"""
+
+
+def test_query_timeout_metadata():
+    """查询头部的 "-- 超时:" 注释解析为超时秒数，正文之后的注释不算"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        with open(os.path.join(temp_dir, 'orders.sql'), 'w', encoding='utf-8') as f:
+            f.write(SQL_CONTENT)
+        manager = SQLQueryManager(temp_dir)
+
+        assert manager.get_query_timeout('heavy_query') == 300
+        assert manager.get_query_timeout('plain_query') is None
+        assert manager.get_query_timeout('missing') is None
+        assert manager.get_query('heavy_query').rstrip().endswith('FROM new_customer_orders;')
+
+
+def test_repo_queries_timeout():
+    """仓库自带的 kind_wide_table 配置了超时"""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    manager = SQLQueryManager(os.path.join(root, 'sql_queries'))
+    assert manager.get_query_timeout('kind_wide_table') == 600
+
+
+def test_is_timeout_error():
+    """MySQL 超时(3024)与被取消(1317)的错误码识别"""
+    assert is_timeout_error(Exception(3024, "maximum statement execution time exceeded"))
+    assert is_timeout_error(Exception(1317, "Query execution was interrupted"))
+    assert not is_timeout_error(Exception(1064, "syntax error"))
+    assert not is_timeout_error(Exception("no code"))
+
+
+if __name__ == "__main__":
+    test_query_timeout_metadata()
+    test_repo_queries_timeout()
+    test_is_timeout_error()
+    print("✅ 查询超时配置测试通过")
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试只读副本路由：按复制延迟选择副本或主库，检查结果按间隔缓存
+"""
+
+import os
+import sys
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.shared.replica import ReplicaRouter, lag_from_status
+
+PRIMARY = {'host': 'primary'}
+REPLICA = {'host': 'replica'}
+
+
+class FakeProbe:
+    """依次返回预设的延迟，值为异常时抛出"""
+
+    def __init__(self, *lags):
+        self.lags = list(lags)
+        self.calls = 0
+
+    def __call__(self, db_config):
+        assert db_config is REPLICA
+        self.calls += 1
+        lag = self.lags.pop(0)
+        if isinstance(lag, Exception):
+            raise lag
+        return lag
+
+
+def test_lag_from_status():
+    """新旧两种列名；NULL 表示复制未运行；没有复制状态视为无延迟"""
+    assert lag_from_status({'Seconds_Behind_Source': 3}) == 3
+    assert lag_from_status({'Seconds_Behind_Master': 0}) == 0
+    assert lag_from_status({'Seconds_Behind_Source': None}) is None
+    assert lag_from_status(None) == 0
+
+
+def test_route_by_lag():
+    """延迟超过阈值、复制停止或无法连接时回退主库，恢复后切回副本"""
+    now = [0.0]
+    probe = FakeProbe(2, 45, None, ConnectionError("refused"), 5)
+    router = ReplicaRouter(PRIMARY, REPLICA, probe, max_lag=30, check_interval=10, clock=lambda: now[0])
+    expected = [REPLICA, PRIMARY, PRIMARY, PRIMARY, REPLICA]
+    for config in expected:
+        assert router.choose() is config
+        now[0] += 10
+    assert probe.calls == 5 and router.last_lag == 5
+
+
+def test_check_is_cached():
+    """检查间隔内不重复查询副本状态"""
+    now = [0.0]
+    probe = FakeProbe(1, 100)
+    router = ReplicaRouter(PRIMARY, REPLICA, probe, check_interval=10, clock=lambda: now[0])
+    for _ in range(3):
+        assert router.choose() is REPLICA
+    now[0] = 9.5
+    assert router.choose() is REPLICA and probe.calls == 1
+    now[0] = 10
+    assert router.choose() is PRIMARY and probe.calls == 2
+
+
+def test_no_replica():
+    """未配置副本时始终使用主库，不检查延迟"""
+    probe = FakeProbe()
+    router = ReplicaRouter(PRIMARY, None, probe)
+    assert router.choose() is PRIMARY and not router.using_replica()
+    assert probe.calls == 0
+
+
+if __name__ == "__main__":
+    test_lag_from_status()
+    test_route_by_lag()
+    test_check_is_cached()
+    test_no_replica()
+    print("✅ 只读副本路由测试通过")
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试查询结果缓存与表版本戳
+"""
+
+import os
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.shared import table_versions
+from src.exporters.result_cache import ResultCache, extract_tables, is_cacheable
+
+
+def test_extract_tables():
+    """识别 FROM / JOIN / 逗号列表中的表名，忽略别名与子查询"""
+    sql = """
+        SELECT c.客户id, SUM(o.销售额)
+        FROM `customer_info` AS c
+        LEFT JOIN new_customer_orders o ON o.客户id = c.客户id
+        JOIN (SELECT 客户id FROM visit_record v WHERE 1 = 1) t ON t.客户id = c.客户id
+        JOIN mydb.kind_wide_table k ON k.客户id = c.客户id
+        GROUP BY c.客户id
+    """
+    assert extract_tables(sql) == {'customer_info', 'new_customer_orders', 'visit_record', 'kind_wide_table'}
+    assert extract_tables("SELECT * FROM a x, b y WHERE x.id = y.id") == {'a', 'b'}
+    # WITH 定义的公用表表达式不是表
+    assert extract_tables("WITH base AS (SELECT * FROM a), `汇总` AS (SELECT * FROM base) "
+                          "SELECT * FROM `汇总` JOIN b ON 1") == {'a', 'b'}
+
+
+def test_is_cacheable():
+    """只缓存结果确定的查询"""
+    assert is_cacheable("SELECT * FROM customer_info")
+    assert not is_cacheable("SELECT * FROM new_customer_orders WHERE 日期 >= CURDATE()")
+    assert not is_cacheable("DELETE FROM customer_info")
+    assert not is_cacheable("SELECT 1")
+
+
+def test_cache_invalidated_by_table_version():
+    """表版本戳更新后缓存失效"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        original = table_versions.TABLE_VERSIONS_DIR
+        table_versions.TABLE_VERSIONS_DIR = os.path.join(temp_dir, 'table_versions')
+        try:
+            cache = ResultCache(os.path.join(temp_dir, 'cache'))
+            sql = "SELECT * FROM customer_info"
+            df = pd.DataFrame({'客户id': [1, 2], '名称': ['甲', '乙']})
+
+            key, cached = cache.lookup(sql)
+            assert cached is None
+            assert cache.put(key, df)
+            cached = cache.get("SELECT *\n  FROM customer_info;")
+            assert cached is not None and cached['名称'].tolist() == ['甲', '乙']
+
+            table_versions.bump_table_version('visit_record')
+            assert cache.get(sql) is not None
+            table_versions.bump_table_version('customer_info')
+            assert cache.get(sql) is None
+        finally:
+            table_versions.TABLE_VERSIONS_DIR = original
+
+
+def test_version_bumped_during_query():
+    """查询执行期间表被导入更新：结果记在查询前的版本下，更新后的查询不会命中旧数据"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        original = table_versions.TABLE_VERSIONS_DIR
+        table_versions.TABLE_VERSIONS_DIR = os.path.join(temp_dir, 'table_versions')
+        try:
+            cache = ResultCache(os.path.join(temp_dir, 'cache'))
+            sql = "SELECT * FROM customer_info"
+            key, cached = cache.lookup(sql)
+            assert cached is None
+            # 查询读到的是导入前的数据，导入在查询返回前完成
+            stale = pd.DataFrame({'客户id': [1]})
+            table_versions.bump_table_version('customer_info')
+            assert cache.put(key, stale)
+            assert cache.get(sql) is None
+        finally:
+            table_versions.TABLE_VERSIONS_DIR = original
+
+
+def _bump_in_process(versions_dir, table_name):
+    table_versions.TABLE_VERSIONS_DIR = versions_dir
+    table_versions.bump_table_version(table_name)
+
+
+def test_concurrent_processes_keep_all_bumps():
+    """多个进程同时更新不同表的版本戳，互不覆盖"""
+    tables = [f"table_{i}" for i in range(8)]
+    with tempfile.TemporaryDirectory() as temp_dir:
+        versions_dir = os.path.join(temp_dir, 'table_versions')
+        with ProcessPoolExecutor(max_workers=len(tables)) as pool:
+            list(pool.map(_bump_in_process, [versions_dir] * len(tables), tables))
+        original = table_versions.TABLE_VERSIONS_DIR
+        table_versions.TABLE_VERSIONS_DIR = versions_dir
+        try:
+            assert all(version > 0 for version in table_versions.get_table_versions(tables).values())
+        finally:
+            table_versions.TABLE_VERSIONS_DIR = original
+
+
+def test_cache_lru_eviction():
+    """超过大小上限时淘汰最久未使用的结果"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache = ResultCache(os.path.join(temp_dir, 'cache'), max_bytes=0)
+        cache.put(cache.make_key("SELECT * FROM customer_info"), pd.DataFrame({'a': [1]}))
+        assert os.listdir(cache.cache_dir) == []
+
+
+if __name__ == "__main__":
+    test_extract_tables()
+    test_is_cacheable()
+    test_cache_invalidated_by_table_version()
+    test_version_bumped_during_query()
+    test_concurrent_processes_keep_all_bumps()
+    test_cache_lru_eviction()
+    print("✅ 查询结果缓存测试通过")
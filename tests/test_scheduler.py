@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试定时导出调度：cron 表达式、日期参数、表并发上限与公平顺序
+"""
+
+import os
+import sys
+import tempfile
+from concurrent.futures import Future
+from datetime import datetime
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.exporters.scheduler import (
+    CronSchedule, ExportScheduler, RunHistory, ScheduledJob, load_jobs, render_params
+)
+
+
+def test_cron_next_after():
+    """范围、步长、列表与别名"""
+    weekday_morning = CronSchedule('30 8 * * 1-5')
+    # 2025-06-06 是周五
+    assert weekday_morning.next_after(datetime(2025, 6, 6, 8, 0)) == datetime(2025, 6, 6, 8, 30)
+    assert weekday_morning.next_after(datetime(2025, 6, 6, 8, 30)) == datetime(2025, 6, 9, 8, 30)
+    every_quarter = CronSchedule('*/15 9-10 * * *')
+    assert every_quarter.next_after(datetime(2025, 6, 6, 10, 50)) == datetime(2025, 6, 7, 9, 0)
+    assert CronSchedule('@monthly').next_after(datetime(2025, 12, 15)) == datetime(2026, 1, 1, 0, 0)
+    # 日和周都指定时满足其一即可（周日写作 7）
+    either = CronSchedule('0 6 1 * 7')
+    assert either.next_after(datetime(2025, 6, 2)) == datetime(2025, 6, 8, 6, 0)
+    assert either.matches(datetime(2025, 7, 1, 6, 0))
+
+
+def test_cron_invalid():
+    for expression in ('* * * *', '60 * * * *', '*/0 * * * *', 'a * * * *', '0 0 30 2 *'):
+        try:
+            CronSchedule(expression).next_after(datetime(2025, 1, 1))
+            assert False, f"应当报错: {expression}"
+        except ValueError:
+            pass
+
+
+def test_render_params_and_tables():
+    params = render_params({'start_date': '{today-7}', 'end_date': '{yesterday}', 'month': '{month_start}',
+                            'limit': 10}, datetime(2025, 6, 3, 8, 30))
+    assert params == {'start_date': '2025-05-27', 'end_date': '2025-06-02', 'month': '2025-06-01', 'limit': 10}
+    sql = """
+    -- FROM ignored_in_comment
+    WITH base AS (SELECT * FROM new_customer_orders AS nco JOIN `customer_info` ci ON 1)
+    SELECT * FROM base, kind_wide_table w CROSS JOIN LATERAL (SELECT 1) k LEFT JOIN db.visit_record v ON 1
+    """
+    jobs = load_jobs({'jobs': [{'name': 'orders', 'schedule': '@daily', 'query_name': 'orders'}]},
+                     query_text=lambda query_name: sql)
+    assert jobs[0].tables == {'new_customer_orders', 'customer_info', 'visit_record', 'kind_wide_table'}
+
+
+def test_load_jobs():
+    jobs = load_jobs({'jobs': [
+        {'schedule': '0 9 * * *', 'query_name': 'orders', 'format': 'csv.gz'},
+        {'name': 'orders_weekly', 'schedule': '@weekly', 'query_name': 'orders', 'tables': ['t']},
+        {'schedule': '@daily', 'query_name': 'off', 'enabled': False},
+    ]}, query_text=lambda name: "SELECT * FROM new_customer_orders")
+    assert [job.name for job in jobs] == ['orders', 'orders_weekly']
+    assert jobs[0].tables == {'new_customer_orders'} and jobs[1].tables == {'t'}
+    assert jobs[0].config == {'query_name': 'orders', 'format': 'csv.gz'}
+    try:
+        load_jobs({'jobs': [{'schedule': '@daily', 'query_name': 'a'}, {'schedule': '@hourly', 'query_name': 'a'}]})
+        assert False, "应当报错"
+    except ValueError:
+        pass
+
+
+class ManualRunner:
+    """记录提交的任务，由测试决定何时完成"""
+
+    def __init__(self):
+        self.futures = []
+
+    def __call__(self, name, config):
+        assert config['query_name'] == name
+        future = Future()
+        self.futures.append((name, future))
+        return future
+
+    def started(self):
+        return [name for name, _ in self.futures]
+
+    def finish(self, name, success=True):
+        for job_name, future in self.futures:
+            if job_name == name and not future.done():
+                future.set_result(success)
+                return
+
+
+def test_limits_and_fairness():
+    """同时到期：总并发与表并发受限，受限任务不阻塞其他任务，同一任务不重复排队"""
+    now = [datetime(2025, 6, 3, 8, 59)]
+    jobs = [ScheduledJob(name, CronSchedule('0 9 * * *'), {'query_name': name}, tables)
+            for name, tables in (('a', {'orders'}), ('b', {'orders'}), ('c', {'visits'}), ('d', set()))]
+    runner = ManualRunner()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        history = RunHistory(os.path.join(temp_dir, 'runs.jsonl'))
+        scheduler = ExportScheduler(jobs, runner, max_workers=2, table_limits={'orders': 1},
+                                    history=history, clock=lambda: now[0])
+        now[0] = datetime(2025, 6, 3, 9, 0, 30)
+        scheduler.tick()
+        # b 等待 orders 表的名额，c 先执行
+        assert runner.started() == ['a', 'c']
+        runner.finish('a')
+        scheduler.collect(timeout=1)
+        assert runner.started() == ['a', 'c', 'b']
+        # 上一次还在排队或执行时再次到期，跳过（d 在排队，b 在执行）
+        scheduler.run_now(['d', 'b'])
+        runner.finish('c', success=False)
+        scheduler.collect(timeout=1)
+        assert runner.started() == ['a', 'c', 'b', 'd']
+        runner.finish('b')
+        runner.finish('d')
+        scheduler.run_until_idle(poll_interval=0.1)
+        assert scheduler.idle() and jobs[0].next_run == datetime(2025, 6, 4, 9, 0)
+
+        statuses = [(record['job'], record['status']) for record in history.load()]
+        assert statuses[:4] == [('a', 'success'), ('d', 'skipped'), ('b', 'skipped'), ('c', 'failed')]
+        assert sorted(statuses[4:]) == [('b', 'success'), ('d', 'success')]
+        assert history.last_runs()['b']['status'] == 'success'
+
+
+def test_least_recently_run_first():
+    """同时到期的任务中，最久未执行的优先"""
+    runner = ManualRunner()
+    jobs = [ScheduledJob(name, CronSchedule('@hourly'), {'query_name': name}) for name in ('a', 'b')]
+    jobs[0].last_started = datetime(2025, 6, 3, 9, 0)
+    jobs[1].last_started = datetime(2025, 6, 3, 8, 0)
+    scheduler = ExportScheduler(jobs, runner, max_workers=1, clock=lambda: datetime(2025, 6, 3, 10, 0))
+    scheduler.run_now()
+    scheduler.dispatch()
+    assert runner.started() == ['b']
+
+
+if __name__ == "__main__":
+    test_cron_next_after()
+    test_cron_invalid()
+    test_render_params_and_tables()
+    test_load_jobs()
+    test_limits_and_fairness()
+    test_least_recently_run_first()
+    print("✅ 定时导出调度测试通过")
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试单个大查询的分片切分与顺序合并
+"""
+
+import os
+import sys
+import time
+from datetime import date, datetime
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.exporters.sharding import (
+    parse_shard_key, split_ranges, build_shard_conditions, build_shard_sql, ShardedBatches
+)
+from src.exporters.pipeline import SpooledBatches
+from src.exporters.sql_params import BoundQuery
+
+
+class SourceShard:
+    """模拟服务端游标：记录是否已读到结尾"""
+
+    def __init__(self, start, count):
+        self.batches = iter([[(start + i,)] for i in range(count)])
+        self.exhausted = False
+        self.cancelled = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            return next(self.batches)
+        except StopIteration:
+            self.exhausted = True
+            raise
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class FakeShard:
+    def __init__(self, batches):
+        self.batches = iter(batches)
+        self.cancelled = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self.batches)
+
+    def cancel(self):
+        self.cancelled = True
+
+    def close(self):
+        pass
+
+
+def test_parse_shard_key():
+    """分片键为 表.列"""
+    assert parse_shard_key('new_customer_orders.日期') == ('new_customer_orders', '日期')
+    assert parse_shard_key('`db`.`t`.`订单id`') == ('db`.`t', '订单id')
+    try:
+        parse_shard_key('日期')
+        assert False
+    except ValueError:
+        pass
+
+
+def test_split_ranges():
+    """按类型均分取值范围"""
+    assert split_ranges(1, 100, 4) == [26, 51, 76]
+    assert split_ranges(5, 6, 4) == [6]
+    assert split_ranges(5, 5, 4) == []
+    assert split_ranges(date(2024, 1, 1), date(2024, 12, 31), 2) == [date(2024, 7, 2)]
+    assert split_ranges(datetime(2024, 1, 1), datetime(2024, 1, 2), 2) == [datetime(2024, 1, 1, 12)]
+    assert split_ranges('a', 'z', 4) == []
+    assert split_ranges(None, None, 4) == []
+
+
+def test_shard_conditions_cover_all_rows():
+    """各分片条件首尾不设界并包含 NULL，行不会遗漏或重复"""
+    conditions = build_shard_conditions('日期', [20240401, 20240701])
+    assert conditions == [
+        "(shard_src.`日期` < 20240401 OR shard_src.`日期` IS NULL)",
+        "shard_src.`日期` >= 20240401 AND shard_src.`日期` < 20240701",
+        "shard_src.`日期` >= 20240701",
+    ]
+    assert build_shard_conditions('日期', []) == [None]
+
+
+def test_build_shard_sql():
+    """包装为派生表过滤，BoundQuery 保留参数"""
+    sql = build_shard_sql("SELECT * FROM t ORDER BY 日期;", "shard_src.`日期` >= 1")
+    assert sql == "SELECT * FROM (\nSELECT * FROM t ORDER BY 日期\n) AS shard_src\nWHERE shard_src.`日期` >= 1"
+    assert build_shard_sql("SELECT 1;", None) == "SELECT 1"
+    bound = build_shard_sql(BoundQuery("SELECT * FROM t WHERE d >= :d", {'d': 1}), "x = 1")
+    assert isinstance(bound, BoundQuery) and bound.positional()[1] == [1]
+    # 分号后带下一个查询的标题注释（SQL文件中非最后一个查询）
+    sql = build_shard_sql("SELECT * FROM t ORDER BY 日期;\n\n\n-- 查询8: 下一个查询\n", "x = 1")
+    assert sql == "SELECT * FROM (\nSELECT * FROM t ORDER BY 日期\n) AS shard_src\nWHERE x = 1"
+
+
+def test_sharded_batches_in_order():
+    """按分片顺序合并，取消时取消未读完的分片"""
+    closed = []
+    merged = ShardedBatches([FakeShard([[1], [2]]), FakeShard([]), FakeShard([[3]])],
+                            on_close=lambda: closed.append(True))
+    assert list(merged) == [[1], [2], [3]]
+    assert closed == [True]
+
+    shards = [FakeShard([[1]]), FakeShard([[2]])]
+    merged = ShardedBatches(shards)
+    next(merged)
+    merged.cancel()
+    assert shards[0].cancelled and shards[1].cancelled
+
+
+def test_later_shards_read_while_first_is_written():
+    """第一个分片慢慢写出时，后面的分片照样读到结尾（超出内存上限的批次暂存到临时文件），合并顺序不变"""
+    first, second = SourceShard(0, 5), SourceShard(100, 50)
+    merged = ShardedBatches([SpooledBatches(first, memory_batches=4), SpooledBatches(second, memory_batches=4)])
+    received = []
+    for rows in merged:
+        received.append(rows[0][0])
+        if len(received) <= 5:
+            time.sleep(0.05)
+        if len(received) == 3:
+            # 第一个分片还没写完，第二个分片的游标已经读到结尾
+            assert second.exhausted
+    assert received == list(range(5)) + list(range(100, 150))
+    assert merged._shards[1].spilled_batches == 46
+
+
+if __name__ == "__main__":
+    test_parse_shard_key()
+    test_split_ranges()
+    test_shard_conditions_cover_all_rows()
+    test_build_shard_sql()
+    test_sharded_batches_in_order()
+    test_later_shards_read_while_first_is_written()
+    print("✅ 分片执行测试通过")
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试按列值拆分导出
+"""
+
+import os
+import sys
+import tempfile
+
+from openpyxl import load_workbook
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.exporters.writers import SplitWriter, split_value_name
+
+COLUMNS = ['客户id', '管理城市']
+ROWS = [(1, '北京'), (2, '上海'), (3, '北京'), (4, None), (5, '上海'), (6, '广州'), (7, '北京')]
+
+
+def read_lines(path):
+    with open(path, 'r', encoding='utf-8-sig') as f:
+        return f.read().splitlines()
+
+
+def test_split_value_name():
+    """列值中的非法字符替换为下划线，空值单独命名"""
+    assert split_value_name('北京/朝阳 区') == '北京_朝阳_区'
+    assert split_value_name(None) == '空值'
+    assert split_value_name('') == '空值'
+    assert split_value_name('***') == '空值'
+
+
+def test_split_files_with_bounded_writers():
+    """同时只打开一个文件时，关闭后再遇到该值追加续写，表头只写一次"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, '客户.csv')
+        writer = SplitWriter(path, 'csv', '管理城市', max_open=1)
+        writer.open(COLUMNS)
+        writer.write_rows(ROWS[:3])
+        writer.write_rows(ROWS[3:])
+        writer.close()
+
+        assert writer.rows_written == 7
+        assert writer.value_rows == {'北京': 3, '上海': 2, None: 1, '广州': 1}
+        assert sorted(os.listdir(temp_dir)) == sorted(
+            ['客户_北京.csv', '客户_上海.csv', '客户_广州.csv', '客户_空值.csv'])
+        assert read_lines(os.path.join(temp_dir, '客户_北京.csv')) == ['客户id,管理城市', '1,北京', '3,北京', '7,北京']
+        assert read_lines(os.path.join(temp_dir, '客户_上海.csv')) == ['客户id,管理城市', '2,上海', '5,上海']
+
+
+def test_name_collisions():
+    """清理后同名（不区分大小写）的值加序号区分"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        writer = SplitWriter(os.path.join(temp_dir, 'out.csv'), 'csv', 'k')
+        writer.open(['k'])
+        writer.write_rows([('a/b',), ('a b',), ('A_B',)])
+        writer.close()
+        assert sorted(os.listdir(temp_dir)) == ['out_A_B_3.csv', 'out_a_b.csv', 'out_a_b_2.csv']
+
+
+def test_split_sheets():
+    """按工作表拆分：每个值一个工作表，超过单表行数上限时续写到新工作表"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, '客户.xlsx')
+        writer = SplitWriter(path, 'xlsx', '管理城市', target='sheet', max_rows_per_sheet=2)
+        writer.open(COLUMNS)
+        writer.write_rows(ROWS)
+        writer.close()
+
+        workbook = load_workbook(path, read_only=True)
+        assert workbook.sheetnames == ['北京', '北京_2', '上海', '空值', '广州']
+        assert list(workbook['北京'].values) == [tuple(COLUMNS), (1, '北京'), (3, '北京')]
+        assert list(workbook['北京_2'].values) == [tuple(COLUMNS), (7, '北京')]
+        workbook.close()
+
+
+def test_missing_column_and_discard():
+    """拆分列不存在时报错；放弃写入时删除所有已生成的文件"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        writer = SplitWriter(os.path.join(temp_dir, 'out.csv'), 'csv', '城市', max_open=1)
+        try:
+            writer.open(COLUMNS)
+            assert False, "应当报错"
+        except ValueError:
+            pass
+
+        writer = SplitWriter(os.path.join(temp_dir, 'out.csv'), 'csv', '管理城市', max_open=1)
+        writer.open(COLUMNS)
+        writer.write_rows(ROWS)
+        writer.discard()
+        assert os.listdir(temp_dir) == []
+
+    try:
+        SplitWriter('out.csv', 'csv', '管理城市', target='sheet')
+        assert False, "应当报错"
+    except ValueError:
+        pass
+
+
+if __name__ == "__main__":
+    test_split_value_name()
+    test_split_files_with_bounded_writers()
+    test_name_collisions()
+    test_split_sheets()
+    test_missing_column_and_discard()
+    print("✅ 拆分导出测试通过")
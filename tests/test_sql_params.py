@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试命名查询的绑定参数与预处理语句复用
+"""
+
+import os
+import sys
+import tempfile
+from datetime import date
+from decimal import Decimal
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.exporters.sql_manager import SQLQueryManager, build_preview_sql
+from src.exporters.sql_params import (
+    BoundQuery, PreparedStatementCache, find_placeholders, parse_param_declarations, convert_params
+)
+
+SQL_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'sql_queries')
+
+
+class FakeCursor:
+    def __init__(self, log):
+        self.log = log
+
+    def execute(self, sql, args=None):
+        self.log.append((sql, args))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class FakeConnection:
+    """记录执行过的语句"""
+
+    def __init__(self):
+        self.log = []
+
+    def cursor(self):
+        return FakeCursor(self.log)
+
+
+def test_find_placeholders():
+    """跳过字符串、标识符与注释中的冒号"""
+    sql = ("SELECT ':skip', `a:b`, '12:30' -- :comment\n"
+           "FROM t /* :block */ WHERE d >= :start_date AND d < :end_date AND x := 1 AND y = CAST(z AS CHAR)::text")
+    assert [name for _, _, name in find_placeholders(sql)] == ['start_date', 'end_date']
+
+
+def test_declarations_and_conversion():
+    """按声明的类型转换参数值"""
+    declarations = parse_param_declarations("start_date DATE, amount DECIMAL(12,2), n INT")
+    assert list(declarations.items()) == [('start_date', 'DATE'), ('amount', 'DECIMAL'), ('n', 'INT')]
+    values = convert_params(declarations, {'start_date': '20240601', 'amount': '10.50', 'n': '3'})
+    assert values == {'start_date': date(2024, 6, 1), 'amount': Decimal('10.50'), 'n': 3}
+
+    for bad in ({'start_date': 'x', 'amount': 1, 'n': 1}, {'start_date': '2024-01-01', 'amount': 1},
+                {'start_date': '2024-01-01', 'amount': 1, 'n': 1, 'other': 1}):
+        try:
+            convert_params(declarations, bad)
+            assert False, bad
+        except ValueError:
+            pass
+
+
+def test_bound_query_render_escapes():
+    """内联渲染时转义参数值"""
+    query = BoundQuery("SELECT * FROM t WHERE name = :name AND d >= :d AND name <> :name;",
+                       {'name': "a' OR '1'='1", 'd': date(2024, 1, 1)})
+    sql, args = query.positional()
+    assert sql == "SELECT * FROM t WHERE name = ? AND d >= ? AND name <> ?"
+    assert args == ["a' OR '1'='1", date(2024, 1, 1), "a' OR '1'='1"]
+    assert "'a\\' OR \\'1\\'=\\'1'" in query.render()
+    assert "'2024-01-01'" in str(query)
+
+
+def test_prepared_statement_reuse():
+    """同一连接上相同查询只 PREPARE 一次"""
+    connection = FakeConnection()
+    cache = PreparedStatementCache(connection)
+    cursor = FakeCursor(connection.log)
+    for day in (1, 2, 3):
+        cache.execute(cursor, BoundQuery("SELECT * FROM t WHERE d = :d", {'d': date(2024, 1, day)}))
+    prepares = [sql for sql, _ in connection.log if sql.startswith('PREPARE')]
+    executes = [sql for sql, _ in connection.log if sql.startswith('EXECUTE')]
+    assert cache.prepare_count == 1 and len(prepares) == 1
+    assert len(executes) == 3 and executes[0].endswith('USING @export_p1')
+
+
+def test_sql_manager_bind_query():
+    """SQL文件中的 "-- 参数:" 声明"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        with open(os.path.join(temp_dir, 'q.sql'), 'w', encoding='utf-8') as f:
+            f.write("-- 使用: by_date\n-- 参数: start_date DATE\nSELECT * FROM t WHERE d >= :start_date;\n\n"
+                    "-- 使用: legacy\nSELECT * FROM t WHERE d >= '{start_date}';\n")
+        manager = SQLQueryManager(temp_dir)
+        bound = manager.build_query('by_date', start_date='2024-01-01')
+        assert isinstance(bound, BoundQuery) and bound.params == {'start_date': date(2024, 1, 1)}
+        assert manager.build_query('by_date', start_date='bad') is None
+        assert manager.build_query('legacy', start_date='2024-01-01').endswith("'2024-01-01';")
+
+
+def test_build_preview_sql():
+    """预览只包装 SELECT / WITH 查询，BoundQuery 包装后保留参数，非只读语句拒绝执行"""
+    preview = build_preview_sql("-- 注释\nSELECT * FROM t;", 20)
+    assert preview == "SELECT * FROM (\n-- 注释\nSELECT * FROM t\n) AS preview_src\nLIMIT 20"
+    assert build_preview_sql("SHOW TABLES;", 20) == "SHOW TABLES"
+    bound = build_preview_sql(BoundQuery("SELECT * FROM t WHERE d >= :d", {'d': date(2024, 1, 1)}), 5)
+    assert isinstance(bound, BoundQuery) and bound.params == {'d': date(2024, 1, 1)}
+    assert bound.sql.endswith(") AS preview_src\nLIMIT 5")
+    for statement in ("DROP TABLE t", "-- 注释\ndelete from t", "UPDATE t SET a = 1", "EXPLAIN ANALYZE DELETE FROM t",
+                      "SHOW TABLES; DROP TABLE t", "/* x */ DROP TABLE t", ""):
+        try:
+            build_preview_sql(statement, 20)
+            assert False, f"应当拒绝: {statement}"
+        except ValueError:
+            pass
+
+
+def test_preview_named_queries():
+    """SQL文件中的每个命名查询都能包装预览：末尾的分号和下一个查询的标题注释不进入派生表"""
+    manager = SQLQueryManager(SQL_DIR)
+    assert {'count_forth_kind', 'first_week_repeat_purchase', 'kind_wide_table'} <= set(manager.queries)
+    for query_name, sql in manager.queries.items():
+        preview = build_preview_sql(sql, 20)
+        inner = preview.split('\n) AS preview_src')[0]
+        assert not inner.rstrip().endswith(';'), query_name
+        assert not inner.splitlines()[-1].lstrip().startswith('--'), query_name
+        assert preview.endswith(") AS preview_src\nLIMIT 20"), query_name
+
+
+if __name__ == "__main__":
+    test_find_placeholders()
+    test_declarations_and_conversion()
+    test_bound_query_render_escapes()
+    test_prepared_statement_reuse()
+    test_sql_manager_bind_query()
+    test_build_preview_sql()
+    test_preview_named_queries()
+    print("✅ 绑定参数测试通过")
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试流式文件写入器
+"""
+
+import os
+import sys
+import gzip
+import tempfile
+import importlib.util
+from openpyxl import load_workbook
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from src.exporters.writers import (
+    XlsxStreamWriter, rollover_sheet_name, write_dataframe_sheets,
+    create_writer, split_extension, with_format_extension, parse_formats, create_tee_writer,
+    CsvStreamWriter, TeeWriter
+)
+
+
+class FailingCloseWriter(CsvStreamWriter):
+    """关闭时文件已写出但随后报错（如磁盘写满），模拟某一格式关闭失败"""
+
+    def close(self):
+        closing = self._file is not None
+        super().close()
+        if closing:
+            raise OSError("磁盘空间不足")
+
+
+def test_xlsx_stream_writer():
+    """分批写入的行全部落盘，表头在第一行"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        output_path = os.path.join(temp_dir, "sub", "stream.xlsx")
+        writer = XlsxStreamWriter(output_path, "数据")
+        writer.open(['客户id', '销售额'])
+        writer.write_rows([(1, 10.5), (2, 20.0)])
+        writer.write_rows([(3, 30.25)])
+        writer.close()
+
+        assert writer.rows_written == 3
+        sheet = load_workbook(output_path, read_only=True)['数据']
+        rows = list(sheet.iter_rows(values_only=True))
+        assert rows[0] == ('客户id', '销售额')
+        assert rows[-1] == (3, 30.25)
+        assert len(rows) == 4
+
+
+def test_discard_removes_file():
+    """放弃写入时不留下输出文件，也不留下 openpyxl 的临时文件"""
+    def openpyxl_temp_files():
+        return {name for name in os.listdir(tempfile.gettempdir()) if name.startswith('openpyxl.')}
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        output_path = os.path.join(temp_dir, "empty.xlsx")
+        writer = XlsxStreamWriter(output_path)
+        writer.open(['a'])
+        writer.discard()
+        assert not os.path.exists(output_path)
+
+        before = openpyxl_temp_files()
+        writer = XlsxStreamWriter(os.path.join(temp_dir, "failed.xlsx"), max_rows_per_sheet=2)
+        writer.open(['a'])
+        writer.write_rows([(1,), (2,), (3,)])
+        assert openpyxl_temp_files() - before
+        # 放弃时不打包整个工作簿
+        saved = []
+        writer._workbook.save = saved.append
+        writer.discard()
+        assert saved == []
+        assert os.listdir(temp_dir) == []
+        assert not openpyxl_temp_files() - before
+
+
+def test_rollover_to_new_sheet():
+    """超过单表行数上限时续写到 Sheet_2，每个工作表都带表头"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        output_path = os.path.join(temp_dir, "rollover.xlsx")
+        writer = XlsxStreamWriter(output_path, "订单", max_rows_per_sheet=3)
+        writer.open(['id'])
+        writer.write_rows([(i,) for i in range(1, 6)])
+        writer.write_rows([(6,), (7,)])
+        writer.close()
+
+        assert writer.sheet_names == ['订单', '订单_2', '订单_3']
+        workbook = load_workbook(output_path)
+        assert [cell.value for cell in workbook['订单_2']['A']] == ['id', 4, 5, 6]
+        assert [cell.value for cell in workbook['订单_3']['A']] == ['id', 7]
+
+
+def test_rollover_to_new_file():
+    """rollover='file' 时续写到 name_2.xlsx"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        output_path = os.path.join(temp_dir, "rollover.xlsx")
+        writer = XlsxStreamWriter(output_path, "订单", max_rows_per_sheet=2, rollover='file')
+        writer.open(['id'])
+        writer.write_rows([(1,), (2,), (3,)])
+        writer.close()
+
+        assert writer.output_paths == [output_path, os.path.join(temp_dir, "rollover_2.xlsx")]
+        assert [cell.value for cell in load_workbook(writer.output_paths[1])['订单']['A']] == ['id', 3]
+
+
+def test_rollover_sheet_name_length():
+    """续写的工作表名称不超过Excel的31个字符"""
+    name = rollover_sheet_name('x' * 40, 12)
+    assert len(name) == 31 and name.endswith('_12')
+
+
+def test_write_dataframe_sheets():
+    """DataFrame 导出同样按行数上限拆分"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        output_path = os.path.join(temp_dir, "df.xlsx")
+        df = pd.DataFrame({'id': range(5)})
+        with pd.ExcelWriter(output_path, engine='openpyxl') as excel_writer:
+            names = write_dataframe_sheets(excel_writer, df, 'Sheet', max_rows_per_sheet=2)
+        assert names == ['Sheet', 'Sheet_2', 'Sheet_3']
+        assert list(pd.read_excel(output_path, sheet_name='Sheet_3')['id']) == [4]
+
+
+def test_csv_writers():
+    """csv 与 csv.gz 写入器输出带表头的UTF-8文本，可被导入工具按 utf-8-sig 读回"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for fmt in ('csv', 'csv.gz'):
+            output_path = with_format_extension(os.path.join(temp_dir, "data.xlsx"), fmt)
+            writer = create_writer(fmt, output_path)
+            writer.open(['客户', '金额'])
+            writer.write_rows([('张三', 1.5), ('李,四', None)])
+            writer.close()
+
+            df = pd.read_csv(output_path, encoding='utf-8-sig')
+            assert list(df.columns) == ['客户', '金额']
+            assert df['客户'].tolist() == ['张三', '李,四']
+
+        with gzip.open(os.path.join(temp_dir, "data.csv.gz"), 'rb') as f:
+            assert f.read(3) == b'\xef\xbb\xbf'
+
+
+def test_split_extension():
+    """双扩展名 .csv.gz 整体识别"""
+    assert split_extension('out/订单.csv.gz') == ('out/订单', '.csv.gz')
+    assert split_extension('out/订单.xlsx') == ('out/订单', '.xlsx')
+    assert with_format_extension('out/订单.xlsx', 'parquet') == 'out/订单.parquet'
+
+
+def test_parquet_writer():
+    """Parquet 写入器：未安装 pyarrow 时给出明确提示"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        output_path = os.path.join(temp_dir, "data.parquet")
+        if importlib.util.find_spec('pyarrow') is None:
+            try:
+                create_writer('parquet', output_path)
+            except ImportError as e:
+                assert 'pyarrow' in str(e)
+            else:
+                raise AssertionError("缺少 pyarrow 时应抛出 ImportError")
+            return
+
+        writer = create_writer('parquet', output_path)
+        writer.open(['id', 'note'])
+        writer.write_rows([(1, None), (2, None)])
+        writer.write_rows([(3, 'x')])
+        writer.close()
+        df = pd.read_parquet(output_path)
+        assert df['id'].tolist() == [1, 2, 3]
+        assert df['note'].tolist()[-1] == 'x'
+
+
+def test_parse_formats():
+    """逗号分隔的格式列表去重并保持顺序"""
+    assert parse_formats('xlsx, CSV.GZ,xlsx') == ['xlsx', 'csv.gz']
+    assert parse_formats(['parquet']) == ['parquet']
+    for value in ('xlsx,json', ' , '):
+        try:
+            parse_formats(value)
+            raise AssertionError("应当报错")
+        except ValueError:
+            pass
+
+
+def test_tee_writer():
+    """同一份数据同时写入多种格式；放弃写入时全部删除"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        output_path = os.path.join(temp_dir, "订单.xlsx")
+        writer = create_tee_writer(['xlsx', 'csv.gz'], output_path, '订单')
+        writer.open(['id', '金额'])
+        writer.write_rows([(1, 10), (2, 20)])
+        writer.write_rows([(3, 30)])
+        writer.close()
+
+        assert writer.rows_written == 3
+        assert writer.output_paths == [output_path, os.path.join(temp_dir, "订单.csv.gz")]
+        assert pd.read_excel(output_path, sheet_name='订单')['id'].tolist() == [1, 2, 3]
+        assert pd.read_csv(writer.output_paths[1], encoding='utf-8-sig')['金额'].tolist() == [10, 20, 30]
+
+        writer = create_tee_writer('csv,csv.gz', os.path.join(temp_dir, "放弃.csv"))
+        writer.open(['id'])
+        writer.write_rows([(1,)])
+        writer.discard()
+        assert not any(name.startswith("放弃") for name in os.listdir(temp_dir))
+
+
+def test_tee_writer_close_failure():
+    """任一格式关闭失败时，已正常关闭的其他格式的文件也删除"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        good = create_writer('csv.gz', os.path.join(temp_dir, "订单.csv.gz"))
+        bad = FailingCloseWriter(os.path.join(temp_dir, "订单.csv"))
+        writer = TeeWriter([good, bad])
+        writer.open(['id'])
+        writer.write_rows([(1,), (2,)])
+        try:
+            writer.close()
+            raise AssertionError("应当报错")
+        except OSError:
+            pass
+        assert os.listdir(temp_dir) == []
+
+
+if __name__ == "__main__":
+    test_xlsx_stream_writer()
+    test_discard_removes_file()
+    test_rollover_to_new_sheet()
+    test_rollover_to_new_file()
+    test_rollover_sheet_name_length()
+    test_write_dataframe_sheets()
+    test_csv_writers()
+    test_split_extension()
+    test_parquet_writer()
+    test_parse_formats()
+    test_tee_writer()
+    test_tee_writer_close_failure()
+    print("✅ 流式写入器测试通过")
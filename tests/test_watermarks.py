@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试增量导出水位线
+"""
+
+import os
+import sys
+import tempfile
+from datetime import date
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.exporters.sql_manager import SQLQueryManager
+from src.exporters.watermarks import WatermarkStore, WatermarkTracker, build_incremental_sql
+from src.exporters.writers import CsvStreamWriter
+
+SQL_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'sql_queries')
+
+
+def test_build_incremental_sql():
+    """首次运行不过滤，之后按水位包装为子查询"""
+    sql = "SELECT 订单id, 日期 FROM new_customer_orders;"
+    assert build_incremental_sql(sql, '订单id') == "SELECT 订单id, 日期 FROM new_customer_orders"
+    wrapped = build_incremental_sql(sql, '日期', '2025-06-01')
+    assert "FROM new_customer_orders\n) AS incremental_src" in wrapped
+    assert wrapped.endswith("incremental_src.`日期` > '2025-06-01'")
+    assert build_incremental_sql(sql, '订单id', 100).endswith("> 100")
+
+
+def test_incremental_named_queries():
+    """SQL文件中的命名查询末尾带有分号和下一个查询的标题注释，包装时都要去掉"""
+    manager = SQLQueryManager(SQL_DIR)
+    for query_name in ('count_forth_kind', 'first_week_repeat_purchase', 'kind_wide_table'):
+        sql = manager.get_query(query_name)
+        assert sql.splitlines()[-1].startswith('-- 查询')
+        wrapped = build_incremental_sql(sql, '客户id', 100)
+        inner = wrapped.split('\n) AS incremental_src')[0]
+        assert not inner.rstrip().endswith(';'), query_name
+        assert not inner.splitlines()[-1].lstrip().startswith('--'), query_name
+
+
+def test_watermark_store_roundtrip():
+    """水位线按任务保存，日期转为字符串"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        store = WatermarkStore(temp_dir)
+        assert store.load('订单增量') is None
+        store.save('订单增量', '日期', date(2025, 6, 30), rows=10)
+        state = store.load('订单增量')
+        assert state['column'] == '日期' and state['value'] == '2025-06-30' and state['rows'] == 10
+        store.reset('订单增量')
+        assert store.load('订单增量') is None
+
+
+def test_tracker_appends_and_records_max():
+    """追加写入不重复表头，并记录水位列最大值"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        output_path = os.path.join(temp_dir, "orders.csv")
+        for rows in ([(1, 'a'), (3, 'b')], [(5, 'c'), (4, None)]):
+            tracker = WatermarkTracker(CsvStreamWriter(output_path, append=True), '订单id')
+            tracker.open(['订单id', '备注'])
+            tracker.write_rows(rows)
+            tracker.close()
+        assert tracker.max_value == 5
+
+        with open(output_path, 'r', encoding='utf-8-sig') as f:
+            lines = f.read().splitlines()
+        assert lines == ['订单id,备注', '1,a', '3,b', '5,c', '4,']
+
+
+def test_discard_keeps_existing_rows():
+    """追加失败时截断回原大小，已有数据保留"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for name in ("orders.csv", "orders.csv.gz"):
+            output_path = os.path.join(temp_dir, name)
+            compress = name.endswith('.gz')
+            writer = CsvStreamWriter(output_path, compress=compress)
+            writer.open(['id'])
+            writer.write_rows([(1,)])
+            writer.close()
+            size = os.path.getsize(output_path)
+
+            writer = CsvStreamWriter(output_path, compress=compress, append=True)
+            writer.open(['id'])
+            writer.write_rows([(2,)])
+            writer.discard()
+            assert os.path.getsize(output_path) == size
+
+
+if __name__ == "__main__":
+    test_build_incremental_sql()
+    test_incremental_named_queries()
+    test_watermark_store_roundtrip()
+    test_tracker_appends_and_records_max()
+    test_discard_keeps_existing_rows()
+    print("✅ 增量导出水位线测试通过")